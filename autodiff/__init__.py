@@ -1,4 +1,10 @@
 from autodiff import operations
 from autodiff import structures
+from autodiff import line_search
 from autodiff import optimizations
 from autodiff import root_finding
+from autodiff import reverse
+from autodiff import forward
+from autodiff import sparsity
+from autodiff import tracing
+from autodiff import codegen
@@ -0,0 +1,273 @@
+"""Code generation from traced graphs
+
+``compile_graph()`` turns a traced ``Graph`` into the source of a straight-line NumPy
+function, one statement per recorded operation for the values, followed by the
+derivative statements in reverse (adjoint) or forward (tangent) order. The source is
+compiled once with ``compile``/``exec`` and cached on the Graph.
+
+Every statement is a NumPy expression, so the kernel evaluates any number of points in
+one call: the last axis of its input holds the inputs of the traced function, the leading
+axes are batch axes.
+"""
+
+import inspect
+import numpy as np
+from autodiff import operations
+from autodiff.tracing import TracedFunction, trace
+
+# Value and local partial derivatives of the operations. {0}, {1} are the operands and
+# {out} the value of the operation. Partials are only emitted for traced operands.
+_TEMPLATES = {
+    operations.add: ('{0} + {1}', ['1.0', '1.0']),
+    operations.subtract: ('{0} - {1}', ['1.0', '-1.0']),
+    operations.mul: ('{0} * {1}', ['{1}', '{0}']),
+    operations.div: ('{0} / {1}', ['1.0 / {1}', '-{0} / {1} ** 2']),
+    operations.power: ('{0} ** {1}', ['{1} * {0} ** ({1} - 1)', '{out} * np.log({0})']),
+    operations.log: (
+        'np.log({0}) / np.log({1})',
+        ['1.0 / ({0} * np.log({1}))', '-np.log({0}) / ({1} * np.log({1}) ** 2)'],
+    ),
+    operations.negate: ('-{0}', ['-1.0']),
+    operations.sin: ('np.sin({0})', ['np.cos({0})']),
+    operations.cos: ('np.cos({0})', ['-np.sin({0})']),
+    operations.tan: ('np.tan({0})', ['{out} ** 2 + 1.0']),
+    operations.exp: ('np.exp({0})', ['{out}']),
+    operations.logistic: ('1.0 / (1.0 + np.exp(-{0}))', ['{out} * (1.0 - {out})']),
+    operations.asin: ('np.arcsin({0})', ['1.0 / np.sqrt(1.0 - {0} ** 2)']),
+    operations.acos: ('np.arccos({0})', ['-1.0 / np.sqrt(1.0 - {0} ** 2)']),
+    operations.atan: ('np.arctan({0})', ['1.0 / (1.0 + {0} ** 2)']),
+    operations.sinh: ('np.sinh({0})', ['np.cosh({0})']),
+    operations.cosh: ('np.cosh({0})', ['np.sinh({0})']),
+    operations.tanh: ('np.tanh({0})', ['1.0 - {out} ** 2']),
+    operations.sqrt: ('np.sqrt({0})', ['0.5 / {out}']),
+}
+
+def _full(value, shape):
+    '''
+    Broadcasts a value or derivative of a kernel to the batch shape.
+    '''
+    return np.broadcast_to(np.asarray(value, dtype=float), shape)
+
+def _outputs(spec):
+    '''
+    Flattens the output structure of a Graph into its leaves.
+
+    Returns:
+        a list of ('entry', index) or ('constant', value) leaves, and whether the output
+        is a single scalar.
+    '''
+    kind, content = spec
+    if kind == 'entry':
+        return [spec], True
+    if kind in ('number', 'constant'):
+        return [('constant', content)], True
+    leaves = []
+    for element in content:
+        leaves.extend(_outputs(element)[0])
+    return leaves, False
+
+class _Source():
+    '''
+    Accumulates the lines and constants of a generated kernel.
+    '''
+
+    def __init__(self):
+        self.lines = []
+        self.constants = {}
+
+    def constant(self, value):
+        name = f'c{len(self.constants)}'
+        self.constants[name] = value
+        return name
+
+    def emit(self, line):
+        self.lines.append('    ' + line)
+
+def _operations(graph, source):
+    '''
+    Emits the value statements and returns the operands and partials of every operation.
+
+    Returns:
+        a list with, for every operation, the entry of the result and the (entry, partial
+        expression) pairs of its traced operands.
+    '''
+    ops = []
+    for index, (op, operands, kwargs, refs) in enumerate(graph.ops):
+        if op not in _TEMPLATES:
+            raise NotImplementedError(f'No code template for the operation {op.__name__}')
+        value, partials = _TEMPLATES[op]
+
+        # Bind the operands to the signature, so defaults (e.g. the base of log) are known
+        bound = inspect.signature(op.__wrapped__).bind(*operands, **kwargs)
+        bound.apply_defaults()
+        traced = dict(refs)
+        names = [
+            f'v{traced[position]}' if position in traced else source.constant(operand)
+            for position, operand in enumerate(bound.args)
+        ]
+
+        out = f'v{graph.n_inputs + index}'
+        source.emit(f'{out} = {value.format(*names, out=out)}')
+        ops.append((
+            graph.n_inputs + index,
+            [(entry, partials[position].format(*names, out=out)) for position, entry in refs],
+        ))
+    return ops
+
+def _reverse(graph, ops, leaves, source):
+    '''
+    Emits the adjoint statements of every output and returns the names of the
+    derivative rows.
+    '''
+    rows = []
+    for k, (kind, content) in enumerate(leaves):
+        inputs = [None] * graph.n_inputs
+        if kind == 'entry':
+            adjoints = {content: '1.0'}
+            for out, terms in reversed(ops):
+                if out not in adjoints:
+                    continue
+                for entry, partial in terms:
+                    term = f'{adjoints[out]} * ({partial})'
+                    name = f'a{k}_{entry}'
+                    if entry in adjoints:
+                        source.emit(f'{name} = {name} + {term}')
+                    else:
+                        source.emit(f'{name} = {term}')
+                        adjoints[entry] = name
+            inputs = [adjoints.get(entry) for entry in range(graph.n_inputs)]
+        rows.append(inputs)
+    return rows
+
+def _forward(graph, ops, leaves, source):
+    '''
+    Emits the tangent statements, carrying the derivatives w.r.t. all the inputs along the
+    last axis, and returns the names of the derivative rows.
+    '''
+    source.emit('eye = np.eye(%d)' % graph.n_inputs)
+    tangents = {entry: f'eye[{entry}]' for entry in range(graph.n_inputs)}
+    for out, terms in ops:
+        term = ' + '.join(
+            f'np.expand_dims({partial}, -1) * {tangents[entry]}' for entry, partial in terms
+        )
+        source.emit(f't{out} = {term}')
+        tangents[out] = f't{out}'
+
+    rows = []
+    for kind, content in leaves:
+        if kind == 'entry':
+            rows.append(tangents[content])
+        else:
+            rows.append(None)
+    return rows
+
+def generate(graph, mode='reverse'):
+    '''
+    Generates the source of a NumPy kernel evaluating a traced Graph and its derivatives.
+
+    Args:
+        graph: a Graph, as returned by TracedFunction.graph()
+        mode: 'reverse' for adjoint derivative code, cheaper for few outputs, or 'forward'
+            for tangent derivative code, cheaper for few inputs
+
+    Returns:
+        the source of the kernel, and a dict of the constants it refers to.
+    '''
+    if mode not in ('reverse', 'forward'):
+        raise ValueError("mode must be 'reverse' or 'forward'")
+    leaves, scalar_output = _outputs(graph.outputs)
+    scalar_input = graph.shape == ()
+    source = _Source()
+
+    source.emit('x = np.asarray(x, dtype=float)')
+    if scalar_input:
+        source.emit('shape = x.shape')
+        source.emit('v0 = x')
+    else:
+        source.emit('shape = x.shape[:-1]')
+        for entry in range(graph.n_inputs):
+            source.emit(f'v{entry} = x[..., {entry}]')
+
+    ops = _operations(graph, source)
+    if mode == 'reverse':
+        rows = _reverse(graph, ops, leaves, source)
+    else:
+        rows = _forward(graph, ops, leaves, source)
+
+    values = []
+    for kind, content in leaves:
+        values.append(f'v{content}' if kind == 'entry' else source.constant(content))
+    source.emit('values = [%s]' % ', '.join(f'_full({value}, shape)' for value in values))
+
+    source.emit('derivs = []')
+    if mode == 'reverse':
+        for row in rows:
+            source.emit('derivs.append(np.stack([%s], axis=-1))' % ', '.join(
+                '_full(%s, shape)' % (name if name is not None else '0.0') for name in row
+            ))
+    else:
+        for row in rows:
+            source.emit('derivs.append(_full(%s, shape + (%d,)))' % (
+                row if row is not None else '0.0', graph.n_inputs
+            ))
+
+    if scalar_output:
+        source.emit('values = values[0]')
+        source.emit('derivs = derivs[0]')
+    else:
+        source.emit('values = np.stack(values, axis=-1)')
+        source.emit('derivs = np.stack(derivs, axis=-2)')
+    if scalar_input:
+        source.emit('derivs = derivs[..., 0]')
+    source.emit('return values, derivs')
+
+    text = 'def kernel(x):\n' + '\n'.join(source.lines) + '\n'
+    return text, source.constants
+
+def compile_graph(graph, mode='reverse'):
+    '''
+    Compiles a traced Graph into a NumPy kernel, once per mode.
+
+    Args:
+        graph: a Graph, as returned by TracedFunction.graph()
+        mode: 'reverse' or 'forward', see generate()
+
+    Returns:
+        the kernel, a function of an array x whose last axis holds the inputs of the traced
+        function (no last axis for functions of a Number). It returns the values and the
+        derivatives at every point of x: the derivatives have the shape of the values
+        followed by the number of inputs (if the traced function takes an Array). The
+        generated source is in kernel.source.
+    '''
+    if mode not in graph.kernels:
+        text, constants = generate(graph, mode)
+        namespace = {'np': np, '_full': _full, **constants}
+        exec(compile(text, f'<autodiff kernel {mode}>', 'exec'), namespace)
+        kernel = namespace['kernel']
+        kernel.source = text
+        graph.kernels[mode] = kernel
+    return graph.kernels[mode]
+
+def kernel(func, example_input, mode='reverse'):
+    '''
+    Traces func and compiles it into a NumPy kernel for inputs shaped like example_input.
+
+    Args:
+        func: a function of a Number or of an Array, or a TracedFunction
+        example_input: an input to trace func with, its shape is the shape of one point
+        mode: 'reverse' or 'forward', see generate()
+
+    Returns:
+        the kernel, see compile_graph().
+
+    Example:
+        >>> from autodiff.codegen import kernel
+        >>> f = kernel(lambda x: x[0] * x[1], [1, 1])
+        >>> values, gradients = f([[1, 2], [3, 4]])
+        >>> gradients
+        array([[2., 1.],
+               [4., 3.]])
+    '''
+    if not isinstance(func, TracedFunction):
+        func = trace(func)
+    return compile_graph(func.graph(example_input), mode)
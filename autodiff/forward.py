@@ -0,0 +1,164 @@
+"""Function transformations in forward mode
+
+These build on the dense mode structures (``Tangent`` and ``DenseArray``) to evaluate
+derivatives of user functions with a single pass through them.
+"""
+
+import numpy as np
+from autodiff.structures import Number, Array, DenseArray, Tangent, TangentSpace, dense_variables, _values, _outputs
+
+def batch(func, points):
+    '''
+    Evaluates func and its gradient at a batch of points with a single call of func.
+    
+    Every input of func is a DenseArray holding its values at all the points, so each
+    elementary operation runs once over the whole batch rather than once per point.
+    
+    Args:
+        func: a scalar function of an Array, or of a Number when points is 1-d
+        points: an (N, d) array of N points with d inputs each, or an (N,) array of points
+            for a function of a single Number
+    
+    Returns:
+        values: an (N,) np.ndarray, the values of func at every point
+        gradients: an (N, d) np.ndarray, the gradients of func at every point ((N,) when
+            points is 1-d)
+    
+    Example:
+        >>> from autodiff.forward import batch
+        >>> values, gradients = batch(lambda x: x[0] * x[1], [[1, 2], [3, 4]])
+        >>> values
+        array([ 2., 12.])
+        >>> gradients
+        array([[2., 1.],
+               [4., 3.]])
+    '''
+    points = np.asarray(points, dtype=float)
+    scalar = points.ndim == 1
+    if scalar:
+        points = points[:, np.newaxis]
+    size, dims = points.shape
+
+    space = TangentSpace(dims)
+    variables = []
+    for slot in range(dims):
+        vec = np.zeros((size, dims))
+        vec[:, slot] = 1
+        variables.append(DenseArray(points[:, slot], Tangent(vec, space, slot)))
+
+    if scalar:
+        out = func(variables[0])
+    else:
+        out = func(Array(variables))
+
+    if isinstance(out, Number):
+        values = np.broadcast_to(out.val, (size,)).astype(float)
+        gradients = np.broadcast_to(out.jacobian(variables), (size, dims)).astype(float)
+    else:
+        # func doesn't depend on its input
+        values = np.full(size, out, dtype=float)
+        gradients = np.zeros((size, dims))
+
+    if scalar:
+        return values, gradients[:, 0]
+    return values, gradients
+
+def hessian(func, x):
+    '''
+    Evaluates the Hessian of func with nested (forward-over-forward) Numbers.
+    
+    The values of the outer Numbers are themselves dense mode Numbers, so the chain rule
+    of every elementary operation is differentiated again and second order partials 
+    propagate through all of autodiff.operations. The Hessian is symmetric, so column j
+    is only computed w.r.t. the inputs j, j+1, ..., d-1: each pair of inputs is 
+    differentiated once, d passes through func in total.
+    
+    Args:
+        func: a scalar function of an Array, or of a Number
+        x: the point to evaluate at, a Number, an int/float, or an iterable of them
+    
+    Returns:
+        a (d, d) np.ndarray, the Hessian of func at x. A float for scalar points.
+    
+    Example:
+        >>> from autodiff.forward import hessian
+        >>> hessian(lambda x: x[0] ** 2 * x[1], [1, 2])
+        array([[4., 2.],
+               [2., 0.]])
+    '''
+    values = _values(x)
+    scalar = not isinstance(values, list)
+    if scalar:
+        values = [values]
+    dims = len(values)
+
+    hess = np.zeros((dims, dims))
+    for j in range(dims):
+        # Inner Numbers: first derivatives w.r.t. the inputs j, ..., d-1
+        inner = list(values[:j]) + list(dense_variables(values[j:]))
+        # Outer Numbers: directional derivative along the input j
+        space = TangentSpace(1)
+        variables = [
+            Number(val, Tangent(np.array([float(i == j)]), space, 0 if i == j else None))
+            for i, val in enumerate(inner)
+        ]
+
+        out = func(variables[0] if scalar else Array(variables))
+        if not isinstance(out, Number):
+            # func doesn't depend on its input
+            continue
+        partial = out._deriv.vec[0]
+        if isinstance(partial, Number):
+            hess[j, j:] = partial.jacobian(inner[j:])
+            hess[j:, j] = hess[j, j:]
+
+    if scalar:
+        return hess[0, 0]
+    return hess
+
+def jvp(func, x, v):
+    '''
+    Evaluates the product of the Jacobian of func at x with the vector v (the directional
+    derivative of func along v), without forming the Jacobian.
+
+    The inputs carry the single direction v in dense mode, so the cost is about one
+    evaluation of func, whatever the number of inputs and outputs.
+
+    Args:
+        func: a function of a Number or of an Array, returning a Number or an iterable
+            (e.g. Array, tuple) of Numbers
+        x: the point to evaluate at, a Number, an int/float, or an iterable of them
+        v: the direction, of the same length as x
+
+    Returns:
+        a np.ndarray with one entry per output of func, the Jacobian of func at x times v.
+        A float for scalar functions.
+
+    Example:
+        >>> from autodiff.forward import jvp
+        >>> jvp(lambda x: (x[0] * x[1], x[0] + x[1]), [2, 3], [1, 0])
+        array([3., 1.])
+    '''
+    values = _values(x)
+    scalar = not isinstance(values, list)
+    if scalar:
+        values = [values]
+    directions = np.ravel(np.asarray(v, dtype=float))
+    if len(directions) != len(values):
+        raise ValueError('x and v must have the same length')
+
+    space = TangentSpace(1)
+    variables = [
+        Number(val, Tangent(np.array([direction]), space))
+        for val, direction in zip(values, directions)
+    ]
+    outputs, scalar_output = _outputs(func(variables[0] if scalar else Array(variables)))
+
+    product = np.zeros(len(outputs))
+    for i, out in enumerate(outputs):
+        if isinstance(out, Number):
+            product[i] = out._deriv.vec[0]
+
+    if scalar_output:
+        return product[0]
+    return product
@@ -0,0 +1,209 @@
+"""Line search satisfying the strong Wolfe conditions
+
+The optimizers move from a point x along a descent direction d by a step alpha chosen by
+``line_search()``. Along the direction, the objective is phi(alpha) = func(x + alpha d),
+and its derivative is the gradient of func at x + alpha d times d. Every trial step is
+evaluated once, within lazy(), so that the derivatives of default mode Numbers are only
+materialized at the steps that decrease func enough, where the slope decides whether to
+accept them. The evaluation of the accepted step is handed back to the optimizer, which
+starts its next iteration from it without evaluating func again.
+"""
+
+import numpy as np
+from autodiff.structures import _reseed, lazy
+
+class LineFunction():
+    '''
+    LineFunction is the objective of an optimizer along a search direction. It evaluates
+    func once per trial step, caching the point and the output, and computes the gradient
+    from that evaluation at the steps whose slope is needed.
+
+    Args:
+        func: the objective, a function of a Number or an Array returning a Number
+        x: the point to search from, a Number or an Array
+        direction: the search direction, a float or a np.ndarray
+        result: func(x), if already evaluated
+        gradient: the gradient of func at x, if already evaluated
+
+    Returns:
+        LineFunction, to be called with a step.
+    '''
+
+    def __init__(self, func, x, direction, result=None, gradient=None):
+        self.func = func
+        self.x = x
+        self.direction = direction
+        self.evaluations = 0
+        self._cache = {}
+        self._gradients = {}
+        if result is not None and gradient is not None:
+            self._cache[0.] = (x, result)
+            self._gradients[0.] = gradient
+
+    def __repr__(self):
+        '''
+        Overloads the print method to give a string representation of LineFunction object.
+
+        Returns:
+            a string specifiying the number of evaluations of func.
+        '''
+        return f'LineFunction(evaluations={self.evaluations})'
+
+    def _probe(self, alpha):
+        # Evaluates func at the step within lazy(), once per step
+        if alpha not in self._cache:
+            with lazy():
+                point = _reseed(self.x + alpha * self.direction)
+                result = self.func(point)
+            self._cache[alpha] = (point, result)
+            self.evaluations += 1
+        return self._cache[alpha]
+
+    def evaluate(self, alpha):
+        '''
+        Evaluates func at x + alpha * direction and its gradient, once per step.
+
+        Args:
+            alpha: the step
+
+        Returns:
+            the point, as a fresh Number or Array of fresh Numbers, func at the point and
+            the gradient of func at the point.
+        '''
+        point, result = self._probe(alpha)
+        if alpha not in self._gradients:
+            self._gradients[alpha] = np.array(result.jacobian(point), dtype=float)
+        return point, result, self._gradients[alpha]
+
+    def value(self, alpha):
+        '''
+        Returns phi(alpha), without computing the gradient of func at the step.
+        '''
+        return float(self._probe(alpha)[1].val)
+
+    def has_slope(self, alpha):
+        '''
+        Whether the gradient of func at the step is already known.
+        '''
+        return alpha in self._gradients
+
+    def __call__(self, alpha):
+        '''
+        Returns phi(alpha) and its derivative w.r.t. alpha.
+        '''
+        _, result, gradient = self.evaluate(alpha)
+        return float(result.val), float(np.dot(gradient, self.direction))
+
+def _interpolate(a, fa, da, b, fb, db=None):
+    '''
+    Minimizer of the cubic interpolating phi and its derivative at a and b, or of the
+    quadratic interpolating phi at a and b and its derivative at a when db is unknown,
+    kept away from the ends of the interval (bisection when there's no minimizer there).
+    '''
+    lo, hi = min(a, b), max(a, b)
+    margin = 0.1 * (hi - lo)
+    if db is None:
+        curvature = fb - fa - da * (b - a)
+        if curvature > 0:
+            alpha = a - da * (b - a) ** 2 / (2 * curvature)
+            if lo + margin <= alpha <= hi - margin:
+                return alpha
+        return (a + b) / 2
+    d1 = da + db - 3 * (fa - fb) / (a - b)
+    square = d1 ** 2 - da * db
+    if square >= 0:
+        d2 = np.sign(b - a) * np.sqrt(square)
+        denominator = db - da + 2 * d2
+        if denominator != 0:
+            alpha = b - (b - a) * (db + d2 - d1) / denominator
+            if lo + margin <= alpha <= hi - margin:
+                return alpha
+    return (a + b) / 2
+
+def line_search(func, x, direction, result=None, gradient=None, alpha=1., c1=10**-4, c2=0.9,
+                max_alpha=10**6, iterations=20):
+    '''
+    Finds a step along a descent direction satisfying the strong Wolfe conditions: a
+    sufficient decrease of the objective, and a small enough slope at the step. When the
+    trial steps run out, the step only satisfies the sufficient decrease condition. When
+    no step is found to decrease func enough (e.g. its decrease is below rounding error),
+    the search fails and returns the step 0. Trial steps are evaluated within lazy(), and
+    their gradient is only computed when they satisfy the sufficient decrease condition.
+
+    Args:
+        func: the objective, a function of a Number or an Array returning a Number
+        x: the point to search from, a Number or an Array
+        direction: the search direction, a float or a np.ndarray
+        result: func(x), if already evaluated
+        gradient: the gradient of func at x, if already evaluated
+        alpha: the first step to try
+        c1: the constant of the sufficient decrease condition
+        c2: the constant of the curvature condition, between c1 and 1
+        max_alpha: the largest step to try
+        iterations: the maximum number of trial steps in each phase of the search
+
+    Returns:
+        alpha: the step, 0. if the search failed
+        point: x + alpha * direction, as fresh Numbers (x itself if the search failed)
+        result: func at point
+        gradient: the gradient of func at point
+        evaluations: the number of evaluations of func
+
+    Example:
+        >>> from autodiff.structures import Number
+        >>> from autodiff.line_search import line_search
+        >>> alpha, point, result, gradient, evaluations = line_search(
+        ...     lambda x: (x - 3) ** 2, Number(0), 3.)
+        >>> alpha, result.val, evaluations
+        (1.0, 0.0, 2)
+    '''
+    phi = LineFunction(func, x, direction, result, gradient)
+    value0, slope0 = phi(0.)
+    if not slope0 < 0:
+        raise ValueError('The direction is not a descent direction')
+
+    def _zoom(lo, hi):
+        # lo satisfies the sufficient decrease condition, the minimizer lies between lo and hi
+        for _ in range(iterations):
+            if lo == hi:
+                break
+            value_lo, slope_lo = phi(lo)
+            slope_hi = phi(hi)[1] if phi.has_slope(hi) else None
+            step = _interpolate(lo, value_lo, slope_lo, hi, phi.value(hi), slope_hi)
+            value = phi.value(step)
+            if value > value0 + c1 * step * slope0 or value >= value_lo:
+                hi = step
+            else:
+                slope = phi(step)[1]
+                if abs(slope) <= -c2 * slope0:
+                    return step
+                if slope * (hi - lo) >= 0:
+                    hi = lo
+                lo = step
+        return lo
+
+    previous = 0.
+    for i in range(iterations):
+        value = phi.value(alpha)
+        if value > value0 + c1 * alpha * slope0 or (i > 0 and value >= phi.value(previous)):
+            alpha = _zoom(previous, alpha)
+            break
+        slope = phi(alpha)[1]
+        if abs(slope) <= -c2 * slope0:
+            break
+        if slope >= 0:
+            alpha = _zoom(alpha, previous)
+            break
+        if alpha >= max_alpha:
+            break
+        previous, alpha = alpha, min(2 * alpha, max_alpha)
+    else:
+        # The last step checked satisfies the sufficient decrease condition
+        alpha = previous
+
+    if alpha > 0 and not phi.value(alpha) < value0:
+        # The decrease is lost to rounding error, the sufficient decrease test can't tell
+        alpha = 0.
+
+    point, result, gradient = phi.evaluate(alpha)
+    return alpha, point, result, gradient, phi.evaluations
@@ -2,7 +2,8 @@
 """
 
 from functools import wraps
-from autodiff.structures import Number, Array
+from autodiff import structures
+from autodiff.structures import Number, Array, Derivative, Tangent, DenseArray, Lazy
 import numpy as np
 
 
@@ -29,32 +30,250 @@ def elementary(deriv_func):
 
     
     Args:
-        deriv_func (function): Function specifying the derivative of this function. Must return a dictionary where each key-value pair is the partial derivative of the decorated function
+        deriv_func (function): Function specifying the derivative of this function. Must return the derivative of the decorated function in the representation of its inputs' derivatives (a dictionary of partial derivatives, or a ``Derivative`` such as the ``Tangent`` of dense mode). ``_chain`` builds it from the local partial derivatives
     
     Returns:
         function: Decorated function
     """
 
     def inner(func):
-        @wraps(func)
-        def inner_func(*args, **kwargs):
-            # Check if args[0] has len. If so, apply the function elementwise and return an array
-            # rather than a Number
-            try:
-                value = func(*args, **kwargs)
-                deriv = deriv_func(*args, **kwargs)
-                return Number(value, deriv)
+        def evaluate(*args, **kwargs):
+            return func(*args, **kwargs), deriv_func(*args, **kwargs)
+        return _operation(func, evaluate, func)
+    return inner
 
-            except AttributeError:
+def fused(kernel):
+    """Decorator to create an elementary operation from a fused kernel
 
-                vals = [func(element, *args[1:], **kwargs) for element in args[0]]
-                derivs = [deriv_func(element, *args[1:], **kwargs) for element in args[0]]
-                numbers = [Number(val, deriv) for val, deriv in zip(vals, derivs)]
-                return Array(numbers)
+    The kernel takes the values of the operands and returns both the value of the operation
+    and its local partial derivatives, so they can share intermediate results (e.g. ``exp``
+    is its own derivative). The chain rule is applied with ``_chain``, so the operation
+    works in every mode like the ones created with ``@elementary``.
 
+    Example:
+        >>> import numpy as np
+        >>> @fused
+        ... def exp2(x):
+        ...     value = np.exp2(x)
+        ...     return value, value * np.log(2)
+        >>> a = Number(3)
+        >>> exp2(a).val
+        8.0
+        >>> exp2(a).jacobian(a)
+        5.545177444479562
 
-        return inner_func
-    return inner
+    Args:
+        kernel (function): Function of the values of the operands, returning the value of
+            the operation and its partial derivative w.r.t. each operand: a single partial
+            for one operand, a tuple in the order of the positional then keyword operands
+            otherwise. The first operand has to be a Number (or an Array, to apply the
+            operation elementwise)
+
+    Returns:
+        function: Decorated function
+    """
+    def evaluate(*args, **kwargs):
+        if len(args) == 1 and not kwargs:
+            # Fast path for unary operations
+            value, partials = kernel(args[0].val)
+        elif kwargs:
+            value, partials = kernel(
+                args[0].val, *[_val(arg) for arg in args[1:]],
+                **{key: _val(arg) for key, arg in kwargs.items()}
+            )
+            args = args + tuple(kwargs.values())
+        else:
+            value, partials = kernel(args[0].val, *[_val(arg) for arg in args[1:]])
+        if not isinstance(partials, tuple):
+            return value, _chain((args[0], partials))
+        return value, _chain(*zip(args, partials))
+
+    def value(*args, **kwargs):
+        return kernel(
+            args[0].val, *[_val(arg) for arg in args[1:]],
+            **{key: _val(arg) for key, arg in kwargs.items()}
+        )[0]
+    return _operation(kernel, evaluate, value)
+
+def _operation(func, evaluate, value):
+    """Wraps the evaluation of an elementary operation into the operation itself
+    
+    Args:
+        func: the function to take the name, docstring and signature from
+        evaluate: function of the operands returning the value and derivative of the
+            operation
+        value: function of the operands returning the value only, for ``no_grad()``
+    
+    Returns:
+        function: the elementary operation, dispatched on the type of its first operand
+    """
+    @wraps(func)
+    def inner_func(*args, **kwargs):
+        kind = type(args[0])
+        handler = _handlers.get(kind)
+        if handler is None:
+            handler = _handler(kind)
+        return handler(inner_func, evaluate, args, kwargs)
+
+    # The value and derivative of the operation, for replaying it without the dispatch above
+    inner_func.evaluate = evaluate
+    inner_func.value = value
+    return inner_func
+
+def _value_only(value, dense=False):
+    """Wraps the value of an elementary operation evaluated within ``no_grad()``, in a
+    DenseArray for whole-array operations on a DenseArray (dense is True)
+    """
+    if dense and np.ndim(value) > 0:
+        result = DenseArray.__new__(DenseArray)
+        value = np.asarray(value, dtype=float)
+    else:
+        result = Number.__new__(Number)
+    result.val = value
+    result._deriv = {}
+    return result
+
+def _apply(op, evaluate, args, kwargs):
+    """Applies an elementary operation to a Number (or a constant first operand)
+    """
+    if structures._no_grad:
+        dense = any(isinstance(arg, DenseArray) for arg in args)
+        return _value_only(op.value(*args, **kwargs), dense)
+    result = _result(*evaluate(*args, **kwargs))
+    if _recorders:
+        _recorders[-1].record(op, args, kwargs, result)
+    return result
+
+def _elementwise(op, evaluate, args, kwargs):
+    """Applies an elementary operation to every element of an Array (or other iterable)
+    """
+    if structures._no_grad:
+        return Array([_value_only(op.value(element, *args[1:], **kwargs)) for element in args[0]])
+    numbers = [Number(*evaluate(element, *args[1:], **kwargs)) for element in args[0]]
+    if _recorders:
+        for element, number in zip(args[0], numbers):
+            _recorders[-1].record(op, (element, *args[1:]), kwargs, number)
+    return Array(numbers)
+
+# How elementary operations treat their first operand, by type. Subclasses of registered
+# types are resolved through their MRO once and cached
+_handlers = {
+    Number: _apply,
+    int: _apply,
+    float: _apply,
+    np.number: _apply,
+    Array: _elementwise,
+    np.ndarray: _elementwise,
+    list: _elementwise,
+    tuple: _elementwise,
+}
+_registered = dict(_handlers)
+
+def _handler(kind):
+    """Resolves and caches the handler of a type that wasn't seen yet
+    """
+    handler = next((_registered[base] for base in kind.__mro__ if base in _registered), _apply)
+    _handlers[kind] = handler
+    return handler
+
+def register_type(kind, elementwise=False):
+    """Registers how elementary operations treat a first operand of a new type
+
+    Example:
+        >>> from collections import deque
+        >>> register_type(deque, elementwise=True)
+        >>> sin(deque([Number(0), Number(0)]))
+        Array([Number(val=0.0) Number(val=0.0)])
+
+    Args:
+        kind (type): the type of the operand, and its subclasses
+        elementwise (bool): True to apply the operations to every element of the operand
+            and return an Array, False to pass the operand to the operation as it is (e.g.
+            for a Number-like type)
+    """
+    _registered[kind] = _elementwise if elementwise else _apply
+    # Drop the resolved subclasses, they may resolve to the new registration now
+    _handlers.clear()
+    _handlers.update(_registered)
+
+# Recorders of the elementary operations being evaluated (see autodiff.tracing)
+_recorders = []
+
+def _result(value, deriv):
+    """Wraps the value and derivative of an elementary operation
+    
+    Args:
+        value: value of the operation
+        deriv: derivative of the operation, as returned by its deriv_func
+    
+    Returns:
+        a DenseArray for whole-array operations in dense mode, a Number otherwise
+    """
+    if isinstance(deriv, Tangent) and np.ndim(value) > 0:
+        # Whole-array operation on a DenseArray
+        return DenseArray(value, deriv)
+    return Number(value, deriv)
+
+def _val(x):
+    """Value of an operand of an elementary operation
+    
+    Args:
+        x: a Number object or an int/float
+    
+    Returns:
+        x.val if x is a Number, x otherwise
+    """
+    if isinstance(x, Number):
+        return x.val
+    return x
+
+def _chain(*terms):
+    """Chain rule: combines the derivatives of the operands of an elementary operation
+    
+    Operands that aren't Number objects are constants and don't contribute. Derivatives other
+    than dicts (e.g. the ``Tangent`` of dense mode) apply the chain rule themselves. Within
+    ``structures.lazy()``, dicts aren't merged but recorded in a ``Lazy`` derivative.
+    
+    Args:
+        terms: (operand, partial) pairs, where partial is the partial derivative of the
+            elementary operation w.r.t. operand
+    
+    Returns:
+        The derivative of the elementary operation: a dictionary of partial derivatives, 
+        or a Derivative of the same type as the operands'
+    """
+    terms = [(x._deriv, partial) for x, partial in terms if isinstance(x, Number)]
+
+    if len(terms) == 1:
+        # Fast path for operations with a single Number operand
+        deriv, partial = terms[0]
+        if type(deriv) is dict:
+            if structures._lazy:
+                return Lazy(terms)
+            return {key: partial * value for key, value in deriv.items()}
+        if isinstance(deriv, Derivative):
+            return type(deriv).chain(terms)
+
+    if all(isinstance(deriv, dict) for deriv, _ in terms):
+        if structures._lazy:
+            return Lazy(terms)
+        d = {}
+        for deriv, partial in terms:
+            for key, value in deriv.items():
+                if key in d:
+                    d[key] = d[key] + partial * value
+                else:
+                    d[key] = partial * value
+        return d
+
+    kind = type(terms[0][0])
+    if issubclass(kind, Derivative) and all(type(deriv) is kind for deriv, _ in terms):
+        return kind.chain(terms)
+    if all(type(deriv) in (dict, Lazy) for deriv, _ in terms):
+        # Lazy derivatives stay lazy when combined with dicts
+        return Lazy(terms)
+
+    raise TypeError('Cannot combine the derivatives of Numbers in different modes')
 
 def add_deriv(x,y):
     """Derivative of additions, one of x and y has to be a Number object
@@ -66,19 +285,7 @@ def add_deriv(x,y):
     Returns:
         The derivative of the sum of x and y
     """
-    try:
-        d={}
-        for key in x._deriv.keys():
-            if key in y._deriv.keys():
-                d[key] = x._deriv[key] + y._deriv[key]
-            else:
-                d[key] = x._deriv[key]
-        for key in y._deriv.keys():
-            if not key in x._deriv.keys():
-                d[key] = y._deriv[key]
-    except AttributeError:
-        d = x._deriv
-    return d
+    return _chain((x, 1), (y, 1))
 
 @elementary(add_deriv)
 def add(x,y):
@@ -91,11 +298,7 @@ def add(x,y):
     Returns:
         value of the sum
     """
-    try:
-        s = x.val + y.val
-    except:
-        s = x.val + y
-    return s
+    return _val(x) + _val(y)
 
 def subtract_deriv(x,y):
     """Derivative of subtractions, one of x and y has to be a Number object
@@ -107,19 +310,7 @@ def subtract_deriv(x,y):
     Returns:
         The derivative of the difference of x and y
     """
-    try:
-        d={}
-        for key in x._deriv.keys():
-            if key in y._deriv.keys():
-                d[key] = x._deriv[key] - y._deriv[key]
-            else:
-                d[key] = x._deriv[key]
-        for key in y._deriv.keys():
-            if not key in x._deriv.keys():
-                d[key] = -y._deriv[key]
-    except AttributeError:
-        d = x._deriv
-    return d
+    return _chain((x, 1), (y, -1))
 
 @elementary(subtract_deriv)
 def subtract(x,y):
@@ -132,11 +323,7 @@ def subtract(x,y):
     Returns:
         value of the difference
     """
-    try:
-        s = x.val - y.val
-    except:
-        s = x.val - y
-    return s
+    return _val(x) - _val(y)
 
 def mul_deriv(x,y):
     """Derivative of multiplication, one of x and y has to be a Number object
@@ -148,24 +335,11 @@ def mul_deriv(x,y):
     Returns:
         The derivative of the product of x and y
     """
-    if (x==y):
+    # Squaring, by identity: comparing the values and derivatives would cost a copy of both
+    if x is y:
         return pow_deriv(x,2)
-    try:
-        d={}
-        for key in x._deriv.keys():
-            if key in y._deriv.keys():
-                #product rule
-                d[key] = x._deriv[key] * y.val + y._deriv[key] * x.val
-            else:
-                d[key] = x._deriv[key] * y.val
-        for key in y._deriv.keys():
-            if not key in x._deriv.keys():
-                d[key] = y._deriv[key] * x.val
-    except AttributeError:
-        d = {}
-        for key in x._deriv.keys():
-            d[key] = x._deriv[key]*y
-    return d
+    #product rule
+    return _chain((x, _val(y)), (y, _val(x)))
 
 @elementary(mul_deriv)
 def mul(x,y):
@@ -178,11 +352,7 @@ def mul(x,y):
     Returns:
         value of the difference
     """
-    try:
-        s = x.val * y.val
-    except AttributeError:
-        s = x.val * y
-    return s
+    return _val(x) * _val(y)
 
 def div_deriv(x,y):
     """Derivative of division, one of x and y has to be a Number object
@@ -194,22 +364,8 @@ def div_deriv(x,y):
     Returns:
         The derivative of the quotient of x and y
     """
-    try:
-        d={}
-        for key in x._deriv.keys():
-            if key in y._deriv.keys():
-                #quotient rule
-                d[key] = (-y._deriv[key] * x.val + x._deriv[key] * y.val)/(y.val**2)
-            else:
-                d[key] = x._deriv[key] / y.val
-        for key in y._deriv.keys():
-            if not key in x._deriv.keys():
-                d[key] = -x.val / (y.val ** 2) * y._deriv[key]
-    except AttributeError:
-        d = {}
-        for key in x._deriv.keys():
-            d[key] = x._deriv[key] / y
-    return d
+    #quotient rule
+    return _chain((x, 1 / _val(y)), (y, -_val(x) / _val(y) ** 2))
 
 @elementary(div_deriv)
 def div(x,y):
@@ -222,11 +378,7 @@ def div(x,y):
     Returns:
         value of the difference
     """
-    try:
-        s = x.val / y.val
-    except AttributeError:
-        s = x.val / y
-    return s
+    return _val(x) / _val(y)
 
 
 def pow_deriv(x, a):
@@ -239,38 +391,15 @@ def pow_deriv(x, a):
     Returns:
         The derivative of the power
     """
-    d = {}
-
-    # All the derivates w.r.t x
-    try:
-        for key in x._deriv.keys():
-            if key in a._deriv.keys():
-                # Using the chain rule for powers
-                d[key] = (((a.val * x._deriv[key]) / x.val) + (a._deriv[key] * np.log(x.val))) * (x.val ** a.val)
-            else:
-                d[key] = a.val * x.val ** (a.val - 1) * x._deriv[key]
-    except AttributeError:
-        try:
-            for key in x._deriv.keys():
-                d[key] = a * x.val ** (a - 1) * x._deriv[key]
-        except AttributeError:
-            # x isn't a Number(). Just go through
-            pass
-
-    # All the derivatives w.r.t a
-    try:
-        for key in a._deriv.keys():
-            if key not in x._deriv.keys():
-                d[key] = x.val ** a.val * np.log(x.val) * a._deriv[key]
-    except AttributeError:
-        try:
-            for key in a._deriv.keys():
-                d[key] = x ** a.val * np.log(x) * a._deriv[key]
-        except AttributeError:
-            # a isn't a Number(). Just go through
-            pass
-
-    return d
+    terms = []
+    # The derivative w.r.t x
+    if isinstance(x, Number):
+        terms.append((x, _val(a) * x.val ** (_val(a) - 1)))
+    # The derivative w.r.t a. Only taken when a is a Number, so that constant powers of
+    # negative numbers don't need a log
+    if isinstance(a, Number):
+        terms.append((a, _val(x) ** a.val * np.log(_val(x))))
+    return _chain(*terms)
 
 @elementary(pow_deriv)
 def power(x,y):
@@ -283,403 +412,179 @@ def power(x,y):
     Returns:
         value of the difference
     """
-    # return x.val**y
-    try:
-        return x.val ** y.val
-    except AttributeError:
-        try:
-            return x ** y.val
-        except AttributeError:
-            return x.val ** y
-            # except AttributeError:
-            #     return x ** y
+    return _val(x) ** _val(y)
 
-def sin_deriv(x):
-    """Derivative of sin(x)
-    
-    Args:
-        x (structures.Number()): Number to take the sin of. Must have a ``deriv`` attribute
-    
-    Returns:
-        dict: dictionary of partial derivatives
-    """
-    d={}
-    for key in x._deriv.keys():
-        d[key] = np.cos(x.val) * x._deriv[key]
-    d[x] = np.cos(x.val) * x._deriv[x]
-    return d
-
-@elementary(sin_deriv)
+@fused
 def sin(x):
     """Take the sin(x)
     
     Args:
-        x (Number): Number to take the sin of
+        x: value to take the sin of
     
     Returns:
-        float: sin(x.val)
+        sin(x) and its derivative
     """
-    return np.sin(x.val)
+    return np.sin(x), np.cos(x)
 
-def cos_deriv(x):
-    """Derivative of cos(x)
-    
-    Args:
-        x (structures.Number()): Number to take the cos of. Must have a ``deriv`` attribute
-    
-    Returns:
-        dict: dictionary of partial derivatives
-    """
-    d={}
-    for key in x._deriv.keys():
-        d[key] = -np.sin(x.val) * x._deriv[key]
-    d[x] = -np.sin(x.val) * x._deriv[x]
-    return d
-
-@elementary(cos_deriv)
+@fused
 def cos(x):
     """Take the cos(x)
     
     Args:
-        x (Number): Number to take the cos of
-    
-    Returns:
-        float: cos(x.val)
-    """
-    return np.cos(x.val)
-
-def tan_deriv(x):
-    """Derivative of tan(x)
-
-    Args: 
-        x (structures.Numbers()): Number to take the tan of. Must have a ``deriv`` attribute
+        x: value to take the cos of
     
     Returns:
-        dict: dictionary of partial derivatives
+        cos(x) and its derivative
     """
-    d={}
-    for key in x._deriv.keys():
-        d[key] = (np.tan(x.val)**2 + 1) * x._deriv[key]
-    d[x] = (np.tan(x.val)**2 + 1) * x._deriv[x]
-    return d
+    return np.cos(x), -np.sin(x)
 
-@elementary(tan_deriv)
+@fused
 def tan(x):
     """Take the tan(x)
 
     Args:
-        x (Number): Number to take the tan of
-
-    Returns:
-        float: tan(x.val)
-    """
-    return np.tan(x.val)
+        x: value to take the tan of
 
-def exp_deriv(x):
-    """Derivative of exp(x)
-    
-    Args:
-        x (structures.Number()): Number to take the exp of. Must have a ``deriv`` attribute
-    
     Returns:
-        dict: dictionary of partial derivatives
+        tan(x) and its derivative
     """
-    d={}
-    for key in x._deriv.keys():
-        d[key] = np.exp(x.val) * x._deriv[key]
-    d[x] = np.exp(x.val) * x._deriv[x]
-    return d
+    value = np.tan(x)
+    return value, value ** 2 + 1
 
-@elementary(exp_deriv)
+@fused
 def exp(x):
     """Take the exp(x)
     
     Args:
-        x (Number): Number to take the exp of
-    
-    Returns:
-        float: exp(x.val)
-    """
-    return np.exp(x.val)
-
-def log_deriv(x, y=np.exp(1)):
-    """Derivative of log(x) at base y
-    
-    Args:
-        x (structures.Number()): Number to take the log of. Must have a ``deriv`` attribute
-        y (a Number object or an int/float): Base of the logarithm.
+        x: value to take the exp of
     
     Returns:
-        dict: dictionary of partial derivatives
+        exp(x) and its derivative, the same value
     """
-    d = {}
-    # Use the chain rule to find partials w.r.t everything x depends on
-    for key in x._deriv.keys():
-        d[key] = 1 / (x.val) * x._deriv[key]
-
-    try:
-        d[x] = 1 / (x.val * np.log(y.val))
-    except AttributeError:
-        d[x] = 1 / (x.val * np.log(y))
+    value = np.exp(x)
+    return value, value
 
-    return d
-
-@elementary(log_deriv)
+@fused
 def log(x, y=np.exp(1)):
     """Take the log(x) at base y
     
     Args:
-        x (Number): Number to take the log of
-        y (a Number object or an int/float): Base of the logarithm.
+        x: value to take the log of
+        y: base of the logarithm
     
     Returns:
-        float: log(x.val)
+        log(x) at base y, and its partial derivatives w.r.t. x and y
     """
-    try:
-        s = np.log(x.val) / np.log(y.val)
-    except AttributeError:
-        s = np.log(x.val) / np.log(y)
-    return s
+    log_x, log_y = np.log(x), np.log(y)
+    return log_x / log_y, (1 / (x * log_y), -log_x / (y * log_y ** 2))
 
-def negate_deriv(x):
-    '''Derivatives of the elementary negation function
-    
-    Args:
-        x (Number): Number to be negated
-        
-    Returns:
-        dictionary: the partial derivatives of the negated Number
-    '''
-    return {key: -deriv for key, deriv in x._deriv.items()}
-
-@elementary(negate_deriv)
+@fused
 def negate(x):
     """Negate
     
     Args:
-        x (Number): Negate a number
-    
-    Returns:
-        Number: -x
-    """
-    return - x.val
-
-def logistic_deriv(x):
-    """Derivative of logistic(x)
-    
-    Args:
-        x (structures.Number()): Number to the natural exponential in the logistic function.
-        Must have a ``deriv`` attribute
+        x: value to negate
     
     Returns:
-        dict: dictionary of partial derivatives
+        -x and its derivative
     """
-    d = {}
-    for key in x._deriv.keys():
-        d[key] = -(1+np.exp(-x.val))**-2*(-np.exp(-x.val)) * x._deriv[key]
-    d[x] = -(1+np.exp(-x.val))**-2*(-np.exp(-x.val)) * x._deriv[x]
-
-    return d
+    return -x, -1
 
-
-@elementary(logistic_deriv)
+@fused
 def logistic(x):
     """Take the logistic(x) 
     
     Args:
-        x (Number): Number to the natural exponential in the logistic
+        x: value to take the logistic of
     
     Returns:
-        float: logistic(x.val)
+        logistic(x) and its derivative
     """
-    return 1.0/(1.0+np.exp(-x.val))
-
-
-def asin_deriv(x):
-    """Arcsin derivative
-    
-    Args:
-        x (Number): Value
-    
-    Returns:
-        dict: Partial derivatives w.r.t. everything x had a partial w.r.t.
-    """
-    d = {}
-
-    for key in x._deriv.keys():
-        d[key] = 1 / np.sqrt(-x.val ** 2 + 1) * x._deriv[key]
+    value = 1.0 / (1.0 + np.exp(-x))
+    return value, value * (1.0 - value)
 
-    # return 1 / np.sqrt(-x ** 2 + 1)
-    return d
-
-@elementary(asin_deriv)
+@fused
 def asin(x):
     """Arcsin
     
     Args:
-        x (Number): Value
-    
-    Returns:
-        Number: asin(x)
-    """
-    return np.arcsin(x.val)
-
-def acos_deriv(x):
-    """Derivative of arccos
-    
-    Args:
-        x (Number): Value
+        x: Value
     
     Returns:
-        dict: Partial derivatives w.r.t. everything x had a partial w.r.t.
+        asin(x) and its derivative
     """
-    d = {}
-    for key in x._deriv.keys():
-        d[key] = -1 / np.sqrt(-x.val ** 2 + 1) * x._deriv[key]
-
-    return d
+    return np.arcsin(x), 1 / np.sqrt(-x ** 2 + 1)
 
-@elementary(acos_deriv)
+@fused
 def acos(x):
     """Arccos
     
     Args:
-        x (Number): Value
+        x: Value
     
     Returns:
-        Number: acos(x)
+        acos(x) and its derivative
     """
-    return np.arccos(x.val)
+    return np.arccos(x), -1 / np.sqrt(-x ** 2 + 1)
 
-def atan_deriv(x):
-    """Derivative of atan
-    
-    Args:
-        x (Number): Value
-    
-    Returns:
-        dict: Partial derivatives w.r.t. everything x had a partial w.r.t.
-    """
-    d = {}
-    for key in x._deriv.keys():
-        d[key] = 1 / (x.val ** 2 + 1) * x._deriv[key]
-    return d
-
-@elementary(atan_deriv)
+@fused
 def atan(x):
     """Arctan
     
     Args:
-        x (Number): Value
+        x: Value
     
     Returns:
-        Number: atan(x)
+        atan(x) and its derivative
     """
-    return np.arctan(x.val)
+    return np.arctan(x), 1 / (x ** 2 + 1)
 
-def cosh_deriv(x):
-    """Hyperbolic cosine
-    
-    Args:
-        x (Number): Value
-    
-    Returns:
-        dict: Partial derivatives w.r.t. everything x had a partial w.r.t.
-    """
-    d = {}
-    for key in x._deriv.keys():
-        d[key] = np.sinh(x.val) * x._deriv[key]
-    return d
-
-@elementary(cosh_deriv)
+@fused
 def cosh(x):
     """Hyperbolic cosine
     
     Args:
-        x (Number): Value
+        x: Value
     
     Returns:
-        Number: cosh(x)
+        cosh(x) and its derivative
     """
-    return np.cosh(x.val)
+    return np.cosh(x), np.sinh(x)
 
-def sinh_deriv(x):
-    """Hyperbolic sin derivative
-    
-    Args:
-        x (Number): Value
-    
-    Returns:
-        dict: Partial derivatives w.r.t. everything x had a partial w.r.t.
-    """
-    d = {}
-    for key in x._deriv.keys():
-        d[key] = np.cosh(x.val) * x._deriv[key]
-    return d
-
-@elementary(sinh_deriv)
+@fused
 def sinh(x):
     """Hyperbolic sine
     
     Args:
-        x (Number): Value
-    
-    Returns:
-        Number: sinh(x)
-    """
-    return np.sinh(x.val)
-
-def tanh_deriv(x):
-    """Hyperbolic tan derivative
-    
-    Args:
-        x (Number): Value
+        x: Value
     
     Returns:
-        dict: Partial derivatives w.r.t. everything x had a partial w.r.t.
+        sinh(x) and its derivative
     """
-    d = {}
-    for key in x._deriv.keys():
-        d[key] = -np.tanh(x.val) ** 2 + 1
-    return d
+    return np.sinh(x), np.cosh(x)
 
-@elementary(tanh_deriv)
+@fused
 def tanh(x):
     """Hyperbolic tan
     
     Args:
-        x (Number): Value
+        x: Value
     
     Returns:
-        Number: tanh(x)
+        tanh(x) and its derivative
     """
-    return np.tanh(x.val)
+    value = np.tanh(x)
+    return value, -value ** 2 + 1
 
-def sqrt_deriv(x):
-    '''Derivative of the square root function
-    
-    Args:
-        x(Number): Number to take the square root of
-    
-    Returns:
-        dictionary: the partial derivatives of the square root of number
-    '''
-    d = {}
-    for key in x._deriv.keys():
-        # d[key] = (1 / 2) * 1 / np.sqrt(x.deriv[key])
-        d[key] = 1 / (2 * np.sqrt(x.val)) * x._deriv[key]
-
-    return d
-
-@elementary(sqrt_deriv)
+@fused
 def sqrt(x):
     '''Square root of a number
     
     Args:
-        x(Number): Number to take the square root of
+        x: value to take the square root of
         
     Returns:
-        float: the square root of Number x's value
+        the square root of x and its derivative
     '''
-    return np.sqrt(x.val)
-
+    value = np.sqrt(x)
+    return value, 1 / (2 * value)
@@ -4,7 +4,39 @@ sys.path.append('..')
 import autodiff.operations as operations
 from autodiff.structures import Number
 from autodiff.structures import Array
+from autodiff.structures import _reseed
 import numpy as np
+from collections import deque
+from autodiff.line_search import line_search
+
+def _update_inverse_hessian(H, s, y, buffer=None):
+    """Applies the BFGS update to an approximation of the inverse Hessian, in place
+
+    H <- (I - rho s y^T) H (I - rho y s^T) + rho s s^T with rho = 1 / (y^T s), expanded for
+    a symmetric H into two outer products, so it costs O(n^2) whatever the dimension. The
+    outer products are written into buffer, so no n x n array is allocated when it's given.
+
+    Args:
+        H: the approximation of the inverse Hessian, a symmetric np.ndarray of shape (n, n)
+        s: the step, x1 - x0
+        y: the change of the gradient, g1 - g0
+        buffer: a np.ndarray of the shape of H to reuse across updates, allocated when None
+
+    Returns:
+        True if H was updated, False if the update was skipped because the curvature
+        condition y^T s > 0 doesn't hold (the update would not be positive definite).
+    """
+    sy = np.dot(s, y)
+    if not sy > 1e-10 * np.linalg.norm(s) * np.linalg.norm(y):
+        return False
+    rho = 1 / sy
+    Hy = H @ y
+    coefficient = rho * (1 + rho * np.dot(y, Hy))
+    if buffer is None:
+        buffer = np.empty_like(H)
+    H -= np.multiply.outer(rho * Hy, s, out=buffer)
+    H -= np.multiply.outer(s, rho * Hy - coefficient * s, out=buffer)
+    return True
 
 def bfgs_symbolic(func,gradient, initial_guess,iterations =100,tolerance=10**-8,verbose=False):
     """Use symbolic BFGS method to find the local minimum/maxinum of the function
@@ -26,46 +58,25 @@ def bfgs_symbolic(func,gradient, initial_guess,iterations =100,tolerance=10**-8,
     try:
         jacobians = []
 
+        x0 = initial_guess
+        #initial guess of hessian
+        # This will give an error if initial_guess is a scalar
+        H = np.identity(len(x0))
+        buffer = np.empty_like(H)
         for i in range(iterations):
-
-            if i == 0:
-                
-                x0 = initial_guess
-                #initial guess of hessian
-                # This will give an error if initial_guess is a scalar
-                H = np.identity(len(x0))
-            else:
-                x0 = x1
-                H = deltaH
             if verbose:
                 print(i,x0,func(x0))
-            fxn0 = np.array(func(x0))
-            fpxn0 = np.array(gradient(x0))    
+            fpxn0 = np.array(gradient(x0), dtype=float)
             jacobians.append(fpxn0)
             if np.linalg.norm(fpxn0)<tolerance:
                 #optimization condition is met
                 break
-                
-            s = -np.dot(H,fpxn0) #np.array multiply with scalar would be fine
-            x1 = x0 + s
-            fxn1 = func(x1)
-            fpxn1 = gradient(x1)
-            y = np.array(fpxn1 - fpxn0)
-            rho0 = 1/(np.dot(y.T,s))
-            rhokykT = rho0*y.T
-            skrhokykT = np.dot(s.reshape([len(x0),1]),rhokykT.reshape([1,len(x0)]))
-
-            ykskT = np.dot(np.reshape(y,[len(x0),1]),s.reshape([len(x0),1]).T)
-
-            rhokykskT = rho0*ykskT
-
-            skskT = np.dot(s.reshape([len(x0),1]),s.reshape([len(x0),1]).T)
-
-            rhokskskT = rho0*skskT
-
-            #define delta H
-            deltaH = np.dot((np.identity(2)-skrhokykT),np.dot(H,(np.identity(2)-rhokykskT)))+rhokskskT
 
+            s = -(H @ fpxn0)
+            x1 = x0 + s
+            y = np.array(gradient(x1), dtype=float) - fpxn0
+            _update_inverse_hessian(H, s, y, buffer)
+            x0 = x1
 
         return x0, func(x0), jacobians
     except TypeError:
@@ -118,7 +129,7 @@ def bfgs_symbolic(func,gradient, initial_guess,iterations =100,tolerance=10**-8,
 
         return x0,func(x0),jacobians
 
-def bfgs(func, initial_guess,iterations =100,tolerance = 10**-8,verbose = False):
+def bfgs(func, initial_guess,iterations =100,tolerance = 10**-8,verbose = False,count_evaluations=False):
     """Use AD BFGS method to find the local minimum/maxinum of the function
     Args:
         func: the function that the user wants to optimize
@@ -126,16 +137,18 @@ def bfgs(func, initial_guess,iterations =100,tolerance = 10**-8,verbose = False)
         iterations: number of maximum iterations
         tolerance: tolerance
         verbose: if True, print the guess at every step
+        count_evaluations: if True, also return the number of evaluations of func
 
     Returns:
         x0: the x value of the local extremum
         func(x0): the value of the local extremum
         jacobians: the jacobians of each optimization step
+        evaluations: the number of evaluations of func in each iteration, if count_evaluations
         """   
     if isinstance(initial_guess,Number): 
     #bfgs for scalar functions
     
-        x0 = initial_guess
+        x0 = _reseed(initial_guess)
         
         #initial guess of hessian
         b0 = 1
@@ -145,93 +158,193 @@ def bfgs(func, initial_guess,iterations =100,tolerance = 10**-8,verbose = False)
         fpxn0 = fxn0.jacobian(x0)
         
         jacobians = []
+        evaluations = []
         
         jacobians.append(fpxn0)
+        evaluations.append(1)
         
 
         for i in range(iterations):
             #stopping criterion
             if np.abs(fpxn0)<tolerance:
                 break
-                
-            fxn0 = func(x0)
-
-            fpxn0 = fxn0.jacobian(x0)
 
             s0 = -fpxn0/b0
 
-            x1=x0+s0 
-                
-            fxn1 = func(x1)
-            fpxn1 = fxn1.jacobian(x1)
-                
+            alpha, x1, fxn1, fpxn1, count = line_search(func, x0, s0, fxn0, fpxn0)
+            if alpha == 0:
+                #no step decreases func, start over from the initial hessian once
+                evaluations[-1] += count
+                if b0 == 1:
+                    break
+                b0 = 1
+                continue
+            fpxn1 = float(fpxn1)
+            s0 = alpha*s0
                 
             y0 = fpxn1-fpxn0
                 
             if y0 == 0:
                 break
                     
-            delta_b = y0/s0-b0
-            b1 = b0 + delta_b
+            #keep the hessian positive so that the next step goes downhill
+            if y0/s0 > 0:
+                b0 = y0/s0
                 
-            x0 = x1
-                
-            b0 = b1
+            x0, fxn0, fpxn0 = x1, fxn1, fpxn1
                 
             jacobians.append(fpxn1)
+            evaluations.append(count)
 
-        return x0,func(x0),jacobians
+        if count_evaluations:
+            return x0,fxn0,jacobians,evaluations
+        return x0,fxn0,jacobians
 
     if isinstance(initial_guess,Array):
         
         jacobians = []
+        evaluations = []
 
+        x0 = _reseed(initial_guess)
+        #initial guess of hessian
+        H = np.identity(len(x0))
+        buffer = np.empty_like(H)
+        fxn0 = func(x0)
+        fpxn0 = np.array(fxn0.jacobian(x0), dtype=float)
+        count = 1
+        #whether H is the identity
+        reset = True
         for i in range(iterations):
-
-            if i == 0:
-                
-                x0 = initial_guess
-                #initial guess of hessian
-                H = np.identity(len(x0))
-            else:
-                x0 = x1
-                H = deltaH
             if verbose:
-                print(i,x0,func(x0))
-                
-            fxn0 = func(x0)
-            fpxn0 = np.array(fxn0.jacobian(x0))   
+                print(i,x0,fxn0)
             jacobians.append(fpxn0)
+            evaluations.append(count)
             if np.linalg.norm(fpxn0)<tolerance:
                 #optimization condition is met
                 break
-                
-            s = -np.dot(H,fpxn0) #np.array multiply with scalar would be fine
-            x1 = x0 + s
-            fxn1 = func(x1)
-            fpxn1 = fxn1.jacobian(x1)
-            y = np.array(fpxn1 - fpxn0)
-            rho0 = 1/(np.dot(y.T,s))
-            rhokykT = rho0*y.T
-            skrhokykT = np.dot(s.reshape([len(x0),1]),rhokykT.reshape([1,len(x0)]))
 
-            ykskT = np.dot(np.reshape(y,[len(x0),1]),s.reshape([len(x0),1]).T)
-
-            rhokykskT = rho0*ykskT
+            s = -(H @ fpxn0)
+            if not np.dot(fpxn0, s) < 0:
+                # Not a descent direction, start over from steepest descent
+                H = np.identity(len(x0))
+                reset = True
+                s = -fpxn0
+                if not np.dot(fpxn0, s) < 0:
+                    break
+            alpha, x1, fxn1, fpxn1, count = line_search(func, x0, s, fxn0, fpxn0)
+            if alpha == 0:
+                #no step decreases func, start over from steepest descent once
+                if reset:
+                    evaluations[-1] += count
+                    break
+                H = np.identity(len(x0))
+                reset = True
+                continue
+            if _update_inverse_hessian(H, alpha * s, fpxn1 - fpxn0, buffer):
+                reset = False
+            x0, fxn0, fpxn0 = x1, fxn1, fpxn1
 
-            skskT = np.dot(s.reshape([len(x0),1]),s.reshape([len(x0),1]).T)
+        if count_evaluations:
+            return x0,fxn0,jacobians,evaluations
+        return x0,fxn0,jacobians
 
-            rhokskskT = rho0*skskT
+  
 
-            #define delta H
-            deltaH = np.dot((np.identity(2)-skrhokykT),np.dot(H,(np.identity(2)-rhokykskT)))+rhokskskT
+def _two_loop(gradient, history):
+    """Applies the L-BFGS approximation of the inverse Hessian to a gradient
 
+    Args:
+        gradient: the gradient, a np.ndarray
+        history: the last (s, y, rho) triples, oldest first, with rho = 1 / (y^T s)
 
-        return x0,func(x0),jacobians
+    Returns:
+        the approximation of H @ gradient, in O(m n) for m pairs of n variables.
+    """
+    q = gradient.copy()
+    alphas = []
+    for s, y, rho in reversed(history):
+        alpha = rho * np.dot(s, q)
+        q -= alpha * y
+        alphas.append(alpha)
+    if history:
+        # Scale the initial inverse Hessian like the curvature along the last step
+        s, y, _ = history[-1]
+        q *= np.dot(s, y) / np.dot(y, y)
+    for (s, y, rho), alpha in zip(history, reversed(alphas)):
+        beta = rho * np.dot(y, q)
+        q += (alpha - beta) * s
+    return q
+
+def lbfgs(func, initial_guess, memory=10, iterations=100, tolerance=10**-8, verbose=False,
+          count_evaluations=False):
+    """Use limited-memory BFGS to find the local minimum of a function of many variables
+
+    Only the last `memory` steps and changes of the gradient are kept, instead of the n x n
+    inverse Hessian of bfgs, so every iteration costs O(memory * n) time and memory.
 
-  
+    Args:
+        func: the function that the user wants to optimize
+        initial_guess: an Array for the initial guess
+        memory: the number of (step, change of gradient) pairs to keep
+        iterations: number of maximum iterations
+        tolerance: tolerance on the norm of the gradient
+        verbose: if True, print the guess at every step
+        count_evaluations: if True, also return the number of evaluations of func
 
-def steepest_descent(func,initial_guess,iterations = 100,step_size=0.01,tolerance = 10**-8,verbose=False):
+    Returns:
+        x0: the x value of the local extremum
+        func(x0): the value of the local extremum
+        jacobians: the jacobians of each optimization step
+        evaluations: the number of evaluations of func in each iteration, if count_evaluations
+    """
+    if not isinstance(initial_guess, Array):
+        raise TypeError('lbfgs needs an Array as the initial guess')
+
+    jacobians = []
+    evaluations = []
+    history = deque(maxlen=memory)
+
+    x0 = _reseed(initial_guess)
+    fxn0 = func(x0)
+    fpxn0 = np.array(fxn0.jacobian(x0), dtype=float)
+    count = 1
+    for i in range(iterations):
+        if verbose:
+            print(i, x0, fxn0)
+        jacobians.append(fpxn0)
+        evaluations.append(count)
+        if np.linalg.norm(fpxn0) < tolerance:
+            #optimization condition is met
+            break
+
+        direction = -_two_loop(fpxn0, history)
+        slope = np.dot(fpxn0, direction)
+        if not slope < 0:
+            # Not a descent direction, start over from steepest descent
+            history.clear()
+            direction = -fpxn0
+
+        alpha, x1, fxn1, fpxn1, count = line_search(func, x0, direction, fxn0, fpxn0)
+        if alpha == 0:
+            #no step decreases func, start over from steepest descent once
+            if not history:
+                evaluations[-1] += count
+                break
+            history.clear()
+            continue
+        s = alpha * direction
+        y = fpxn1 - fpxn0
+        sy = np.dot(s, y)
+        if sy > 1e-10 * np.linalg.norm(s) * np.linalg.norm(y):
+            history.append((s, y, 1 / sy))
+        x0, fxn0, fpxn0 = x1, fxn1, fpxn1
+
+    if count_evaluations:
+        return x0, fxn0, jacobians, evaluations
+    return x0, fxn0, jacobians
+
+def steepest_descent(func,initial_guess,iterations = 100,step_size=0.01,tolerance = 10**-8,verbose=False,
+                     count_evaluations=False):
 
     """
         Use steepest_descent method to find the local minimum/maxinum of the function
@@ -239,52 +352,74 @@ def steepest_descent(func,initial_guess,iterations = 100,step_size=0.01,toleranc
         func: the function that the user wants to optimize 
         initial_guess: A number object for the initial guess
         iterations: number of maximum iterations
-        step_size: the size of each step
+        step_size: the first step the line search tries, later iterations start from the
+            step of the previous one
+        count_evaluations: if True, also return the number of evaluations of func
 
     Returns:
         x0: the x value of the local extremum
         func(x0): the value of the local extremum
         jacobians: the jacobians of each optimization step
+        evaluations: the number of evaluations of func in each iteration, if count_evaluations
     """    
     #gradient descent for scalar functions
     if isinstance(initial_guess,Number):
-        x0=initial_guess
+        x0=_reseed(initial_guess)
         jacobians = []
-        s = -func(initial_guess).jacobian(x0)
+        evaluations = []
+        fxn0 = func(x0)
+        fpxn0 = fxn0.jacobian(x0)
+        s = -fpxn0
         jacobians.append(s)
+        evaluations.append(1)
+        alpha = step_size
         for i in range(iterations):
-            if np.abs(s)>1*10**-7:
-                x0 = x0 + step_size*s
-                s = -func(x0).jacobian(x0)
-                jacobians.append(s)
-        
+            if np.abs(s)<=1*10**-7:
+                break
+            #line search from the last step, reusing func(x0) and its gradient
+            alpha, x0, fxn0, fpxn0, count = line_search(func, x0, s, fxn0, fpxn0, alpha=alpha)
+            if alpha == 0:
+                #no step decreases func, e.g. below its rounding error
+                evaluations[-1] += count
+                break
+            fpxn0 = float(fpxn0)
+            s = -fpxn0
+            jacobians.append(s)
+            evaluations.append(count)
         
-        return x0,func(x0),jacobians
+        if count_evaluations:
+            return x0,fxn0,jacobians,evaluations
+        return x0,fxn0,jacobians
 
     elif isinstance(initial_guess,Array):
 
         # e.g. R2 --> R1
         jacobians = []
-        
-        s = np.zeros(len(initial_guess))
+        evaluations = []
 
         for i in range(iterations):
             if i == 0:
-                x0 = initial_guess
-            else:
+                x0 = _reseed(initial_guess)
+                fxn0 = func(x0)
+                #the whole gradient comes from the single evaluation of func at x0
+                fpxn0 = np.array(fxn0.jacobian(x0), dtype=float)
                 alpha = step_size
-                #perform line search using Armijo condition
-                while func(x0+alpha*s).val>func(x0).val+alpha*0.0001*np.dot(np.transpose(-1*s),s):
-                    alpha = alpha/2
-                
-                x0 = x0+alpha*s
+                count = 1
+            else:
+                #line search from the last step, reusing func(x0) and its gradient
+                alpha, x0, fxn0, fpxn0, count = line_search(func, x0, s, fxn0, fpxn0, alpha=alpha)
+            evaluations.append(count)
+            if alpha == 0:
+                #no step decreases func, e.g. below its rounding error
+                break
             
             if verbose:
-                print(i,x0,func(x0))
-            for j in range(len(s)):
-                s[j] = func(x0).jacobian(x0[j])*-1
+                print(i,x0,fxn0)
+            s = -fpxn0
             
-            if np.abs(s).all()<10**-7:
+            if np.all(np.abs(s)<10**-7):
                 break
             jacobians.append(s)
-        return i,x0,func(x0),jacobians
+        if count_evaluations:
+            return i,x0,fxn0,jacobians,evaluations
+        return i,x0,fxn0,jacobians
@@ -0,0 +1,345 @@
+"""Reverse mode (adjoint) automatic differentiation
+
+In reverse mode, every elementary operation is recorded on a ``Tape`` together with its
+local partial derivatives while the function is evaluated. A single backward sweep over
+the tape then gives the partial derivatives of one output w.r.t. every input, which is
+much cheaper than forward mode for scalar functions of many variables.
+"""
+
+import numpy as np
+from autodiff.structures import Number, Array, Derivative, Tangent, TangentSpace, _values, _outputs
+
+class Node(Derivative):
+    '''
+    Node is the derivative of a Number in reverse mode. It only points at the entry of
+    the Tape that recorded the Number, the partial derivatives are computed by a
+    backward sweep when jacobian() is called.
+
+    Args:
+        tape: the Tape the Number was recorded on
+        index: the position of the Number on the tape
+
+    Returns:
+        Node, to be used as the derivative of a Number.
+    '''
+
+    def __init__(self, tape, index):
+        self.tape = tape
+        self.index = index
+
+    def __repr__(self):
+        '''
+        Overloads the print method to give a string representation of Node object.
+
+        Returns:
+            a string specifiying the position of the Node on its tape.
+        '''
+        return f'Node(index={self.index})'
+
+    @classmethod
+    def chain(cls, terms):
+        '''
+        Records an elementary operation on the tape of its operands.
+
+        Args:
+            terms: a list of (Node, partial) pairs
+
+        Returns:
+            the Node of the result of the elementary operation.
+        '''
+        tape = terms[0][0].tape
+        if any(node.tape is not tape for node, _ in terms):
+            raise ValueError('Cannot combine Numbers recorded on different Tapes')
+        return tape.record([(node.index, partial) for node, partial in terms])
+
+    @classmethod
+    def variables(cls, values):
+        '''
+        Creates independent variables recorded on a new Tape.
+        '''
+        return Tape().variables(values)
+
+    def jacobian(self, order):
+        '''
+        Returns the partial derivatives by the order specified, using one backward sweep.
+
+        Args:
+            order: a Number object or an iterable of Number objects
+
+        Returns:
+            a scalar when order is a single Number, a np.ndarray otherwise.
+        '''
+        adjoints = self.tape.backward({self.index: 1})
+        return self.tape.partials(adjoints, order)
+
+class Tape():
+    '''
+    Tape records the elementary operations of a reverse mode computation. Each entry
+    holds the positions of the operands of an operation and the local partial derivatives
+    w.r.t. them.
+
+    Returns:
+        Tape, an empty tape to record a computation on.
+
+    Example:
+        >>> from autodiff.reverse import Tape
+        >>> tape = Tape()
+        >>> x = tape.variables([2, 3])
+        >>> y = x[0] * x[1]
+        >>> y.jacobian(x)
+        array([3, 2])
+    '''
+
+    def __init__(self):
+        self._parents = []
+        self._partials = []
+
+    def __len__(self):
+        '''
+        Overloads the len() method to give the length of Tape.
+
+        Returns:
+            an integer representing number of entries recorded on the Tape.
+        '''
+        return len(self._parents)
+
+    def record(self, terms):
+        '''
+        Records an entry on the tape.
+
+        Args:
+            terms: a list of (index, partial) pairs, the positions of the operands on the
+                tape and the partial derivatives w.r.t. them
+
+        Returns:
+            the Node of the new entry.
+        '''
+        self._parents.append(tuple(index for index, _ in terms))
+        self._partials.append(tuple(partial for _, partial in terms))
+        return Node(self, len(self._parents) - 1)
+
+    def variable(self, val):
+        '''
+        Creates an independent variable recorded on this tape.
+
+        Args:
+            val: value of the variable
+
+        Returns:
+            a Number in reverse mode.
+        '''
+        return Number(val, self.record([]))
+
+    def variables(self, values):
+        '''
+        Creates independent variables recorded on this tape.
+
+        Args:
+            values: an iterable of ints/floats
+
+        Returns:
+            an Array of Numbers in reverse mode.
+        '''
+        return Array([self.variable(val) for val in values])
+
+    def backward(self, seeds):
+        '''
+        Propagates adjoints from the end of the tape to its start.
+
+        Args:
+            seeds: a dict mapping positions on the tape to their initial adjoints
+
+        Returns:
+            a list of the adjoint of every entry, None where it's zero.
+        '''
+        adjoints = [None] * len(self)
+        for index, adjoint in seeds.items():
+            adjoints[index] = adjoint
+
+        for index in range(max(seeds) if seeds else -1, -1, -1):
+            adjoint = adjoints[index]
+            if adjoint is None:
+                continue
+            for parent, partial in zip(self._parents[index], self._partials[index]):
+                if adjoints[parent] is None:
+                    adjoints[parent] = partial * adjoint
+                else:
+                    adjoints[parent] = adjoints[parent] + partial * adjoint
+        return adjoints
+
+    def partials(self, adjoints, order):
+        '''
+        Looks up the adjoints of the Numbers in order.
+
+        Args:
+            adjoints: a list of adjoints, as returned by backward()
+            order: a Number object or an iterable of Number objects
+
+        Returns:
+            a scalar when order is a single Number, a np.ndarray otherwise. Numbers that
+            weren't recorded on this tape get zero.
+        '''
+        def _partial(key):
+            if (isinstance(key, Number) and isinstance(key._deriv, Node)
+                    and key._deriv.tape is self):
+                adjoint = adjoints[key._deriv.index]
+                if adjoint is not None:
+                    return adjoint
+            return 0
+
+        if isinstance(order, Number):
+            return _partial(order)
+        return np.array([_partial(key) for key in order])
+
+def value_and_grad(func):
+    '''
+    Creates a function that evaluates func and its gradient with one forward pass and
+    one backward sweep.
+
+    Args:
+        func: a scalar function of a Number or of an Array
+
+    Returns:
+        a function taking the point to evaluate at (a Number, an int/float, or an iterable
+        of them) and returning the value of func and its gradient, a float for scalar
+        points and a np.ndarray otherwise.
+
+    Example:
+        >>> from autodiff.reverse import value_and_grad
+        >>> value_and_grad(lambda x: x[0] * x[1])([2, 3])
+        (6, array([3, 2]))
+    '''
+    def inner(x):
+        tape = Tape()
+        values = _values(x)
+        if isinstance(values, list):
+            variables = tape.variables(values)
+            gradient = np.zeros(len(values))
+        else:
+            variables = tape.variable(values)
+            gradient = 0
+        out = func(variables)
+        if not isinstance(out, Number):
+            # func doesn't depend on its input
+            return out, gradient
+        return out.val, out.jacobian(variables)
+    return inner
+
+def grad(func):
+    '''
+    Creates a function that evaluates the gradient of func in reverse mode. Its cost
+    is a small multiple of the cost of func, whatever the number of inputs.
+
+    Args:
+        func: a scalar function of a Number or of an Array
+
+    Returns:
+        a function taking the point to evaluate at (a Number, an int/float, or an iterable
+        of them) and returning the gradient, a float for scalar points and a np.ndarray
+        otherwise. It can be passed to optimizations.bfgs_symbolic() as the gradient.
+
+    Example:
+        >>> from autodiff.reverse import grad
+        >>> grad(lambda x: x[0] * x[1])([2, 3])
+        array([3, 2])
+    '''
+    value_and_gradient = value_and_grad(func)
+    def inner(x):
+        return value_and_gradient(x)[1]
+    return inner
+
+def hvp(func, x, v):
+    '''
+    Evaluates the product of the Hessian of func at x with the vector v, without forming
+    the Hessian.
+
+    The inputs are recorded on a Tape with values that are themselves dense mode Numbers
+    carrying the single direction v (forward-over-reverse). The backward sweep then 
+    propagates the directional derivatives of the adjoints, i.e. of the gradient, along v. 
+    The cost is a small constant multiple of one gradient evaluation.
+
+    Args:
+        func: a scalar function of a Number or of an Array
+        x: the point to evaluate at, a Number, an int/float, or an iterable of them
+        v: the vector to multiply the Hessian with, of the same length as x
+
+    Returns:
+        a np.ndarray, the Hessian of func at x times v. A float for scalar points.
+
+    Example:
+        >>> from autodiff.reverse import hvp
+        >>> hvp(lambda x: x[0] ** 2 * x[1], [1, 2], [1, 0])
+        array([4., 2.])
+    '''
+    values = _values(x)
+    scalar = not isinstance(values, list)
+    if scalar:
+        values = [values]
+    directions = np.ravel(np.asarray(v, dtype=float))
+    if len(directions) != len(values):
+        raise ValueError('x and v must have the same length')
+
+    space = TangentSpace(1)
+    tape = Tape()
+    variables = tape.variables([
+        Number(val, Tangent(np.array([direction]), space))
+        for val, direction in zip(values, directions)
+    ])
+
+    out = func(variables[0] if scalar else variables)
+    product = np.zeros(len(values))
+    if isinstance(out, Number):
+        adjoints = tape.backward({out._deriv.index: 1})
+        for i, adjoint in enumerate(tape.partials(adjoints, variables)):
+            if isinstance(adjoint, Number):
+                product[i] = adjoint._deriv.vec[0]
+
+    if scalar:
+        return product[0]
+    return product
+
+def vjp(func, x, u):
+    '''
+    Evaluates the product of the vector u with the Jacobian of func at x (the gradient of
+    the u-weighted sum of the outputs), without forming the Jacobian.
+
+    All the outputs are seeded with their weight in u, so a single backward sweep gives
+    the product. The cost is about one evaluation of func, whatever the number of inputs
+    and outputs.
+
+    Args:
+        func: a function of a Number or of an Array, returning a Number or an iterable
+            (e.g. Array, tuple) of Numbers
+        x: the point to evaluate at, a Number, an int/float, or an iterable of them
+        u: the weights of the outputs, of the same length as the output of func
+
+    Returns:
+        a np.ndarray with one entry per input, u times the Jacobian of func at x. A float
+        for scalar points.
+
+    Example:
+        >>> from autodiff.reverse import vjp
+        >>> vjp(lambda x: (x[0] * x[1], x[0] + x[1]), [2, 3], [1, 0])
+        array([3., 2.])
+    '''
+    values = _values(x)
+    scalar = not isinstance(values, list)
+    tape = Tape()
+    if scalar:
+        variables = tape.variable(values)
+    else:
+        variables = tape.variables(values)
+
+    outputs, _ = _outputs(func(variables))
+    weights = np.ravel(np.asarray(u, dtype=float))
+    if len(weights) != len(outputs):
+        raise ValueError('u must have one weight per output of func')
+
+    seeds = {}
+    for out, weight in zip(outputs, weights):
+        if isinstance(out, Number) and isinstance(out._deriv, Node):
+            index = out._deriv.index
+            seeds[index] = seeds.get(index, 0) + weight
+
+    adjoints = tape.backward(seeds)
+    return np.asarray(tape.partials(adjoints, variables), dtype=float)[()]
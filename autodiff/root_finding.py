@@ -1,10 +1,12 @@
 from autodiff import operations
 from autodiff.structures import Number
 from autodiff.structures import Array
+from autodiff.structures import _reseed
+from autodiff import sparsity
 import numpy as np
 from copy import deepcopy
 
-def newtons_method(func, initial_guess, iterations=100,tolerance = 10**-7,verbose = False, show_fxn=False):
+def newtons_method(func, initial_guess, iterations=100,tolerance = 10**-7,verbose = False, show_fxn=False, sparse=False):
     
     """Use Newton's method to find the root of the function
     Args:
@@ -12,6 +14,11 @@ def newtons_method(func, initial_guess, iterations=100,tolerance = 10**-7,verbos
         initial_guess: a number object for the initial guess
         iterations: number of maximum iterations
         show_fxn: if true, return function value at the final xstar
+        sparse: if true and func returns a tuple, detect the sparsity pattern of the
+            jacobian once, and evaluate func and its jacobian together with one dense
+            direction per column color. The jacobians are then returned as
+            structures.CSRMatrix objects, and fxn as a np.ndarray of values. The Newton
+            step is still solved as a dense linear system.
 
     Returns:
         xn: the x value of the root
@@ -22,13 +29,13 @@ def newtons_method(func, initial_guess, iterations=100,tolerance = 10**-7,verbos
         #scalar case
         jacobians = []
 
-        x0 = initial_guess
+        x0 = _reseed(initial_guess)
 
-        fxn = func(initial_guess)
+        fxn = func(x0)
 
-        fpxn = fxn.jacobian(initial_guess)
+        fpxn = fxn.jacobian(x0)
 
-        x1 = x0 - fxn/fpxn
+        x1 = _reseed(x0 - fxn/fpxn)
 
         jacobians.append(fpxn)
 
@@ -42,7 +49,7 @@ def newtons_method(func, initial_guess, iterations=100,tolerance = 10**-7,verbos
 
                 jacobians.append(fpxn)
 
-                x1 = x0- fxn / fpxn
+                x1 = _reseed(x0- fxn / fpxn)
 
         if show_fxn:
             return x1, jacobians,fxn
@@ -51,13 +58,28 @@ def newtons_method(func, initial_guess, iterations=100,tolerance = 10**-7,verbos
     elif isinstance(initial_guess,Array):
         jacobians = []
         if isinstance(func(initial_guess),tuple):
+            if sparse:
+                pattern = sparsity.sparsity_pattern(func, initial_guess)
+                colors = sparsity.color_columns(pattern)
             for i in range(iterations):
 
                 if i == 0:
-                    x0= initial_guess
+                    x0= _reseed(initial_guess)
                 else:
                     x0 = x1
 
+                if sparse:
+                    #one compressed evaluation gives both the values and the jacobian
+                    fxn, fpxn = sparsity.value_and_sparse_jacobian(func, x0, pattern, colors)
+                    if verbose:
+                        print(i,x0,fxn)
+                    if np.linalg.norm(fxn)< tolerance:
+                        break
+                    jacobians.append(fpxn)
+                    #dense solve, the CSRMatrix is only used to evaluate the jacobian
+                    x1 = _reseed(x0 - np.linalg.solve(fpxn.toarray(), fxn))
+                    continue
+
                 fxn = func(x0)
                 fpxn = []
                 if verbose:
@@ -77,7 +99,7 @@ def newtons_method(func, initial_guess, iterations=100,tolerance = 10**-7,verbos
                         fpxn_row.append(fxn[k].jacobian(x0[j]))
                     fpxn.append(fpxn_row)
                 jacobians.append(fpxn)
-                x1 = x0 - np.dot(np.linalg.inv(fpxn),fxn)
+                x1 = _reseed(x0 - np.dot(np.linalg.inv(fpxn),fxn))
 
             if show_fxn:
                 return x1, jacobians,fxn
@@ -88,7 +110,7 @@ def newtons_method(func, initial_guess, iterations=100,tolerance = 10**-7,verbos
             for i in range(iterations):
 
                 if i == 0:
-                    x0= initial_guess
+                    x0= _reseed(initial_guess)
                 else:
                     x0 = x1
 
@@ -104,7 +126,7 @@ def newtons_method(func, initial_guess, iterations=100,tolerance = 10**-7,verbos
                     fpxn.append(fxn.jacobian(x0[j]))
                 jacobians.append(fpxn)
                 print(fpxn)
-                x1 = x0 - np.dot(np.reciprocal(fpxn),fxn)
+                x1 = _reseed(x0 - np.dot(np.reciprocal(fpxn),fxn))
 
             if show_fxn:
                 return x1, jacobians,fxn
@@ -0,0 +1,144 @@
+"""Sparse Jacobians
+
+The sparsity pattern of a Jacobian is read off the dependency structure of the default
+mode derivative dicts: an output depends on an input exactly when the input is a key of
+its dict. Columns of the Jacobian that never share a row (structurally orthogonal
+columns) are given the same color, and every color becomes one dense mode direction. A
+single evaluation then gives the compressed Jacobian, from which the nonzero entries are
+recovered into a CSRMatrix. A tridiagonal Jacobian needs 3 directions whatever its size.
+"""
+
+import numpy as np
+from autodiff.structures import Number, Array, Tangent, TangentSpace, CSRMatrix, _values, _outputs
+
+def sparsity_pattern(func, x):
+    '''
+    Detects which outputs of func depend on which inputs with one default mode evaluation.
+
+    Args:
+        func: a function of an Array, returning a Number or an iterable (e.g. Array, tuple)
+            of Numbers
+        x: the point to evaluate at, an iterable of Numbers or ints/floats
+
+    Returns:
+        a CSRMatrix with an entry of 1 wherever the Jacobian is structurally nonzero.
+    '''
+    variables = Array(_values(x))
+    columns = {variable: j for j, variable in enumerate(variables)}
+    outputs, _ = _outputs(func(variables))
+
+    indices = []
+    indptr = [0]
+    for out in outputs:
+        if isinstance(out, Number):
+            indices.extend(sorted(columns[key] for key in out._deriv if key in columns))
+        indptr.append(len(indices))
+    return CSRMatrix(np.ones(len(indices)), indices, indptr, (len(outputs), len(variables)))
+
+def color_columns(pattern):
+    '''
+    Colors the columns of a sparsity pattern greedily, so that columns with a nonzero
+    entry in the same row get different colors.
+
+    Args:
+        pattern: a CSRMatrix, as returned by sparsity_pattern()
+
+    Returns:
+        a np.ndarray of the color of every column, numbered from 0.
+    '''
+    # Columns that share a row can't share a color
+    rows_of = [[] for _ in range(pattern.shape[1])]
+    for k in range(pattern.shape[0]):
+        for j in pattern.indices[pattern.indptr[k]:pattern.indptr[k + 1]]:
+            rows_of[j].append(k)
+
+    colors = np.full(pattern.shape[1], -1, dtype=np.int64)
+    for j in range(pattern.shape[1]):
+        used = set()
+        for k in rows_of[j]:
+            used.update(colors[pattern.indices[pattern.indptr[k]:pattern.indptr[k + 1]]])
+        color = 0
+        while color in used:
+            color += 1
+        colors[j] = color
+    return colors
+
+def _compressed(func, x, pattern, colors):
+    '''
+    Evaluates func with one dense mode direction per color and recovers the Jacobian.
+
+    Args:
+        func: a function of an Array
+        x: the point to evaluate at, an iterable of Numbers or ints/floats
+        pattern: a CSRMatrix, as returned by sparsity_pattern()
+        colors: a np.ndarray, as returned by color_columns()
+
+    Returns:
+        a np.ndarray of the values of the outputs of func, and the Jacobian as a CSRMatrix.
+    '''
+    values = _values(x)
+    n_colors = int(colors.max()) + 1 if len(colors) else 0
+    space = TangentSpace(n_colors)
+    seeds = np.identity(n_colors)[colors]
+    variables = Array([
+        Number(val, Tangent(seed, space)) for val, seed in zip(values, seeds)
+    ])
+    outputs, _ = _outputs(func(variables))
+
+    compressed = np.zeros((len(outputs), n_colors))
+    out_values = np.zeros(len(outputs))
+    for k, out in enumerate(outputs):
+        if isinstance(out, Number):
+            compressed[k] = out._deriv.vec
+            out_values[k] = out.val
+        else:
+            out_values[k] = out
+
+    data = compressed[pattern.rows(), colors[pattern.indices]]
+    return out_values, CSRMatrix(data, pattern.indices, pattern.indptr, pattern.shape)
+
+def value_and_sparse_jacobian(func, x, pattern=None, colors=None):
+    '''
+    Evaluates func and its Jacobian at x with a single evaluation, with one dense mode
+    direction per color of the columns of the Jacobian.
+
+    Args:
+        func: a function of an Array, returning a Number or an iterable (e.g. Array, tuple)
+            of Numbers
+        x: the point to evaluate at, an iterable of Numbers or ints/floats
+        pattern: the sparsity pattern of the Jacobian, detected when None
+        colors: the colors of the columns of pattern, computed when None
+
+    Returns:
+        a np.ndarray of the values of the outputs of func, and the Jacobian as a CSRMatrix.
+    '''
+    if pattern is None:
+        pattern = sparsity_pattern(func, x)
+    if colors is None:
+        colors = color_columns(pattern)
+    return _compressed(func, x, pattern, colors)
+
+def sparse_jacobian(func, x, pattern=None, colors=None):
+    '''
+    Evaluates the Jacobian of func at x in compressed sparse row format, with one dense
+    mode direction per color of its columns rather than one per input.
+
+    Args:
+        func: a function of an Array, returning a Number or an iterable (e.g. Array, tuple)
+            of Numbers
+        x: the point to evaluate at, an iterable of Numbers or ints/floats
+        pattern: the sparsity pattern of the Jacobian, detected when None. It can be
+            reused across points since it only depends on the structure of func.
+        colors: the colors of the columns of pattern, computed when None
+
+    Returns:
+        the Jacobian of func at x as a CSRMatrix.
+
+    Example:
+        >>> from autodiff.sparsity import sparse_jacobian
+        >>> sparse_jacobian(lambda x: (x[0] * 2, x[1] * x[2], x[2]), [1, 2, 3]).toarray()
+        array([[2., 0., 0.],
+               [0., 3., 2.],
+               [0., 0., 1.]])
+    '''
+    return value_and_sparse_jacobian(func, x, pattern, colors)[1]
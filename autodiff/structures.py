@@ -1,8 +1,105 @@
 """Data structures for autodiff
 """
+from contextlib import contextmanager
 from autodiff import operations
 import numpy as np
 
+@contextmanager
+def _mode(flag, value=True):
+    '''
+    Context manager setting the module-level flag named flag to value, and restoring its
+    previous value on exit, so that the modes can be nested.
+
+    Args:
+        flag: the name of a module-level flag, e.g. '_lazy'
+        value: the value of the flag in the with block
+    '''
+    previous = globals()[flag]
+    globals()[flag] = value
+    try:
+        yield
+    finally:
+        globals()[flag] = previous
+
+# Whether only the independent variables are keys of the derivative dicts, see leaf_only()
+_leaf_only = False
+
+def leaf_only():
+    '''
+    Context manager in which the derivative dicts only track the independent variables.
+
+    By default, every Number is a key of its own derivative dict, so the dict of a result
+    also holds every intermediate it was computed from, and keeps them alive. Within
+    leaf_only(), the results of elementary operations (Numbers created from a derivative
+    dict) don't insert themselves, so the dicts stay bounded by the number of independent
+    variables (Numbers created from a value only). Derivatives w.r.t. intermediates are
+    then zero.
+
+    Example:
+        >>> import autodiff
+        >>> x = autodiff.structures.Number(2)
+        >>> with autodiff.structures.leaf_only():
+        ...     y = x * x
+        ...     z = y * y
+        >>> len(z._deriv)
+        1
+        >>> z.jacobian(x)
+        32
+    '''
+    return _mode('_leaf_only')
+
+# Whether the elementary operations defer the merging of derivative dicts, see lazy()
+_lazy = False
+
+def lazy():
+    '''
+    Context manager in which the derivatives of default mode computations are only
+    materialized when jacobian() is called.
+
+    Within lazy(), an elementary operation on Numbers with derivative dicts doesn't merge
+    the dicts of its operands. It records its local partial derivatives in a Lazy
+    derivative instead, which costs the same whatever the number of variables. Evaluations
+    that only read values (e.g. the trial points of a line search) skip the dict
+    arithmetic altogether. Like within leaf_only(), derivatives w.r.t. intermediates are
+    zero.
+
+    Example:
+        >>> import autodiff
+        >>> x = autodiff.structures.Number(2)
+        >>> with autodiff.structures.lazy():
+        ...     y = x * x
+        ...     z = y * y
+        >>> z._deriv
+        Lazy(terms=1)
+        >>> z.jacobian(x)
+        32
+    '''
+    return _mode('_lazy')
+
+# Whether the elementary operations skip derivatives altogether, see no_grad()
+_no_grad = False
+
+def no_grad():
+    '''
+    Context manager in which the elementary operations only compute values.
+
+    Within no_grad(), the elementary operations (and so the operators of Number) neither
+    compute local partial derivatives nor apply the chain rule. They return value-only
+    Numbers, with an empty derivative dict, which act as constants afterwards. This is for
+    evaluations whose derivatives are thrown away, e.g. the trial points of a line search.
+
+    Example:
+        >>> import autodiff
+        >>> x = autodiff.structures.Number(2)
+        >>> with autodiff.structures.no_grad():
+        ...     y = x * x
+        >>> y.val
+        4
+        >>> y.jacobian(x)
+        0
+    '''
+    return _mode('_no_grad')
+
 class Number():
     '''
     Number class is the core data structure for 'autodiff'. It instantiates a Number 
@@ -12,7 +109,9 @@ class Number():
     Args:
         val: value of the Number
         deriv: a dictionary of partial derivatives. It is automatically instantiated to
-            {self: 1} unless otherwise specified.
+            {self: 1} unless otherwise specified. In dense or reverse mode, a 
+            Derivative (see dense_variables() and autodiff.reverse.Tape). Within
+            leaf_only(), a dictionary isn't completed with the derivative w.r.t. itself.
     
     Returns:
         Number, an object to perform automatic differentiation on.
@@ -30,6 +129,9 @@ class Number():
         >>> a.jacobian(x)
         2
     '''
+
+    # Numbers are created for every elementary operation, keep them small
+    __slots__ = ('val', '_deriv')
     
     def __init__(self, val, deriv=None):
 
@@ -40,8 +142,13 @@ class Number():
             }
         elif isinstance(deriv, dict):
             self._deriv = deriv
-            #keep also a copy of the derivative w.r.t. itself
-            self._deriv[self] = 1
+            #keep also a copy of the derivative w.r.t. itself, unless only the independent
+            #variables are tracked
+            if not _leaf_only:
+                self._deriv[self] = 1
+        elif isinstance(deriv, Derivative):
+            #dense and reverse mode only track their own independent variables
+            self._deriv = deriv
         else:
             self._deriv = {
                     self: deriv
@@ -185,129 +292,131 @@ class Number():
         '''
         return operations.negate(self)
     
-    # def sin(self):
-    #     '''
-    #     Calculates the sin of the Number object.
-        
-    #     Returns:
-    #         another Number object, which is sin of the original one.
-    #     '''
-    #     return operations.sin(self)
+    # The elementary functions are also methods, named after their numpy ufuncs, so that
+    # numpy functions (e.g. np.sin) work on Numbers nested as values of other Numbers
+    def sin(self):
+        '''
+        Calculates the sin of the Number object.
+        
+        Returns:
+            another Number object, which is sin of the original one.
+        '''
+        return operations.sin(self)
     
-    # def asin(self):
-    #     '''
-    #     Calculates the arcsin of the Number object.
+    def arcsin(self):
+        '''
+        Calculates the arcsin of the Number object.
         
-    #     Returns:
-    #         another Number object, which is arcsin of the original one.
-    #     '''
-    #     return operations.asin(self)
+        Returns:
+            another Number object, which is arcsin of the original one.
+        '''
+        return operations.asin(self)
     
-    # def sinh(self):
-    #     '''
-    #     Calculates the sinh of the Number object.
+    def sinh(self):
+        '''
+        Calculates the sinh of the Number object.
         
-    #     Returns:
-    #         another Number object, which is sinh of the original one.
-    #     '''
-    #     return operations.sinh(self)
+        Returns:
+            another Number object, which is sinh of the original one.
+        '''
+        return operations.sinh(self)
     
-    # def cos(self):
-    #     '''
-    #     Calculates the cosine of the Number object.
+    def cos(self):
+        '''
+        Calculates the cosine of the Number object.
         
-    #     Returns:
-    #         another Number object, which is cosine of the original one.
-    #     '''
-    #     return operations.cos(self)
+        Returns:
+            another Number object, which is cosine of the original one.
+        '''
+        return operations.cos(self)
     
-    # def acos(self):
-    #     '''
-    #     Calculates the arccosine of the Number object.
+    def arccos(self):
+        '''
+        Calculates the arccosine of the Number object.
         
-    #     Returns:
-    #         another Number object, which is arccosine of the original one.
-    #     '''
-    #     return operations.acos(self)
+        Returns:
+            another Number object, which is arccosine of the original one.
+        '''
+        return operations.acos(self)
     
-    # def cosh(self):
-    #     '''
-    #     Calculates the cosine-h of the Number object.
+    def cosh(self):
+        '''
+        Calculates the cosine-h of the Number object.
         
-    #     Returns:
-    #         another Number object, which is cosine-h of the original one.
-    #     '''
-    #     return operations.cosh(self)
+        Returns:
+            another Number object, which is cosine-h of the original one.
+        '''
+        return operations.cosh(self)
     
-    # def tan(self):
-    #     '''
-    #     Calculates the tangent of the Number object.
+    def tan(self):
+        '''
+        Calculates the tangent of the Number object.
         
-    #     Returns:
-    #         another Number object, which is tangent of the original one.
-    #     '''
-    #     return operations.tan(self)
+        Returns:
+            another Number object, which is tangent of the original one.
+        '''
+        return operations.tan(self)
     
-    # def atan(self):
-    #     '''
-    #     Calculates the arc-tangent of the Number object.
+    def arctan(self):
+        '''
+        Calculates the arc-tangent of the Number object.
         
-    #     Returns:
-    #         another Number object, which is arc-tangent of the original one.
-    #     '''
-    #     return operations.atan(self)
+        Returns:
+            another Number object, which is arc-tangent of the original one.
+        '''
+        return operations.atan(self)
     
-    # def tanh(self):
-    #     '''
-    #     Calculates the tangent-h of the Number object.
+    def tanh(self):
+        '''
+        Calculates the tangent-h of the Number object.
         
-    #     Returns:
-    #         another Number object, which is tangent-h of the original one.
-    #     '''
-    #     return operations.tanh(self)
+        Returns:
+            another Number object, which is tangent-h of the original one.
+        '''
+        return operations.tanh(self)
     
-    # def sqrt(self):
-    #     '''
-    #     calculates the square root of the Number object.
+    def sqrt(self):
+        '''
+        calculates the square root of the Number object.
         
-    #     Returns:
-    #         another number object, which is the square root of the original one.
-    #     '''
-    #     return operations.sqrt(self)
+        Returns:
+            another number object, which is the square root of the original one.
+        '''
+        return operations.sqrt(self)
     
 
-    # def exp(self):
-    #     '''
-    #     Calculates the exponential of Number object.
+    def exp(self):
+        '''
+        Calculates the exponential of Number object.
         
-    #     Returns:
-    #         another Number object, which is the exponential of the original one.
-    #     '''
-    #     return operations.exp(self)
+        Returns:
+            another Number object, which is the exponential of the original one.
+        '''
+        return operations.exp(self)
 
-    # def logistic(self):
+    def logistic(self):
         
-    #     '''
-    #     Calculates the logistic of Number object.
+        '''
+        Calculates the logistic of Number object.
         
-    #     Returns:
-    #         another Number object, which is the logistic of the original one.
-    #     '''
+        Returns:
+            another Number object, which is the logistic of the original one.
+        '''
 
-    #     return operations.logistic(self)
+        return operations.logistic(self)
     
-    # def log(self, base = np.exp(1)):
-    #     '''
-    #     Calculates the log of Number object.
+    def log(self, base = np.exp(1)):
+        '''
+        Calculates the log of Number object.
         
-    #     Args:
-    #         base: the base to take log with
+        Args:
+            base: the base to take log with
         
-    #     Returns:
-    #         another Number object, which is the log of the original one.
-    #     '''
+        Returns:
+            another Number object, which is the log of the original one.
+        '''
 
-    #     return operations.log(self, base)
+        return operations.log(self, base)
 
     def jacobian(self, order):
         '''
@@ -321,29 +430,24 @@ class Number():
             When order is a single element, it returns a scaler
         '''
         
-        def _partial(deriv, key):
-            try:
-                return deriv[key]
-            except KeyError:
-                # If there's no partial, it's zero
-                return 0
+        if isinstance(self._deriv, Derivative):
+            return self._deriv.jacobian(order)
         
-        #if order is a single Number object
+        #if order is a single Number object. If there's no partial, it's zero
         if isinstance(order, Number):
-            return _partial(self._deriv, order)
+            return self._deriv.get(order, 0)
         
-        jacobian = []
-        for key in order:
-            jacobian.append(_partial(self._deriv, key))
-        return np.array(jacobian)
+        return np.array([self._deriv.get(key, 0) for key in order])
 
-    def __hash__(self):
-        return id(self)
-  
-    def __eq__(self, other):
+    # Numbers are keys of the derivative dicts by identity, and compare by identity with
+    # the default __eq__. The default object hash is an integer id computed in C, without
+    # a Python call per dict operation.
+    __hash__ = object.__hash__
+
+    def equals(self, other):
         '''
-        Overloads the Comparison Operator to check whether two Number 
-        objects are equal to each other
+        Checks whether two Number objects have the same value and the same partial
+        derivatives. Unlike ==, which is identity, this compares the derivatives.
    
         Args:
             other: the other Number object to be compared with
@@ -351,31 +455,83 @@ class Number():
         Returns:
             True if two Number objects are equal, False otherwise.
         '''
-        try:
-            if self.val == other.val:
-                deriv_self = self._deriv.copy()
-                deriv_other = other._deriv.copy()
-                deriv_self.pop(self)
-                deriv_other.pop(other)
-                if deriv_self==deriv_other:
-                    return True
-            return False
-        except AttributeError:
-            #if other is not even a autodiff.Number
+        if not isinstance(other, Number):
             return False
-   
-    def __ne__(self, other):
+        if isinstance(self._deriv, Derivative) or isinstance(other._deriv, Derivative):
+            return bool(np.all(self.val == other.val)) and self._deriv == other._deriv
+        if self.val == other.val:
+            deriv_self = self._deriv.copy()
+            deriv_other = other._deriv.copy()
+            deriv_self.pop(self, None)
+            deriv_other.pop(other, None)
+            if deriv_self==deriv_other:
+                return True
+        return False
+
+class ColumnIndex():
+    '''
+    ColumnIndex maps the Numbers of the order of a jacobian matrix to its columns. 
+    Array.jacobian() builds one on every call, building it once and passing it as the order
+    instead saves that when the same order is used repeatedly (e.g. in the loop of an
+    optimizer).
+    
+    Args:
+        order: an iterable of Number objects, the columns of the jacobian matrix
+    
+    Returns:
+        ColumnIndex, to be used as the order of Array.jacobian() or Number.jacobian().
+    
+    Example:
+        >>> import autodiff
+        >>> x = autodiff.structures.Array([1, 2])
+        >>> index = autodiff.structures.ColumnIndex(x)
+        >>> (x * 3).jacobian(index)
+        array([[3., 0.],
+               [0., 3.]])
+    '''
+
+    def __init__(self, order):
+        self.order = list(order)
+        columns = {}
+        for j, key in enumerate(self.order):
+            columns.setdefault(key, []).append(j)
+        # A single column is scattered to faster than a list of them
+        self.columns = {key: js[0] if len(js) == 1 else js for key, js in columns.items()}
+        self._slots = {}
+
+    def __len__(self):
         '''
-        Overloads the Comparison Operator to check whether two Number 
-        objects are not equal to each other
-   
+        Overloads the len() method to give the number of columns.
+        '''
+        return len(self.order)
+
+    def __iter__(self):
+        '''
+        Iterates over the order, so a ColumnIndex can be used wherever an order can.
+        '''
+        return iter(self.order)
+
+    def __repr__(self):
+        '''
+        Overloads the print method to give a string representation of ColumnIndex object.
+        '''
+        return f'ColumnIndex(columns={len(self.order)})'
+
+    def slots(self, deriv):
+        '''
+        Finds the slots of the order in the TangentSpace of a Tangent or SparseTangent,
+        once per TangentSpace.
+        
         Args:
-            other: the other Number object to be compared with
-   
+            deriv: a Tangent or a SparseTangent
+        
         Returns:
-            True if two Number objects are not equal, False otherwise.
+            a np.ndarray of ints, as returned by deriv.slots().
         '''
-        return not self.__eq__(other)
+        key = (type(deriv), deriv.space)
+        if key not in self._slots:
+            self._slots[key] = deriv.slots(self.order)
+        return self._slots[key]
 
 class Array():
     '''
@@ -396,14 +552,17 @@ class Array():
         >>> arr = autodiff.structures.Array([x, a])
         Array([Number(val=3) Number(val=3)])
         >>> arr.jacobian(a)
-        array([0, 2])
+        array([0., 2.])
     '''
 
     def __init__(self, iterable):
-        self._data = np.array(iterable, dtype=np.object)
-        for i, d in enumerate(self._data):
+        data = list(iterable)
+        # Fill the elements one by one, so that numpy doesn't iterate into DenseArrays
+        self._data = np.empty(len(data), dtype=np.object)
+        for i, d in enumerate(data):
             if not isinstance(d, Number):
-                self._data[i] = Number(d)
+                d = Number(d)
+            self._data[i] = d
 
     def __str__(self):
         '''
@@ -468,11 +627,9 @@ class Array():
         Returns:
             an Array object, which is the sum.
         '''
-        try:
-            # If they're both Array2 objects
-            return Array(self._data.__add__(other._data))
-        except AttributeError:
-            return Array(self._data.__add__(other))
+        if isinstance(other, Array):
+            other = other._data
+        return Array(self._data.__add__(other))
 
     def __radd__(self, other):
         '''
@@ -498,11 +655,9 @@ class Array():
         Returns:
             an Array object, which is the difference.
         '''
-        try:
-            # If they're both Array2 objects
-            return Array(self._data.__sub__(other._data))
-        except AttributeError:
-            return Array(self._data.__sub__(other))
+        if isinstance(other, Array):
+            other = other._data
+        return Array(self._data.__sub__(other))
 
     def __rsub__(self, other):
         '''
@@ -529,11 +684,9 @@ class Array():
         Returns:
             an Array object, which is the product.
         '''
-        try:
-            # If they're both Array2 objects
-            return Array(self._data.__mul__(other._data))
-        except AttributeError:
-            return Array(self._data.__mul__(other))
+        if isinstance(other, Array):
+            other = other._data
+        return Array(self._data.__mul__(other))
 
     def __rmul__(self, other):
         '''
@@ -560,11 +713,9 @@ class Array():
         Returns:
             an Array object, which is the quotient.
         '''
-        try:
-            # If they're both Array2 objects
-            return Array(self._data.__truediv__(other._data))
-        except AttributeError:
-            return Array(self._data.__truediv__(other))
+        if isinstance(other, Array):
+            other = other._data
+        return Array(self._data.__truediv__(other))
 
     def __rtruediv__(self, other):
         '''
@@ -591,11 +742,9 @@ class Array():
         Returns:
             an Array object, which is the product.
         '''
-        try:
-            # If they're both Array objects
-            out = self._data.__matmul__(other._data)
-        except AttributeError:
-            out = self._data.__matmul__(other)
+        if isinstance(other, Array):
+            other = other._data
+        out = self._data.__matmul__(other)
         return(out)
 
     def __rmatmul__(self, other):
@@ -624,11 +773,9 @@ class Array():
         Returns:
             an Array object, which is the power.
         '''
-        try:
-            # If they're both Array2 objects
-            return Array(self._data.__pow__(other._data))
-        except AttributeError:
-            return Array(self._data.__pow__(other))
+        if isinstance(other, Array):
+            other = other._data
+        return Array(self._data.__pow__(other))
 
     def __rpow__(self, other):
         '''
@@ -662,37 +809,123 @@ class Array():
         '''
         return self.__matmul__(other)
 
-    def jacobian(self, order):
+    def jacobian(self, order, sparse=False):
         '''
         Returns the jacobian matrix by the order specified.
         
         Args:
-            order: the order to return the jacobian matrix in. Has to be not null
+            order: the order to return the jacobian matrix in. Has to be not null. A
+                ColumnIndex can be passed to reuse it across calls.
+            sparse: if True, return the jacobian matrix as a CSRMatrix. In sparse mode
+                (see sparse_variables()), it's built from the SparseTangents directly.
         
         Returns:
             a np.ndarray of partial derivatives specified by the order. Each row is
             an element in the original array, each column is the order specified.
             When order is a single element, it returns a flat array.
         '''
-        def _partial(deriv, key):
-            try:
-                return deriv[key]
-            except KeyError:
-                # If there's no partial, it's zero
-                return 0
-
-        jacobian = []
-        for element in self._data:
-            # Check if order is iterable
-            try:
-                jacobian_row = []
-                for key in order:
-                    jacobian_row.append(_partial(element._deriv, key))
-                jacobian.append(jacobian_row)
-            except TypeError:
-                jacobian.append(_partial(element._deriv, order))
-        
-        return np.array(jacobian)
+        scalar = isinstance(order, Number)
+        if scalar:
+            index = ColumnIndex([order])
+        elif isinstance(order, ColumnIndex):
+            index = order
+        else:
+            index = ColumnIndex(order)
+
+        if sparse:
+            return self._sparse_jacobian(index)
+
+        derivs = [element._deriv if isinstance(element, Number) else None for element in self._data]
+        if derivs and all(isinstance(deriv, Tangent) for deriv in derivs):
+            space = derivs[0].space
+            if all(deriv.space is space for deriv in derivs):
+                # Dense mode: stack the tangents once and slice the requested columns
+                tangent = Tangent(np.stack([deriv.vec for deriv in derivs]), space)
+                jacobian = tangent.take(index.slots(tangent))
+                return jacobian[:, 0] if scalar else jacobian
+
+        try:
+            jacobian = self._scatter(derivs, index)
+        except TypeError:
+            # Partial derivatives that are Numbers themselves (nested Numbers)
+            return np.array([element.jacobian(order) for element in self._data])
+        return jacobian[:, 0] if scalar else jacobian
+
+    def _scatter(self, derivs, index):
+        '''
+        Scatters the partial derivatives of every element into a preallocated matrix,
+        looking the columns up in index.
+        '''
+        jacobian = np.zeros((len(derivs), len(index)))
+        columns = index.columns
+        for i, deriv in enumerate(derivs):
+            if deriv is None:
+                # A constant element
+                continue
+            if type(deriv) is Lazy:
+                deriv = deriv.materialize()
+            if isinstance(deriv, Derivative):
+                jacobian[i] = deriv.jacobian(index.order)
+            elif len(deriv) <= len(columns):
+                for key, value in deriv.items():
+                    j = columns.get(key)
+                    if j is not None:
+                        jacobian[i, j] = value
+            else:
+                for key, j in columns.items():
+                    value = deriv.get(key)
+                    if value is not None:
+                        jacobian[i, j] = value
+        return jacobian
+
+    def _sparse_jacobian(self, index):
+        '''
+        Returns the jacobian matrix by the order specified (a ColumnIndex) as a CSRMatrix.
+        '''
+        derivs = [element._deriv if isinstance(element, Number) else None for element in self._data]
+        if derivs and all(isinstance(deriv, SparseTangent) for deriv in derivs):
+            space = derivs[0].space
+            if all(deriv.space is space for deriv in derivs):
+                # Sparse mode: relabel the slots of all rows as columns at once
+                columns = np.full(space.size, -1)
+                slots = index.slots(derivs[0])
+                known = slots >= 0
+                columns[slots[known]] = np.arange(len(index))[known]
+
+                lengths = [len(deriv.indices) for deriv in derivs]
+                rows = np.repeat(np.arange(len(derivs)), lengths)
+                cols = columns[np.concatenate([deriv.indices for deriv in derivs])]
+                data = np.concatenate([deriv.values for deriv in derivs])
+                kept = cols >= 0
+                rows, cols, data = rows[kept], cols[kept], data[kept]
+                sort = np.lexsort((cols, rows))
+                indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=len(derivs)))])
+                return CSRMatrix(data[sort], cols[sort], indptr, (len(derivs), len(index)))
+
+        if not any(isinstance(deriv, Derivative) and type(deriv) is not Lazy for deriv in derivs):
+            # Default mode: gather the entries of every row without a dense matrix
+            data, indices, indptr = [], [], [0]
+            for deriv in derivs:
+                if deriv is not None:
+                    if type(deriv) is Lazy:
+                        deriv = deriv.materialize()
+                    row = {}
+                    for key, value in deriv.items():
+                        js = index.columns.get(key)
+                        if js is not None:
+                            for j in (js if isinstance(js, list) else [js]):
+                                row[j] = value
+                    for j in sorted(row):
+                        if row[j] != 0:
+                            indices.append(j)
+                            data.append(row[j])
+                indptr.append(len(indices))
+            return CSRMatrix(np.array(data, dtype=float), indices, indptr, (len(derivs), len(index)))
+
+        dense = self.jacobian(index).reshape(len(self._data), len(index))
+        rows, cols = np.nonzero(dense)
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=len(dense)))])
+        return CSRMatrix(dense[rows, cols], cols, indptr, dense.shape)
     
     def __eq__(self, other):
         '''
@@ -732,3 +965,901 @@ class Array():
         '''
         return not self.__eq__(other)
 
+    def equals(self, other):
+        '''
+        Checks whether two Array objects hold Numbers with the same values and partial
+        derivatives (see Number.equals()), and the same constants.
+   
+        Args:
+            other: the other Array object to be compared with
+   
+        Returns:
+            True if two Array objects are equal, False otherwise.
+        '''
+        if not isinstance(other, Array) or len(self) != len(other):
+            return False
+        for mine, theirs in zip(self._data, other._data):
+            if isinstance(mine, Number):
+                if not mine.equals(theirs):
+                    return False
+            elif isinstance(theirs, Number) or not mine == theirs:
+                return False
+        return True
+
+
+
+class Derivative():
+    '''
+    Derivative is the base class of the representations of the derivative of a Number 
+    other than the default dict of partial derivatives. A Number holding a Derivative
+    only tracks the independent variables of its own computation.
+    
+    Subclasses implement chain(), used by the elementary operations to apply the chain 
+    rule, and jacobian(), used by Number.jacobian(). Those that seed independent
+    variables implement variables(), used to re-seed the iterates of iterative methods.
+    '''
+
+    @classmethod
+    def variables(cls, values):
+        '''
+        Creates independent variables in the mode of this Derivative.
+
+        Args:
+            values: an iterable of ints/floats, the values of the independent variables
+
+        Returns:
+            an Array of Number objects.
+        '''
+        raise TypeError(f'Cannot create independent variables with {cls.__name__} derivatives')
+
+    @classmethod
+    def chain(cls, terms):
+        '''
+        Applies the chain rule for an elementary operation.
+        
+        Args:
+            terms: a list of (derivative, partial) pairs, where derivative is the Derivative 
+                of an operand and partial is the partial derivative of the elementary 
+                operation w.r.t. that operand
+        
+        Returns:
+            the Derivative of the result of the elementary operation.
+        '''
+        raise NotImplementedError
+
+    def jacobian(self, order):
+        '''
+        Returns the partial derivatives by the order specified.
+        
+        Args:
+            order: a Number object or an iterable of Number objects
+        
+        Returns:
+            a scalar when order is a single Number, a np.ndarray otherwise.
+        '''
+        raise NotImplementedError
+
+class Lazy(Derivative):
+    '''
+    Lazy is the derivative of a Number computed within lazy(). It holds the local partial
+    derivatives of the elementary operation that computed the Number, together with the
+    derivatives (dicts or Lazy) of its operands. The dict of partial derivatives is only
+    built by jacobian(), with one reverse sweep over the operations it depends on.
+
+    Args:
+        terms: a list of (derivative, partial) pairs, see Derivative.chain()
+
+    Returns:
+        Lazy, to be used as the derivative of a Number.
+    '''
+
+    __slots__ = ('terms', '_deriv')
+
+    def __init__(self, terms):
+        self.terms = terms
+        self._deriv = None
+
+    def __repr__(self):
+        '''
+        Overloads the print method to give a string representation of Lazy object.
+
+        Returns:
+            a string specifiying the number of operands.
+        '''
+        return f'Lazy(terms={len(self.terms)})'
+
+    @classmethod
+    def chain(cls, terms):
+        '''
+        Records the local partial derivatives of an elementary operation.
+
+        Args:
+            terms: a list of (derivative, partial) pairs
+
+        Returns:
+            the Lazy derivative of the result of the elementary operation.
+        '''
+        return Lazy(terms)
+
+    @classmethod
+    def variables(cls, values):
+        '''
+        Creates independent variables, which have derivative dicts within lazy() too.
+
+        Args:
+            values: an iterable of ints/floats, the values of the independent variables
+
+        Returns:
+            an Array of Number objects in default mode.
+        '''
+        return Array([Number(val) for val in values])
+
+    def materialize(self):
+        '''
+        Builds the dict of partial derivatives, once, and releases the operands.
+
+        Returns:
+            a dict of partial derivatives w.r.t. the Numbers with a derivative dict this
+            derivative was computed from.
+        '''
+        if self._deriv is not None:
+            return self._deriv
+
+        # Postorder of the unmaterialized Lazy derivatives this one depends on
+        postorder = []
+        seen = {id(self)}
+        stack = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                postorder.append(node)
+                continue
+            stack.append((node, True))
+            for deriv, _ in node.terms:
+                if type(deriv) is Lazy and deriv._deriv is None and id(deriv) not in seen:
+                    seen.add(id(deriv))
+                    stack.append((deriv, False))
+
+        # Reverse sweep: every node comes before the operands it depends on
+        adjoints = {id(self): 1}
+        d = {}
+        for node in reversed(postorder):
+            adjoint = adjoints.pop(id(node))
+            for deriv, partial in node.terms:
+                if type(deriv) is Lazy:
+                    if deriv._deriv is None:
+                        key = id(deriv)
+                        adjoints[key] = adjoints.get(key, 0) + adjoint * partial
+                        continue
+                    deriv = deriv._deriv
+                weight = adjoint * partial
+                for key, value in deriv.items():
+                    if key in d:
+                        d[key] = d[key] + weight * value
+                    else:
+                        d[key] = weight * value
+        self._deriv = d
+        # The operands aren't needed any more, don't keep them alive
+        self.terms = ()
+        return d
+
+    def jacobian(self, order):
+        '''
+        Returns the partial derivatives by the order specified, building the dict of
+        partial derivatives on the first call.
+
+        Args:
+            order: a Number object or an iterable of Number objects
+
+        Returns:
+            a scalar when order is a single Number, a np.ndarray otherwise.
+        '''
+        deriv = self.materialize()
+        if isinstance(order, Number):
+            return deriv.get(order, 0)
+        return np.array([deriv.get(key, 0) for key in order])
+
+class TangentSpace():
+    '''
+    TangentSpace gives every independent variable of a dense mode computation an 
+    integer slot. All Tangent objects of the computation refer to the same TangentSpace,
+    so that their slots mean the same thing.
+    
+    Args:
+        size: the number of independent variables
+    
+    Returns:
+        TangentSpace, the space of the tangents of a computation.
+    '''
+
+    def __init__(self, size):
+        self.size = size
+
+    def __repr__(self):
+        '''
+        Overloads the print method to give a string representation of TangentSpace object.
+        
+        Returns:
+            a string specifiying the number of independent variables.
+        '''
+        return f'TangentSpace(size={self.size})'
+
+class Tangent(Derivative):
+    '''
+    Tangent is the derivative of a Number in dense mode. Instead of a dict keyed by
+    Number objects, it stores the partial derivatives w.r.t. every independent variable
+    of its TangentSpace in a contiguous float64 np.ndarray, so that the chain rule becomes
+    a single vectorized numpy expression.
+    
+    Args:
+        vec: np.ndarray of partial derivatives. Its last axis is indexed by slot.
+        space: the TangentSpace the slots belong to
+        slot: the slot of the independent variable this Tangent seeds. None for the
+            results of elementary operations.
+    
+    Returns:
+        Tangent, to be used as the derivative of a Number.
+    
+    Example:
+        >>> import autodiff
+        >>> x, y = autodiff.structures.dense_variables([2, 3])
+        >>> x._deriv.vec
+        array([1., 0.])
+        >>> (x * y)._deriv.vec
+        array([3., 2.])
+    '''
+
+    def __init__(self, vec, space, slot=None):
+        self.vec = vec
+        self.space = space
+        self.slot = slot
+
+    def __repr__(self):
+        '''
+        Overloads the print method to give a string representation of Tangent object.
+        
+        Returns:
+            a string specifiying the partial derivatives.
+        '''
+        return f'Tangent(vec={self.vec})'
+
+    def __eq__(self, other):
+        '''
+        Overloads the Comparison Operator to check whether two Tangent objects of the same
+        TangentSpace hold the same partial derivatives.
+        
+        Args:
+            other: the other Tangent object to be compared with
+        
+        Returns:
+            True if two Tangent objects are equal, False otherwise.
+        '''
+        return (isinstance(other, Tangent) and self.space is other.space
+                and np.array_equal(self.vec, other.vec))
+
+    @classmethod
+    def chain(cls, terms):
+        '''
+        Applies the chain rule for an elementary operation as a single numpy expression.
+        
+        Args:
+            terms: a list of (Tangent, partial) pairs
+        
+        Returns:
+            the Tangent of the result of the elementary operation.
+        '''
+        space = terms[0][0].space
+        if any(tangent.space is not space for tangent, _ in terms):
+            raise ValueError('Cannot combine Tangents of different TangentSpaces')
+        vec = sum(np.asarray(partial)[..., np.newaxis] * tangent.vec for tangent, partial in terms)
+        return Tangent(vec, space)
+
+    @classmethod
+    def variables(cls, values):
+        '''
+        Creates independent variables in dense mode, see dense_variables().
+        '''
+        return dense_variables(values)
+
+    def jacobian(self, order):
+        '''
+        Returns the partial derivatives by the order specified, by slicing the tangent vector.
+        
+        Args:
+            order: a Number object or an iterable of Number objects
+        
+        Returns:
+            a scalar when order is a single Number, a np.ndarray otherwise.
+        '''
+        return self.take(self.slots(order))
+
+    def slots(self, order):
+        '''
+        Finds the slots of the independent variables in order.
+        
+        Args:
+            order: a Number object or an iterable of Number objects
+        
+        Returns:
+            an int when order is a single Number, a np.ndarray of ints otherwise. Numbers
+            that aren't independent variables of this TangentSpace get the slot -1.
+        '''
+        def _slot(key):
+            if (isinstance(key, Number) and isinstance(key._deriv, Tangent)
+                    and key._deriv.space is self.space and key._deriv.slot is not None):
+                return key._deriv.slot
+            return -1
+
+        if isinstance(order, Number):
+            return _slot(order)
+        return np.array([_slot(key) for key in order], dtype=int)
+
+    def take(self, slots):
+        '''
+        Slices the partial derivatives at the slots specified.
+        
+        Args:
+            slots: an int or a np.ndarray of ints, as returned by Tangent.slots()
+        
+        Returns:
+            the partial derivatives at slots, zero where the slot is -1.
+        '''
+        if np.ndim(slots) == 0:
+            if slots < 0:
+                return np.zeros(self.vec.shape[:-1])[()]
+            return self.vec[..., slots][()]
+
+        if np.array_equal(slots, np.arange(self.space.size)):
+            return self.vec.copy()
+        jacobian = np.zeros(self.vec.shape[:-1] + (len(slots),))
+        known = slots >= 0
+        jacobian[..., known] = self.vec[..., slots[known]]
+        return jacobian
+
+def dense_variables(values):
+    '''
+    Creates the independent variables of a dense mode computation. Each of them gets 
+    a slot in a new TangentSpace and a unit Tangent as its derivative.
+    
+    Args:
+        values: an iterable of ints/floats, the values of the independent variables
+    
+    Returns:
+        an Array of Number objects in dense mode.
+    
+    Example:
+        >>> import autodiff
+        >>> x = autodiff.structures.dense_variables([1, 2])
+        >>> (x[0] * x[1]).jacobian(x)
+        array([2., 1.])
+    '''
+    values = list(values)
+    space = TangentSpace(len(values))
+    seeds = np.identity(len(values))
+    return Array([Number(val, Tangent(seeds[slot], space, slot)) 
+                  for slot, val in enumerate(values)])
+
+class CSRMatrix():
+    '''
+    CSRMatrix is a sparse matrix in compressed sparse row format. The column indices of
+    the nonzero entries of row k are indices[indptr[k]:indptr[k + 1]], sorted, and their
+    values are the same slice of data.
+
+    Args:
+        data: np.ndarray of the nonzero entries
+        indices: np.ndarray of the column indices of the nonzero entries
+        indptr: np.ndarray of the start of every row in data and indices, followed by
+            the number of nonzero entries
+        shape: tuple of the number of rows and columns
+
+    Returns:
+        CSRMatrix, a sparse matrix.
+
+    Example:
+        >>> from autodiff.structures import CSRMatrix
+        >>> CSRMatrix([1., 2.], [0, 1], [0, 1, 2], (2, 2)).toarray()
+        array([[1., 0.],
+               [0., 2.]])
+    '''
+
+    def __init__(self, data, indices, indptr, shape):
+        self.data = np.asarray(data, dtype=float)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.shape = tuple(shape)
+
+    def __repr__(self):
+        '''
+        Overloads the print method to give a string representation of CSRMatrix object.
+
+        Returns:
+            a string specifiying the shape and number of nonzero entries.
+        '''
+        return f'CSRMatrix(shape={self.shape}, nnz={self.nnz})'
+
+    @property
+    def nnz(self):
+        '''
+        Returns:
+            the number of stored entries.
+        '''
+        return len(self.indices)
+
+    def rows(self):
+        '''
+        Returns:
+            a np.ndarray of the row index of every stored entry.
+        '''
+        return np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+
+    def toarray(self):
+        '''
+        Returns:
+            the matrix as a dense np.ndarray.
+        '''
+        dense = np.zeros(self.shape)
+        dense[self.rows(), self.indices] = self.data
+        return dense
+
+    def __matmul__(self, other):
+        '''
+        Overloads the matrix multiplication operator to multiply CSRMatrix with a vector.
+
+        Args:
+            other: a 1-d np.ndarray of length shape[1]
+
+        Returns:
+            a np.ndarray of length shape[0].
+        '''
+        other = np.asarray(other, dtype=float)
+        return np.bincount(
+            self.rows(), weights=self.data * other[self.indices], minlength=self.shape[0]
+        )
+
+    def __eq__(self, other):
+        '''
+        Overloads the Comparison Operator to check whether two CSRMatrix objects store
+        the same entries.
+
+        Args:
+            other: the other CSRMatrix object to be compared with
+
+        Returns:
+            a boolean indicating whether the two CSRMatrix objects are equal.
+        '''
+        if not isinstance(other, CSRMatrix):
+            return False
+        return (self.shape == other.shape
+                and np.array_equal(self.indptr, other.indptr)
+                and np.array_equal(self.indices, other.indices)
+                and np.array_equal(self.data, other.data))
+
+class SparseTangent(Derivative):
+    '''
+    SparseTangent is the derivative of a Number in sparse mode. It stores the slots of the
+    independent variables the Number depends on as a sorted int32 np.ndarray, and the
+    partial derivatives w.r.t. them as a float64 np.ndarray. The chain rule merges the
+    sorted slots of the operands with vectorized numpy operations, so computations with
+    thousands of inputs but few per intermediate stay cheap.
+
+    Args:
+        indices: sorted np.ndarray of the slots with a partial derivative
+        values: np.ndarray of the partial derivatives at indices
+        space: the TangentSpace the slots belong to
+        slot: the slot of the independent variable this SparseTangent seeds. None for the
+            results of elementary operations.
+
+    Returns:
+        SparseTangent, to be used as the derivative of a Number.
+
+    Example:
+        >>> import autodiff
+        >>> x = autodiff.structures.sparse_variables([2, 3, 4])
+        >>> (x[0] * x[2])._deriv.indices
+        array([0, 2], dtype=int32)
+        >>> (x[0] * x[2])._deriv.values
+        array([4., 2.])
+    '''
+
+    def __init__(self, indices, values, space, slot=None):
+        self.indices = indices
+        self.values = values
+        self.space = space
+        self.slot = slot
+
+    def __repr__(self):
+        '''
+        Overloads the print method to give a string representation of SparseTangent object.
+
+        Returns:
+            a string specifiying the slots and partial derivatives.
+        '''
+        return f'SparseTangent(indices={self.indices}, values={self.values})'
+
+    def __eq__(self, other):
+        '''
+        Overloads the Comparison Operator to check whether two SparseTangent objects of the
+        same TangentSpace hold the same partial derivatives.
+
+        Args:
+            other: the other SparseTangent object to be compared with
+
+        Returns:
+            True if two SparseTangent objects are equal, False otherwise.
+        '''
+        return (isinstance(other, SparseTangent) and self.space is other.space
+                and np.array_equal(self.indices, other.indices)
+                and np.array_equal(self.values, other.values))
+
+    @classmethod
+    def chain(cls, terms):
+        '''
+        Applies the chain rule for an elementary operation by merging the sorted slots of
+        the operands and summing the scaled partial derivatives of equal slots.
+
+        Args:
+            terms: a list of (SparseTangent, partial) pairs
+
+        Returns:
+            the SparseTangent of the result of the elementary operation.
+        '''
+        space = terms[0][0].space
+        if any(tangent.space is not space for tangent, _ in terms):
+            raise ValueError('Cannot combine SparseTangents of different TangentSpaces')
+        if len(terms) == 1:
+            tangent, partial = terms[0]
+            return SparseTangent(tangent.indices, partial * tangent.values, space)
+
+        indices = np.concatenate([tangent.indices for tangent, _ in terms])
+        values = np.concatenate([partial * tangent.values for tangent, partial in terms])
+        merged, inverse = np.unique(indices, return_inverse=True)
+        values = np.bincount(inverse, weights=values, minlength=len(merged))
+        return SparseTangent(merged.astype(np.int32), values, space)
+
+    @classmethod
+    def variables(cls, values):
+        '''
+        Creates independent variables in sparse mode, see sparse_variables().
+        '''
+        return sparse_variables(values)
+
+    def jacobian(self, order):
+        '''
+        Returns the partial derivatives by the order specified, by searching the sorted
+        slots.
+
+        Args:
+            order: a Number object or an iterable of Number objects
+
+        Returns:
+            a scalar when order is a single Number, a np.ndarray otherwise.
+        '''
+        return self.take(self.slots(order))
+
+    def slots(self, order):
+        '''
+        Finds the slots of the independent variables in order.
+
+        Args:
+            order: a Number object or an iterable of Number objects
+
+        Returns:
+            an int when order is a single Number, a np.ndarray of ints otherwise. Numbers
+            that aren't independent variables of this TangentSpace get the slot -1.
+        '''
+        def _slot(key):
+            if (isinstance(key, Number) and isinstance(key._deriv, SparseTangent)
+                    and key._deriv.space is self.space and key._deriv.slot is not None):
+                return key._deriv.slot
+            return -1
+
+        if isinstance(order, Number):
+            return _slot(order)
+        return np.array([_slot(key) for key in order], dtype=int)
+
+    def take(self, slots):
+        '''
+        Looks up the partial derivatives at the slots specified.
+
+        Args:
+            slots: an int or a np.ndarray of ints, as returned by SparseTangent.slots()
+
+        Returns:
+            the partial derivatives at slots, zero where there's none.
+        '''
+        slots = np.asarray(slots)
+        positions = np.minimum(np.searchsorted(self.indices, slots), len(self.indices) - 1)
+        if len(self.indices) == 0:
+            return np.zeros(slots.shape)[()]
+        found = (self.indices[positions] == slots) & (slots >= 0)
+        return np.where(found, self.values[positions], 0.)[()]
+
+def sparse_variables(values):
+    '''
+    Creates the independent variables of a sparse mode computation. Each of them gets
+    a slot in a new TangentSpace and a SparseTangent with a single partial derivative.
+
+    Args:
+        values: an iterable of ints/floats, the values of the independent variables
+
+    Returns:
+        an Array of Number objects in sparse mode.
+
+    Example:
+        >>> import autodiff
+        >>> x = autodiff.structures.sparse_variables([1, 2, 3])
+        >>> y = autodiff.structures.Array([x[0] * x[1], x[2] + 1])
+        >>> y.jacobian(x, sparse=True).toarray()
+        array([[2., 1., 0.],
+               [0., 0., 1.]])
+    '''
+    values = list(values)
+    space = TangentSpace(len(values))
+    one = np.ones(1)
+    return Array([
+        Number(val, SparseTangent(np.array([slot], dtype=np.int32), one, space, slot))
+        for slot, val in enumerate(values)
+    ])
+
+class DenseArray(Number):
+    '''
+    DenseArray is the structure-of-arrays counterpart of Array in dense mode. Rather than
+    one Number object per element, it holds the values of all elements in a float64 
+    np.ndarray and their derivatives in a Tangent whose vec is an 
+    (n_elements x n_inputs) matrix. Arithmetic and the functions in autodiff.operations 
+    run as whole-array numpy calls on it.
+    
+    Args:
+        values: an iterable of ints/floats, the values of the elements
+        deriv: a Tangent whose vec has one row per element. If None, the elements are new
+            independent variables, each seeded in its own slot of a new TangentSpace. 
+            When its slot is a single int, the DenseArray is one independent variable 
+            evaluated at a batch of points (see autodiff.forward.batch()).
+    
+    Returns:
+        DenseArray, an object to perform automatic differentiation on.
+        
+    Example:
+        >>> import autodiff
+        >>> x = autodiff.structures.DenseArray([1, 2])
+        >>> y = x * x
+        >>> y
+        DenseArray(val=[1. 4.])
+        >>> y.jacobian(x)
+        array([[2., 0.],
+               [0., 4.]])
+    '''
+
+    # Make numpy defer to the reflected operators of DenseArray, rather than looping 
+    # over its elements
+    __array_ufunc__ = None
+
+    def __init__(self, values, deriv=None):
+        self.val = np.array(values, dtype=float)
+        if deriv is None:
+            size = len(self.val)
+            deriv = Tangent(np.identity(size), TangentSpace(size), np.arange(size))
+        self._deriv = deriv
+
+    def __repr__(self):
+        '''
+        Overloads the print method to give a string representation of DenseArray object.
+        
+        Returns:
+            a string specifiying the values of the elements.
+        '''
+        return f'DenseArray(val={self.val})'
+
+    def __len__(self):
+        '''
+        Overloads the len() method to give the length of DenseArray.
+        
+        Returns:
+            an integer representing number of elements in DenseArray.
+        '''
+        return len(self.val)
+
+    def __getitem__(self, idx):
+        '''
+        Overloads [idx] to get an item of the DenseArray at a specific postion.
+        
+        Args:
+            idx, the index (or slice) to take elements at.
+        
+        Returns:
+            a Number object in dense mode for a single index, a DenseArray otherwise.
+        '''
+        if _no_grad or not isinstance(self._deriv, Tangent):
+            return operations._value_only(self.val[idx], True)
+        slot = self._deriv.slot
+        if np.ndim(slot) > 0:
+            # A single slot is shared by all elements of a batch
+            slot = slot[idx]
+        tangent = Tangent(self._deriv.vec[idx].copy(), self._deriv.space, slot)
+        if np.ndim(self.val[idx]) == 0:
+            return Number(self.val[idx], tangent)
+        return DenseArray(self.val[idx], tangent)
+
+    def __setitem__(self, idx, val):
+        '''
+        Sets an item of the DenseArray at a specific postion with the value specified.
+        
+        Args:
+            idx, the index to set element at
+            val, a Number object of the same TangentSpace
+        '''
+        if not (isinstance(val, Number) and isinstance(val._deriv, Tangent)
+                and val._deriv.space is self._deriv.space):
+            raise ValueError('invalid literal for DenseArray(): {}'.format(val))
+        self.val[idx] = val.val
+        self._deriv.vec[idx] = val._deriv.vec
+        if self._deriv.slot is not None:
+            # The element isn't the seed of its slot any more
+            self._deriv.slot = np.array(np.broadcast_to(self._deriv.slot, self.val.shape))
+            self._deriv.slot[idx] = -1
+
+    def __matmul__(self, other):
+        '''
+        Overloads matrix multiplication to multiply two DenseArrays, or a DenseArray
+        and a np.ndarray vector or matrix.
+        
+        Args:
+            other, another DenseArray of same length, or a np.ndarray
+        
+        Returns:
+            a Number object for vector products, a DenseArray for matrix products.
+        '''
+        if _no_grad:
+            return operations._value_only(self.val @ _dense_values(other), True)
+        if not isinstance(self._deriv, Tangent):
+            # Computed within no_grad(), a constant
+            return self.val @ other
+        if isinstance(other, DenseArray) and not isinstance(other._deriv, Tangent):
+            other = other.val
+        if isinstance(other, DenseArray):
+            if other._deriv.space is not self._deriv.space:
+                raise ValueError('Cannot combine Tangents of different TangentSpaces')
+            vec = other.val @ self._deriv.vec + self.val @ other._deriv.vec
+            return Number(self.val @ other.val, Tangent(vec, self._deriv.space))
+        other = np.asarray(other)
+        return _dense(self.val @ other, Tangent(other.T @ self._deriv.vec, self._deriv.space))
+
+    def __rmatmul__(self, other):
+        '''
+        Overloads right matrix multiplication to multiply a np.ndarray vector or matrix 
+        and a DenseArray.
+        
+        Args:
+            other, a np.ndarray
+        
+        Returns:
+            a Number object for vector products, a DenseArray for matrix products.
+        '''
+        other = np.asarray(other)
+        if _no_grad or not isinstance(self._deriv, Tangent):
+            return operations._value_only(other @ self.val, True)
+        return _dense(other @ self.val, Tangent(other @ self._deriv.vec, self._deriv.space))
+
+    def dot(self, other):
+        '''
+        Defines the dot product on two DenseArray objects.
+        
+        Returns:
+            a Number object, which is the dot product.
+        '''
+        return self.__matmul__(other)
+
+    def sum(self):
+        '''
+        Sums the elements of the DenseArray.
+        
+        Returns:
+            a Number object in dense mode, which is the sum.
+        '''
+        if _no_grad or not isinstance(self._deriv, Tangent):
+            return operations._value_only(self.val.sum())
+        return Number(self.val.sum(), Tangent(self._deriv.vec.sum(axis=0), self._deriv.space))
+
+    def equals(self, other):
+        '''
+        Checks whether two DenseArray objects have the same values and the same partial
+        derivatives.
+   
+        Args:
+            other: the other DenseArray object to be compared with
+   
+        Returns:
+            True if two DenseArray objects are equal, False otherwise.
+        '''
+        return (isinstance(other, DenseArray) and np.array_equal(self.val, other.val)
+                and self._deriv == other._deriv)
+
+def _dense_values(x):
+    '''
+    Values of the other operand of a matrix product with a DenseArray.
+
+    Args:
+        x: a DenseArray or a np.ndarray
+
+    Returns:
+        a np.ndarray.
+    '''
+    if isinstance(x, DenseArray):
+        return x.val
+    return np.asarray(x)
+
+def _dense(val, tangent):
+    '''
+    Wraps the result of a dense mode computation.
+    
+    Args:
+        val: a float or a np.ndarray of values
+        tangent: the Tangent of the result
+    
+    Returns:
+        a DenseArray if val is a np.ndarray, a Number otherwise.
+    '''
+    if np.ndim(val) > 0:
+        return DenseArray(val, tangent)
+    return Number(val, tangent)
+
+def _values(x):
+    '''
+    Values of a point to differentiate at.
+
+    Args:
+        x: a Number, an int/float, or an iterable (e.g. Array, list, np.ndarray) of them
+
+    Returns:
+        a float for scalar points, a list of floats otherwise.
+    '''
+    if isinstance(x, Number):
+        return x.val
+    if np.ndim(x) == 0 and not isinstance(x, Array):
+        return x
+    return [element.val if isinstance(element, Number) else element for element in x]
+
+def _reseed(x):
+    '''
+    Fresh independent variables at the values of x. Iterative methods re-seed every
+    iterate, so that its derivative dicts don't hold (and keep alive) the previous
+    iterates and all the intermediates they were computed from. The variables are
+    seeded in the mode of the derivatives of x (see Derivative.variables()).
+
+    Args:
+        x: a Number, or an iterable (e.g. Array) of Numbers or ints/floats
+
+    Returns:
+        a Number for a Number, a DenseArray for a DenseArray, an Array of Numbers otherwise.
+
+    Raises:
+        TypeError: if the mode of x can't seed independent variables.
+    '''
+    if isinstance(x, DenseArray):
+        return DenseArray(x.val)
+    elements = [x] if isinstance(x, Number) else x
+    deriv = next((element._deriv for element in elements if isinstance(element, Number)
+                  and isinstance(element._deriv, Derivative)), None)
+    if isinstance(x, Number):
+        if deriv is None:
+            return Number(x.val)
+        return type(deriv).variables([x.val])[0]
+    if deriv is None:
+        return Array([Number(element) for element in _values(x)])
+    return type(deriv).variables(_values(x))
+
+def _outputs(out):
+    '''
+    Elements of the output of a function.
+
+    Args:
+        out: a Number, an int/float, or an iterable (e.g. Array, tuple) of them
+
+    Returns:
+        a list of the elements of out, and whether out is a scalar.
+    '''
+    if isinstance(out, Number) and not isinstance(out, DenseArray):
+        return [out], True
+    if np.ndim(out) == 0 and not isinstance(out, (Array, DenseArray)):
+        return [out], True
+    return list(out), False
@@ -0,0 +1,431 @@
+"""Trace and replay of user functions
+
+``trace()`` records the elementary operations a function performs on its inputs into a
+flat ``Graph``, once per input shape. Later calls replay the recorded operations on the
+new inputs: the user's Python code, the operator overloading of Number and Array and the
+dispatch of ``@elementary`` are skipped, only the value and derivative functions of the
+operations run. Replay is mode agnostic, so the outputs have the derivatives of whatever
+mode the inputs are in (default, dense or reverse).
+
+Operations that don't depend on the inputs aren't recorded, they are folded into
+constants. Before it's evaluated, a Graph is further simplified by ``optimize_graph()``:
+identical operations are merged and operations that don't contribute to the outputs are
+removed.
+
+A trace is only valid for the path the function took while it was traced. Python control
+flow that depends on the values of the inputs is frozen at the branch taken, and values
+computed outside elementary operations (e.g. ``Number(x.val ** 2)``) become constants.
+"""
+
+from contextlib import contextmanager
+from functools import update_wrapper
+import inspect
+import numpy as np
+from autodiff import operations, structures
+from autodiff.structures import Number, Array, DenseArray
+
+class Graph():
+    '''
+    Graph is the flat record of the elementary operations of a traced function. Entries
+    0 to n_inputs - 1 are the inputs, every following entry is the result of one
+    operation, in evaluation order.
+
+    Operations whose operands don't depend on the inputs aren't recorded, their results
+    are constants.
+
+    Args:
+        n_inputs: the number of inputs
+        shape: the shape of the input of the function, () for a Number
+        ops: the recorded operations, a list of (operation, operands, kwargs, [(position
+            of a traced operand, entry)]) tuples
+        outputs: the structure of the output of the function
+
+    Returns:
+        Graph, to record elementary operations on.
+    '''
+
+    def __init__(self, n_inputs, shape, ops=None, outputs=None):
+        self.n_inputs = n_inputs
+        self.shape = shape
+        self.ops = [] if ops is None else ops
+        self.outputs = outputs
+        # Compiled kernels by mode, see autodiff.codegen
+        self.kernels = {}
+        self._entries = None
+
+    def __repr__(self):
+        '''
+        Overloads the print method to give a string representation of Graph object.
+
+        Returns:
+            a string specifiying the number of inputs and operations.
+        '''
+        return f'Graph(inputs={self.n_inputs}, ops={len(self.ops)})'
+
+    def __len__(self):
+        '''
+        Overloads the len() method to give the length of Graph.
+
+        Returns:
+            an integer representing the number of entries, inputs included.
+        '''
+        return self.n_inputs + len(self.ops)
+
+    def start(self, inputs):
+        '''
+        Starts recording, with inputs as the first entries.
+
+        Args:
+            inputs: the distinct Numbers the function is traced with
+        '''
+        self._entries = {x: entry for entry, x in enumerate(inputs)}
+
+    def record(self, op, args, kwargs, result):
+        '''
+        Records an elementary operation if any of its operands was recorded.
+
+        Args:
+            op: the elementary operation, as decorated by @elementary
+            args: the positional operands
+            kwargs: the keyword operands, recorded as positional operands when the
+                signature of the operation allows it, as constants otherwise
+            result: the Number returned by the operation
+        '''
+        if kwargs:
+            # Keyword operands can be traced Numbers too (e.g. the base of log)
+            bound = inspect.signature(op.__wrapped__).bind(*args, **kwargs)
+            args, kwargs = bound.args, {
+                key: operations._val(arg) for key, arg in bound.kwargs.items()
+            }
+        refs = [
+            (position, self._entries[arg]) for position, arg in enumerate(args)
+            if isinstance(arg, Number) and arg in self._entries
+        ]
+        if not refs:
+            return
+        operands = tuple(operations._val(arg) for arg in args)
+        self.ops.append((op, operands, kwargs, refs))
+        self._entries[result] = len(self) - 1
+
+    def finish(self, out):
+        '''
+        Records the structure of the output of the traced function and releases the
+        Numbers held while tracing.
+
+        Args:
+            out: the output of the traced function
+        '''
+        self.outputs = self._spec(out)
+        self._entries = None
+
+    def _spec(self, out):
+        if isinstance(out, Number):
+            if out in self._entries:
+                return ('entry', self._entries[out])
+            return ('number', out.val)
+        if isinstance(out, (tuple, list, Array)):
+            return (type(out), [self._spec(element) for element in out])
+        return ('constant', out)
+
+    def _build(self, spec, env):
+        kind, content = spec
+        if kind == 'entry':
+            return env[content]
+        if kind == 'number':
+            return Number(content)
+        if kind == 'constant':
+            return content
+        return kind([self._build(element, env) for element in content])
+
+    def replay(self, inputs):
+        '''
+        Evaluates the recorded operations on new inputs.
+
+        Args:
+            inputs: a list of n_inputs Numbers, in any mode
+
+        Returns:
+            the output of the traced function at inputs, with the same structure.
+        '''
+        env = list(inputs)
+        if operations._recorders or structures._no_grad:
+            # Replayed inside another trace, go through @elementary so it's recorded (or
+            # within no_grad(), so only the values are computed)
+            for op, operands, kwargs, refs in self.ops:
+                args = list(operands)
+                for position, entry in refs:
+                    args[position] = env[entry]
+                env.append(op(*args, **kwargs))
+        else:
+            for op, operands, kwargs, refs in self.ops:
+                args = list(operands)
+                for position, entry in refs:
+                    args[position] = env[entry]
+                env.append(operations._result(*op.evaluate(*args, **kwargs)))
+        return self._build(self.outputs, env)
+
+# Operations whose operands can be swapped, for merging them
+_COMMUTATIVE = (operations.add, operations.mul)
+
+def _is_constant(value, constant):
+    '''
+    Whether an operand is the scalar constant.
+    '''
+    return not isinstance(value, Number) and np.ndim(value) == 0 and value == constant
+
+def _identity(op, args, traced):
+    '''
+    Operand an operation reduces to (x + 0, x - 0, x * 1, x / 1, x ** 1).
+
+    Returns:
+        the entry of the operand, or None.
+    '''
+    if len(traced) != 1:
+        return None
+    (position, entry), = traced.items()
+    other = args[1 - position] if len(args) == 2 else None
+    if op is operations.add and _is_constant(other, 0):
+        return entry
+    if op is operations.mul and _is_constant(other, 1):
+        return entry
+    if op in (operations.subtract, operations.div, operations.power) and position == 0:
+        if _is_constant(other, 1 if op is not operations.subtract else 0):
+            return entry
+    return None
+
+def _key(op, args, kwargs, traced):
+    '''
+    Key of an operation for merging identical ones.
+
+    Returns:
+        a hashable key, or None when a constant operand isn't hashable.
+    '''
+    operands = tuple(
+        ('entry', traced[position]) if position in traced else ('constant', arg)
+        for position, arg in enumerate(args)
+    )
+    if op in _COMMUTATIVE:
+        operands = tuple(sorted(operands, key=repr))
+    key = (op, operands, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+def _remap(spec, aliases):
+    '''
+    Output structure of a Graph after its entries were renumbered.
+    '''
+    kind, content = spec
+    if kind == 'entry':
+        return ('entry', aliases[content])
+    if kind in ('number', 'constant'):
+        return spec
+    return (kind, [_remap(element, aliases) for element in content])
+
+def _entries(spec):
+    '''
+    Entries of the output structure of a Graph.
+    '''
+    kind, content = spec
+    if kind == 'entry':
+        return [content]
+    if kind in ('number', 'constant'):
+        return []
+    return [entry for element in content for entry in _entries(element)]
+
+def _eliminate_dead(graph):
+    '''
+    Removes the operations of a Graph that don't contribute to its outputs.
+    '''
+    live = set(_entries(graph.outputs))
+    for index in reversed(range(len(graph.ops))):
+        if graph.n_inputs + index in live:
+            live.update(entry for _, entry in graph.ops[index][3])
+
+    aliases = list(range(graph.n_inputs))
+    ops = []
+    for index, (op, operands, kwargs, refs) in enumerate(graph.ops):
+        if graph.n_inputs + index not in live:
+            aliases.append(None)
+            continue
+        refs = [(position, aliases[entry]) for position, entry in refs]
+        ops.append((op, operands, kwargs, refs))
+        aliases.append(graph.n_inputs + len(ops) - 1)
+    return Graph(graph.n_inputs, graph.shape, ops, _remap(graph.outputs, aliases))
+
+def optimize_graph(graph):
+    '''
+    Simplifies a Graph before it's evaluated. Operations with the same operands are merged
+    (common subexpression elimination), operations that reduce to one of their operands
+    (x + 0, x * 1, ...) are replaced by it, and operations that don't contribute to the
+    outputs are removed.
+
+    Operations that don't depend on any input are already folded into constants while
+    tracing, so they propagate no derivative when the Graph is replayed.
+
+    Args:
+        graph: a Graph, as recorded by trace()
+
+    Returns:
+        a new, equivalent Graph.
+    '''
+    # The entry of the new Graph every entry of graph became
+    aliases = list(range(graph.n_inputs))
+    ops = []
+    merged = {}
+    for op, operands, kwargs, refs in graph.ops:
+        traced = {position: aliases[entry] for position, entry in refs}
+
+        identity = _identity(op, operands, traced)
+        if identity is not None:
+            aliases.append(identity)
+            continue
+
+        key = _key(op, operands, kwargs, traced)
+        if key is not None and key in merged:
+            aliases.append(merged[key])
+            continue
+
+        entry = graph.n_inputs + len(ops)
+        ops.append((op, operands, kwargs, sorted(traced.items())))
+        if key is not None:
+            merged[key] = entry
+        aliases.append(entry)
+
+    return _eliminate_dead(Graph(
+        graph.n_inputs, graph.shape, ops, _remap(graph.outputs, aliases)
+    ))
+
+@contextmanager
+def _recording(graph):
+    '''
+    Records the elementary operations evaluated in the with block on graph.
+    '''
+    operations._recorders.append(graph)
+    try:
+        yield graph
+    finally:
+        operations._recorders.pop()
+
+def _inputs(x):
+    '''
+    Inputs of a traced function.
+
+    Args:
+        x: a Number, an int/float, or an iterable (e.g. Array, list) of them
+
+    Returns:
+        the list of input Numbers, the shape of x, and whether x holds no Number at all.
+    '''
+    if isinstance(x, DenseArray):
+        raise TypeError('DenseArray inputs cannot be traced, use Arrays of Numbers')
+    if isinstance(x, Number):
+        return [x], (), False
+    if np.ndim(x) == 0 and not isinstance(x, Array):
+        return [Number(x)], (), True
+    elements = list(x)
+    numeric = not any(isinstance(element, Number) for element in elements)
+    inputs = [
+        element if isinstance(element, Number) else Number(element) for element in elements
+    ]
+    return inputs, (len(inputs),), numeric
+
+class TracedFunction():
+    '''
+    TracedFunction wraps a function of a Number or of an Array, tracing it on the first
+    call for every input shape and replaying the trace on later calls. It can be passed
+    wherever the function is expected, e.g. to the optimizers and root finders.
+
+    Inputs without any Number (ints/floats, lists of them) have nothing to differentiate
+    and are passed to the function unchanged.
+
+    Args:
+        func: a function of a Number or of an Array
+        optimize: whether to simplify the traced Graphs with optimize_graph()
+
+    Returns:
+        TracedFunction, a callable with the signature of func.
+    '''
+
+    def __init__(self, func, optimize=True):
+        self.func = func
+        self.optimize = optimize
+        self._graphs = {}
+        update_wrapper(self, func, updated=())
+
+    def __repr__(self):
+        '''
+        Overloads the print method to give a string representation of TracedFunction object.
+
+        Returns:
+            a string specifiying the traced function and the traced shapes.
+        '''
+        return f'TracedFunction({self.func.__name__}, shapes={list(self._graphs)})'
+
+    def __call__(self, x):
+        inputs, shape, numeric = _inputs(x)
+        if numeric:
+            return self.func(x)
+        graph = self._graphs.get(shape)
+        if graph is None:
+            graph = self._trace(inputs, shape)
+        return graph.replay(inputs)
+
+    def _trace(self, inputs, shape):
+        # Trace with fresh Numbers, one per position, so the caller's don't get recorded
+        # and an input passed at several positions doesn't merge them
+        inputs = [Number(operations._val(x)) for x in inputs]
+        graph = Graph(len(inputs), shape)
+        graph.start(inputs)
+        # Within no_grad(), nothing would be recorded
+        with _recording(graph), structures._mode('_no_grad', False):
+            out = self.func(inputs[0] if shape == () else Array(inputs))
+        graph.finish(out)
+        if self.optimize:
+            graph = optimize_graph(graph)
+        self._graphs[shape] = graph
+        return graph
+
+    def graph(self, x):
+        '''
+        Returns the Graph for the shape of x, tracing func if needed.
+
+        Args:
+            x: a Number, an int/float, or an iterable (e.g. Array, list) of them
+
+        Returns:
+            the Graph func was traced into for inputs of the shape of x.
+        '''
+        inputs, shape, _ = _inputs(x)
+        if shape not in self._graphs:
+            self._trace(inputs, shape)
+        return self._graphs[shape]
+
+def trace(func, example_input=None, optimize=True):
+    '''
+    Traces func into a reusable computation graph.
+
+    Args:
+        func: a function of a Number or of an Array, returning a Number or an iterable
+            (e.g. Array, tuple) of Numbers
+        example_input: an input to trace func with right away, otherwise func is traced on
+            its first call for every input shape
+        optimize: whether to simplify the traced Graphs with optimize_graph()
+
+    Returns:
+        a TracedFunction, to be called instead of func.
+
+    Example:
+        >>> from autodiff.tracing import trace
+        >>> from autodiff.structures import Array
+        >>> f = trace(lambda x: x[0] * x[1] + x[0], [2, 3])
+        >>> x = Array([4, 5])
+        >>> f(x).jacobian(x)
+        array([6, 4])
+    '''
+    traced = TracedFunction(func, optimize)
+    if example_input is not None:
+        traced.graph(example_input)
+    return traced
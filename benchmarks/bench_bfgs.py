@@ -0,0 +1,52 @@
+"""Benchmark of BFGS in n dimensions
+
+Measures the time per iteration of bfgs_symbolic, where the objective and gradient are
+NumPy functions so the inverse Hessian update dominates, and of bfgs and lbfgs, where the
+gradient comes from automatic differentiation, on a convex quadratic of n variables.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_bfgs.py
+"""
+
+import sys
+import time
+import warnings
+
+sys.path.insert(0, '.')
+
+import numpy as np
+from autodiff import optimizations
+from autodiff.structures import Array
+
+SIZES = (10, 100, 1000)
+
+def problem(n):
+    weights = 1 + np.arange(n) % 10
+    return weights, np.linspace(-1, 1, n)
+
+def symbolic(n, iterations=50):
+    weights, center = problem(n)
+    func = lambda x: np.sum(weights * (x - center) ** 2)
+    gradient = lambda x: 2 * weights * (x - center)
+    start = time.perf_counter()
+    optimizations.bfgs_symbolic(func, gradient, np.zeros(n), iterations=iterations, tolerance=0)
+    return (time.perf_counter() - start) / iterations
+
+def automatic(n, optimizer, iterations=3):
+    weights, center = problem(n)
+    def func(x):
+        total = 0
+        for i in range(n):
+            total = total + weights[i] * (x[i] - center[i]) ** 2
+        return total
+    start = time.perf_counter()
+    optimizer(func, Array(np.zeros(n)), iterations=iterations, tolerance=0)
+    return (time.perf_counter() - start) / iterations
+
+if __name__ == '__main__':
+    warnings.simplefilter('ignore')
+    for n in SIZES:
+        print(f'n = {n:4d}  bfgs_symbolic: {symbolic(n) * 1e3:9.3f} ms/iteration'
+              f'  bfgs: {automatic(n, optimizations.bfgs) * 1e3:9.1f} ms/iteration'
+              f'  lbfgs: {automatic(n, optimizations.lbfgs) * 1e3:9.1f} ms/iteration')
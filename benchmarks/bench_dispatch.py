@@ -0,0 +1,46 @@
+"""Benchmark of the dispatch of elementary operations
+
+Measures the time of arithmetic between a Number and constants, where every call is
+routed on the types of its operands, and of an elementary operation applied to an Array.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_dispatch.py
+"""
+
+import sys
+import timeit
+import warnings
+
+sys.path.insert(0, '.')
+
+from autodiff import operations
+from autodiff.structures import Number, Array, leaf_only
+
+N = 20000
+
+def mixed_arithmetic():
+    x = Number(0.5)
+    def run():
+        for _ in range(N):
+            ((x * 2 + 1) / 3 - 0.5) ** 2
+    with leaf_only():
+        return timeit.timeit(run, number=5) / 5 / N / 5
+
+def constant_base_power():
+    x = Number(0.5)
+    def run():
+        for _ in range(N):
+            2 ** x
+    with leaf_only():
+        return timeit.timeit(run, number=5) / 5 / N
+
+def elementwise():
+    x = Array([float(i) for i in range(100)])
+    return timeit.timeit(lambda: operations.sin(x), number=20) / 20 / 100
+
+if __name__ == '__main__':
+    warnings.simplefilter('ignore')
+    print(f'Number and constant:        {mixed_arithmetic() * 1e6:8.3f} us')
+    print(f'constant ** Number:         {constant_base_power() * 1e6:8.3f} us')
+    print(f'sin of an Array, per element:{elementwise() * 1e6:8.3f} us')
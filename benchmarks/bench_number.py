@@ -0,0 +1,57 @@
+"""Benchmark of the Number data structure
+
+Measures the memory and construction time of Numbers, and the time of elementary
+operations with one and with several partial derivatives.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_number.py
+"""
+
+import sys
+import timeit
+import tracemalloc
+import warnings
+
+sys.path.insert(0, '.')
+
+from autodiff import operations
+from autodiff.structures import Number, leaf_only
+
+N = 100000
+
+def memory_per_number():
+    tracemalloc.start()
+    numbers = [Number(float(i)) for i in range(N)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / len(numbers)
+
+def construction():
+    return timeit.timeit(lambda: [Number(1.5) for _ in range(N)], number=5) / 5 / N
+
+def single_partial():
+    x = Number(0.5)
+    def run():
+        y = x
+        for _ in range(1000):
+            y = operations.sin(y * 0.5 + 1)
+    with leaf_only():
+        return timeit.timeit(run, number=20) / 20 / 3000
+
+def several_partials():
+    x = [Number(float(i)) for i in range(10)]
+    def run():
+        total = x[0]
+        for _ in range(100):
+            for element in x:
+                total = total * 0.5 + element
+    with leaf_only():
+        return timeit.timeit(run, number=5) / 5 / 2000
+
+if __name__ == '__main__':
+    warnings.simplefilter('ignore')
+    print(f'memory per Number:          {memory_per_number():8.1f} bytes')
+    print(f'construction:               {construction() * 1e6:8.3f} us')
+    print(f'operation, one partial:     {single_partial() * 1e6:8.3f} us')
+    print(f'operation, 10 partials:     {several_partials() * 1e6:8.3f} us')
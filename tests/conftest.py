@@ -0,0 +1,30 @@
+"""Shared fixtures for the tests
+"""
+
+import pytest
+from autodiff import operations
+
+class Counted():
+    def __init__(self, func):
+        self.func = func
+        self.__name__ = func.__name__
+        self.calls = 0
+
+    def __call__(self, x):
+        self.calls += 1
+        return self.func(x)
+
+@pytest.fixture
+def counted():
+    # Wraps a function to count its evaluations in .calls
+    return Counted
+
+@pytest.fixture
+def chain():
+    # A long chain of elementary operations on two inputs
+    def chain(x, y, n):
+        z = x
+        for _ in range(n):
+            z = operations.sin(z) * y + operations.log(x + 2) - operations.logistic(z)
+        return z
+    return chain
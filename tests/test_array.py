@@ -8,6 +8,7 @@ sys.path.append('..')
 import autodiff.operations as operations
 from autodiff.structures import Number
 from autodiff.structures import Array
+from autodiff.structures import ColumnIndex, lazy
 import numpy as np
 
 num2 = Number(2)
@@ -226,3 +227,51 @@ def test_dot():
         0
     ))
     assert q.dot(q).val == 0
+
+def test_equals():
+    a, b = Number(1), Number(1)
+    assert Array((a, 0)).equals(Array((b, 0)))
+    assert not Array((a, 0)).equals(Array((b, 1)))
+    assert not Array((a, 0)).equals(Array((a,)))
+    assert not Array((a, 0)).equals([a, 0])
+    assert Array((a, 0)) != Array((b, 0))
+
+def test_jacobian_column_index():
+    x = Array([1, 2, 3])
+    y = Array([x[0] * x[1], x[2] + 1, x[0] ** 2])
+    expected = [[2, 1, 0], [0, 0, 1], [2, 0, 0]]
+    index = ColumnIndex(x)
+    assert len(index) == 3
+    assert np.array_equal(y.jacobian(index), expected)
+    assert np.array_equal((y * 2).jacobian(index), np.multiply(expected, 2))
+    assert np.array_equal(y[0].jacobian(index), [2, 1, 0])
+
+def test_jacobian_order():
+    x = Array([1, 2, 3])
+    y = Array([x[0] * x[1], x[2] + 1, 5])
+    assert np.array_equal(y.jacobian([x[2], x[0], x[2]]), [[0, 2, 0], [1, 0, 1], [0, 0, 0]])
+    assert np.array_equal(y.jacobian(x[1]), [1, 0, 0])
+    assert y.jacobian(x).dtype == np.float64
+
+def test_jacobian_intermediates_and_lazy():
+    x = Array([1, 2])
+    z = x[0] * 3
+    with lazy():
+        w = z * x[1]
+    y = Array([z * z, w])
+    assert np.array_equal(y.jacobian([z, x[0], x[1]]), [[6, 18, 0], [2, 6, 3]])
+
+def test_jacobian_nested_numbers():
+    inner = Number(2)
+    x = Array([Number(inner), Number(inner * 3)])
+    y = x * x
+    jacobian = y.jacobian(x)
+    assert jacobian[0, 0].jacobian(inner) == 2
+
+def test_sparse_jacobian_default_mode():
+    x = Array([1, 2, 3])
+    y = Array([x[0] * x[1], 7, x[2] * 0 + x[0]])
+    jacobian = y.jacobian(ColumnIndex(x), sparse=True)
+    assert jacobian.nnz == 3
+    assert np.array_equal(jacobian.indptr, [0, 2, 2, 3])
+    assert np.array_equal(jacobian.toarray(), y.jacobian(x))
@@ -0,0 +1,103 @@
+"""Tests for code generation from traced graphs
+"""
+
+import pytest
+import numpy as np
+from autodiff import operations
+from autodiff.operations import elementary, _chain
+from autodiff.tracing import trace
+from autodiff.codegen import kernel, compile_graph, generate
+from autodiff.forward import batch
+
+def rosenbrock(x0, a=1, b=100):
+    return (a - x0[0]) ** 2 + b * (x0[1] - x0[0] ** 2) ** 2
+
+def all_ops(x):
+    return (
+        x[0] * x[1] - x[1] / x[0] + x[0] ** x[1] + 2 ** x[1]
+        + operations.sin(x[0]) + operations.cos(x[1]) + operations.tan(x[0])
+        + operations.exp(x[1]) + operations.log(x[0]) + operations.log(x[1], 2)
+        + operations.logistic(x[0]) + operations.asin(x[0] / 2) + operations.acos(x[1] / 2)
+        + operations.atan(x[0]) + operations.sinh(x[1]) + operations.cosh(x[0])
+        + operations.tanh(x[1]) + operations.sqrt(x[0]) - x[1]
+    )
+
+@pytest.mark.parametrize('mode', ['reverse', 'forward'])
+def test_kernel_matches_batch(mode):
+    points = np.random.RandomState(0).uniform(0.1, 1.5, size=(50, 2))
+    values, gradients = kernel(all_ops, [1, 1], mode)(points)
+    expected_values, expected_gradients = batch(all_ops, points)
+    assert values.shape == (50,)
+    assert gradients.shape == (50, 2)
+    assert np.allclose(values, expected_values)
+    assert np.allclose(gradients, expected_gradients)
+
+@pytest.mark.parametrize('mode', ['reverse', 'forward'])
+def test_kernel_single_point(mode):
+    value, gradient = kernel(rosenbrock, [1, 1], mode)([2, 1])
+    assert value == pytest.approx(901)
+    assert np.allclose(gradient, [2402, -600])
+
+@pytest.mark.parametrize('mode', ['reverse', 'forward'])
+def test_kernel_vector_output(mode):
+    func = lambda x: (x[0] * x[2], operations.sin(x[1]), 3)
+    values, jacobians = kernel(func, [1, 1, 1], mode)(np.array([[1., 2, 3], [4, 5, 6]]))
+    assert values.shape == (2, 3)
+    assert jacobians.shape == (2, 3, 3)
+    assert np.allclose(values[1], [24, np.sin(5), 3])
+    assert np.allclose(jacobians[1], [[6, 0, 4], [0, np.cos(5), 0], [0, 0, 0]])
+
+@pytest.mark.parametrize('mode', ['reverse', 'forward'])
+def test_kernel_scalar_input(mode):
+    func = kernel(lambda x: operations.tanh(x) * x, 1., mode)
+    values, derivs = func(np.array([0.5, 1]))
+    assert np.allclose(values, np.tanh([0.5, 1]) * [0.5, 1])
+    assert np.allclose(derivs, (1 - np.tanh([0.5, 1]) ** 2) * [0.5, 1] + np.tanh([0.5, 1]))
+
+def test_kernel_repeated_operand():
+    values, gradients = kernel(lambda x: x[0] * x[0] + x[1], [1, 1])([[3, 1]])
+    assert np.allclose(gradients, [[6, 1]])
+
+def test_kernel_unused_input():
+    values, gradients = kernel(lambda x: x[0] * 2, [1, 1])([[3, 1], [4, 1]])
+    assert np.allclose(gradients, [[2, 0], [2, 0]])
+
+def test_kernel_is_cached():
+    traced = trace(rosenbrock, [1, 1])
+    graph = traced.graph([1, 1])
+    assert compile_graph(graph) is compile_graph(graph)
+    assert kernel(traced, [0, 0]) is compile_graph(graph)
+    assert compile_graph(graph, 'forward') is not compile_graph(graph)
+
+def test_kernel_source():
+    source, constants = generate(trace(lambda x: x[0] * x[1] + 1, [1, 1]).graph([1, 1]))
+    assert source.startswith('def kernel(x):')
+    assert 'v2 = v0 * v1' in source
+    assert list(constants.values()) == [1]
+    assert kernel(lambda x: x[0] * x[1], [1, 1]).source.startswith('def kernel(x):')
+
+def test_kernel_many_points():
+    points = np.random.RandomState(1).uniform(-2, 2, size=(10 ** 5, 2))
+    values, gradients = kernel(rosenbrock, [1, 1])(points)
+    assert gradients.shape == (10 ** 5, 2)
+    x, y = points[:, 0], points[:, 1]
+    assert np.allclose(gradients[:, 0], -2 * (1 - x) - 400 * x * (y - x ** 2))
+    assert np.allclose(gradients[:, 1], 200 * (y - x ** 2))
+
+def test_kernel_unknown_operation():
+    @elementary(lambda x: _chain((x, 3)))
+    def triple(x):
+        return 3 * x.val
+
+    with pytest.raises(NotImplementedError):
+        kernel(lambda x: triple(x[0]), [1, 1])
+
+def test_kernel_bad_mode():
+    with pytest.raises(ValueError):
+        kernel(rosenbrock, [1, 1], 'sideways')
+
+@pytest.mark.parametrize('mode', ['reverse', 'forward'])
+def test_kernel_keyword_operand(mode):
+    value, gradient = kernel(lambda x: operations.log(x[0], y=x[1]), [2, 5], mode)([9, 3])
+    assert value == pytest.approx(2)
+    assert np.allclose(gradient, [1 / (9 * np.log(3)), -2 / (3 * np.log(3))])
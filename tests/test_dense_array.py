@@ -0,0 +1,144 @@
+"""Tests for the DenseArray class
+"""
+
+import pytest
+import numpy as np
+import autodiff.operations as operations
+from autodiff.structures import Number, Array, DenseArray, dense_variables
+
+def test_seeded():
+    q = DenseArray([2, 3])
+    assert q.val.dtype == np.float64
+    assert np.array_equal(q._deriv.vec, np.identity(2))
+    assert np.array_equal(q.jacobian(q), np.identity(2))
+
+def test_len():
+    assert len(DenseArray([2, 3])) == 2
+
+def test_repr():
+    assert repr(DenseArray([2, 3])) == 'DenseArray(val=[2. 3.])'
+
+def test_indexing():
+    q = DenseArray([2, 3])
+    assert isinstance(q[1], Number)
+    assert q[1].val == 3
+    assert q[1].jacobian(q[1]) == 1
+    assert np.array_equal(q[1].jacobian(q), [0, 1])
+
+def test_slicing():
+    q = DenseArray([2, 3, 4])
+    w = q[1:]
+    assert isinstance(w, DenseArray)
+    assert np.array_equal(w.val, [3, 4])
+    assert np.array_equal(w.jacobian(q), [[0, 1, 0], [0, 0, 1]])
+
+def test_iter():
+    q = DenseArray([2, 3])
+    assert [el.val for el in q] == [2, 3]
+
+def test_setitem():
+    q = DenseArray([2, 3])
+    q[0] = q[1] * 2
+    assert np.array_equal(q.val, [6, 3])
+    assert np.array_equal(q.jacobian(q), [[0, 2], [0, 1]])
+
+def test_setitem_only_dense_number():
+    q = DenseArray([2, 3])
+    with pytest.raises(ValueError):
+        q[0] = 1
+    with pytest.raises(ValueError):
+        q[0] = DenseArray([1])[0]
+
+@pytest.mark.parametrize('func', [
+    lambda q: q + q,
+    lambda q: q + 1,
+    lambda q: 2 + q,
+    lambda q: q - 1,
+    lambda q: 10 - q,
+    lambda q: q * q,
+    lambda q: 2 * q,
+    lambda q: q / 2,
+    lambda q: 12 / q,
+    lambda q: q ** 2,
+    lambda q: 2 ** q,
+    lambda q: q ** q,
+    lambda q: -q,
+    lambda q: operations.exp(q) * operations.sin(q),
+    lambda q: operations.log(q) + operations.sqrt(q) - operations.tanh(q),
+    lambda q: operations.logistic(q) * operations.atan(q) / operations.cosh(q),
+])
+def test_matches_array(func):
+    values = [0.2, 0.3, 0.4]
+    dense = DenseArray(values)
+    objects = Array([Number(val) for val in values])
+    result = func(dense)
+    # The reflected operators of Array return np.ndarrays of Numbers
+    expected = Array(func(objects))
+    assert isinstance(result, DenseArray)
+    assert np.allclose(result.val, [el.val for el in expected])
+    assert np.allclose(result.jacobian(dense), expected.jacobian(objects))
+
+def test_ndarray_operands():
+    q = DenseArray([2, 3])
+    v = np.array([1., 2.])
+    assert isinstance(v * q, DenseArray)
+    assert np.array_equal((v * q).val, [2, 6])
+    assert np.array_equal((q - v).jacobian(q), np.identity(2))
+
+def test_number_times_ndarray():
+    a, b = dense_variables([2, 0.5])
+    t = np.linspace(0, 1, 5)
+    model = a * operations.exp(-b * t)
+    assert isinstance(model, DenseArray)
+    jacobian = model.jacobian([a, b])
+    assert jacobian.shape == (5, 2)
+    assert np.allclose(jacobian[:, 0], np.exp(-0.5 * t))
+    assert np.allclose(jacobian[:, 1], -2 * t * np.exp(-0.5 * t))
+
+def test_matmul_dot():
+    q = DenseArray([2, 3])
+    w = q @ q
+    assert isinstance(w, Number)
+    assert w.val == 13
+    assert np.array_equal(w.jacobian(q), [4, 6])
+    assert q.dot(q).val == 13
+
+def test_matmul_vector():
+    q = DenseArray([2, 3])
+    v = np.array([2, 3])
+    assert (q @ v).val == 13
+    assert np.array_equal((q @ v).jacobian(q), [2, 3])
+    assert (v @ q).val == 13
+
+def test_matmul_matrix():
+    q = DenseArray([2, 3])
+    m = np.array([[1, 2], [3, 4]])
+    assert isinstance(q @ m, DenseArray)
+    assert np.array_equal((q @ m).val, [11, 16])
+    assert np.array_equal((q @ m).jacobian(q), m.T)
+    assert np.array_equal((m @ q).jacobian(q), m)
+
+def test_sum():
+    q = DenseArray([2, 3])
+    total = (q * q).sum()
+    assert total.val == 13
+    assert np.array_equal(total.jacobian(q), [4, 6])
+
+def test_eq():
+    q = DenseArray([2, 3])
+    assert q == q
+    assert q * 1 != q * 1
+    assert (q * 1).equals(q * 1)
+    assert not q.equals(DenseArray([2, 3]))
+    assert not q.equals('a')
+    assert q != 'a'
+
+def test_different_spaces():
+    with pytest.raises(ValueError):
+        DenseArray([1]) @ DenseArray([1])
+
+def test_large():
+    x = np.linspace(0.1, 1, 100000)
+    a, = dense_variables([2])
+    result = (a * np.sin(x) ** 2).sum()
+    assert result.jacobian(a) == pytest.approx(np.sum(np.sin(x) ** 2))
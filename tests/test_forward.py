@@ -0,0 +1,137 @@
+"""Tests for the forward mode function transformations
+"""
+
+import pytest
+import numpy as np
+from autodiff import operations
+from autodiff.structures import Number, Array
+from autodiff.forward import batch, hessian, jvp
+from autodiff.reverse import grad
+
+def rosenbrock(x0, a=1, b=100):
+    return (a - x0[0]) ** 2 + b * (x0[1] - x0[0] ** 2) ** 2
+
+def bowl(x, xstar=np.array((1, 1))):
+    return (x - xstar) @ (x - xstar)
+
+def trig(x):
+    return operations.sin(x[0]) * operations.exp(x[1]) / operations.sqrt(x[2]) + operations.log(x[2])
+
+points = np.array([
+    [0.1, 0.2, 0.3],
+    [1.0, -1.0, 2.0],
+    [2.5, 0.5, 0.7],
+    [-0.3, 1.5, 4.0],
+])
+
+@pytest.mark.parametrize('func, dims', [(rosenbrock, 2), (bowl, 2), (trig, 3)])
+def test_batch_matches_pointwise(func, dims):
+    values, gradients = batch(func, points[:, :dims])
+    assert values.shape == (len(points),)
+    assert gradients.shape == (len(points), dims)
+    for point, value, gradient in zip(points[:, :dims], values, gradients):
+        x = Array([Number(val) for val in point])
+        expected = func(x)
+        assert value == pytest.approx(expected.val)
+        assert gradient == pytest.approx(expected.jacobian(x))
+
+def test_batch_scalar_function():
+    values, gradients = batch(lambda x: x ** 3 - operations.tanh(x), [1, 2, 3])
+    x = np.array([1, 2, 3])
+    assert values == pytest.approx(x ** 3 - np.tanh(x))
+    assert gradients == pytest.approx(3 * x ** 2 - 1 + np.tanh(x) ** 2)
+
+def test_batch_constant_function():
+    values, gradients = batch(lambda x: 2, points[:, :2])
+    assert np.array_equal(values, [2, 2, 2, 2])
+    assert np.array_equal(gradients, np.zeros((4, 2)))
+
+def test_batch_unused_input():
+    values, gradients = batch(lambda x: x[0] ** 2, points[:, :2])
+    assert gradients[:, 0] == pytest.approx(2 * points[:, 0])
+    assert np.array_equal(gradients[:, 1], np.zeros(4))
+
+def test_batch_jacobian_inside_function():
+    def func(x):
+        y = x[0] * x[1]
+        assert y.jacobian(x[0]) == pytest.approx(x[1].val)
+        return y
+    batch(func, points[:, :2])
+
+def test_batch_large():
+    samples = np.random.RandomState(0).uniform(-2, 2, size=(100000, 2))
+    values, gradients = batch(rosenbrock, samples)
+    x, y = samples.T
+    assert values == pytest.approx((1 - x) ** 2 + 100 * (y - x ** 2) ** 2)
+    assert gradients[:, 1] == pytest.approx(200 * (y - x ** 2))
+
+def hessian_rosenbrock(x0):
+    x = x0[0]
+    y = x0[1]
+    return np.array([
+        [1200 * x ** 2 - 400 * y + 2, -400 * x],
+        [-400 * x, 200],
+    ])
+
+def everything(x):
+    return (
+        operations.sin(x[0]) * operations.cos(x[1]) + operations.tan(x[2] / 4)
+        + operations.exp(x[0] * x[1]) / operations.sqrt(x[2]) + operations.log(x[2], 3)
+        + x[0] ** x[1] - 2 ** x[2] + operations.logistic(x[0]) * operations.asin(x[1] / 4)
+        + operations.acos(x[0] / 3) - operations.atan(x[2]) + operations.sinh(x[1])
+        + operations.cosh(x[0]) * operations.tanh(x[2]) - 3 / x[1]
+    )
+
+def test_hessian_rosenbrock():
+    assert np.allclose(hessian(rosenbrock, [2, 1]), hessian_rosenbrock([2, 1]))
+
+def test_hessian_bowl():
+    assert np.allclose(hessian(bowl, [3, -1]), 2 * np.identity(2))
+
+def test_hessian_all_operations():
+    x = np.array([0.3, 0.5, 2.0])
+    hess = hessian(everything, x)
+    # Central differences of the gradient
+    step = 1e-6
+    gradient = grad(everything)
+    expected = np.array([
+        (gradient(x + step * e) - gradient(x - step * e)) / (2 * step)
+        for e in np.identity(3)
+    ])
+    assert np.allclose(hess, expected, atol=1e-5)
+    assert np.array_equal(hess, hess.T)
+
+def test_hessian_scalar():
+    assert hessian(lambda x: x ** 3, 2) == pytest.approx(12)
+    assert hessian(lambda x: operations.sin(x), Number(1)) == pytest.approx(-np.sin(1))
+
+def test_hessian_array_input():
+    x = Array([Number(2), Number(1)])
+    assert np.allclose(hessian(rosenbrock, x), hessian_rosenbrock([2, 1]))
+
+def test_hessian_linear_function():
+    assert np.array_equal(hessian(lambda x: 2 * x[0] - x[1], [1, 2]), np.zeros((2, 2)))
+
+def test_hessian_constant_function():
+    assert np.array_equal(hessian(lambda x: 1, [1, 2]), np.zeros((2, 2)))
+
+def test_jvp_matches_jacobian():
+    func = lambda x: Array([x[0] * x[1], operations.sin(x[0]) + x[2] ** 2])
+    x = Array([Number(1), Number(2), Number(3)])
+    jacobian = func(x).jacobian(x)
+    v = np.array([0.5, -1, 2])
+    assert np.allclose(jvp(func, [1, 2, 3], v), jacobian @ v)
+
+def test_jvp_scalar_output():
+    assert jvp(rosenbrock, [2, 1], [1, 0]) == pytest.approx(grad(rosenbrock)([2, 1])[0])
+
+def test_jvp_scalar_input():
+    assert jvp(lambda x: x ** 3, 2, 1) == pytest.approx(12)
+    assert jvp(lambda x: (x ** 2, x), 2, 1) == pytest.approx([4, 1])
+
+def test_jvp_tuple_output_with_constant():
+    assert np.allclose(jvp(lambda x: (x[0] * x[1], 3), [2, 3], [1, 1]), [5, 0])
+
+def test_jvp_length_mismatch():
+    with pytest.raises(ValueError):
+        jvp(rosenbrock, [2, 1], [1, 0, 0])
@@ -0,0 +1,94 @@
+"""Tests for lazy derivative evaluation
+"""
+
+import pytest
+import numpy as np
+from autodiff import operations, structures
+from autodiff.structures import Number, Array, Lazy, lazy, dense_variables
+from autodiff.optimizations import steepest_descent
+
+def test_records_partials_only(chain):
+    x, y = Number(0.3), Number(0.7)
+    with lazy():
+        z = chain(x, y, 5)
+    assert isinstance(z._deriv, Lazy)
+    assert z._deriv._deriv is None
+    assert z.val == pytest.approx(chain(x, y, 5).val)
+
+def test_same_jacobian_as_default_mode(chain):
+    x, y = Number(0.3), Number(0.7)
+    expected = chain(x, y, 20).jacobian([x, y])
+    with lazy():
+        z = chain(x, y, 20)
+    assert np.allclose(z.jacobian([x, y]), expected)
+    assert z.jacobian(x) == pytest.approx(expected[0])
+
+def test_materialized_once():
+    x = Number(2)
+    with lazy():
+        y = x * x
+        z = y * 3
+    assert z.jacobian(x) == 12
+    assert z._deriv._deriv is z._deriv.materialize()
+    w = z + y
+    assert w.jacobian(x) == 16
+
+def test_materialized_releases_operands():
+    x = Number(2)
+    with lazy():
+        z = x * x * 3
+    z.jacobian(x)
+    # Only the dict is kept, not the operands and intermediates
+    assert z._deriv.terms == ()
+    assert z.jacobian(x) == 12
+
+def test_mixed_with_dicts():
+    x = Number(2)
+    with lazy():
+        y = x * 3
+    z = y * x
+    assert isinstance(z._deriv, Lazy)
+    assert z.jacobian(x) == 12
+
+def test_intermediates_have_no_derivative():
+    x = Number(2)
+    with lazy():
+        y = x * 3
+        z = y * y
+    assert z.jacobian(y) == 0
+    assert z.jacobian(Number(1)) == 0
+
+def test_arrays():
+    x = Array([1, 2, 3])
+    with lazy():
+        y = operations.exp(x) * x[0]
+    assert np.allclose(y.jacobian(x), (operations.exp(x) * x[0]).jacobian(x))
+
+def test_long_chain():
+    x = Number(0.5)
+    with lazy():
+        z = x
+        for _ in range(5000):
+            z = z * 0.999 + 0.001
+    assert z.jacobian(x) == pytest.approx(0.999 ** 5000)
+
+def test_dense_mode_unaffected():
+    x, y = dense_variables([1, 2])
+    with lazy():
+        z = x * y
+    assert not isinstance(z._deriv, Lazy)
+    assert np.allclose(z.jacobian([x, y]), [2, 1])
+
+def test_steepest_descent_probes():
+    results = []
+    def rosenbrock(x):
+        results.append(((1 - x[0]) ** 2 + 100 * (x[1] - x[0] ** 2) ** 2, structures._lazy))
+        return results[-1][0]
+
+    steepest_descent(rosenbrock, Array([-1.2, 1]), iterations=20)
+    # Every trial step is evaluated within lazy(), after the first point, and the
+    # derivatives of the rejected ones are never materialized
+    assert not results[0][1] and all(probe for _, probe in results[1:])
+    materialized = [result._deriv._deriv is not None for result, _ in results[1:]]
+    assert any(materialized) and not all(materialized)
+    assert not structures._lazy
@@ -0,0 +1,77 @@
+"""Tests for leaf-only derivative tracking
+"""
+
+import tracemalloc
+import pytest
+import numpy as np
+from autodiff import structures
+from autodiff.structures import Number, Array, leaf_only
+
+def test_dicts_bounded_by_inputs(chain):
+    x, y = Number(0.3), Number(0.7)
+    with leaf_only():
+        z = chain(x, y, 50)
+    assert set(z._deriv) == {x, y}
+
+def test_default_mode_tracks_intermediates(chain):
+    x, y = Number(0.3), Number(0.7)
+    z = chain(x, y, 5)
+    assert len(z._deriv) > 2
+
+def test_same_gradient_as_default_mode(chain):
+    x, y = Number(0.3), Number(0.7)
+    expected = chain(x, y, 20).jacobian([x, y])
+    with leaf_only():
+        result = chain(x, y, 20).jacobian([x, y])
+    assert np.allclose(result, expected)
+
+def test_intermediates_have_no_derivative():
+    x = Number(2)
+    with leaf_only():
+        y = x * 3
+        z = y * y
+    assert z.jacobian(x) == 36
+    assert z.jacobian(y) == 0
+
+def test_independent_variables_created_inside():
+    with leaf_only():
+        x = Array([1, 2])
+        z = x[0] * x[1] + x[0]
+    assert np.array_equal(z.jacobian(x), [3, 1])
+
+def test_equality_of_intermediates():
+    x = Number(2)
+    with leaf_only():
+        assert (x * 3).equals(x * 3)
+        assert (x * x).equals(x ** 2)
+
+@pytest.mark.parametrize('mode, flag', [
+    (leaf_only, '_leaf_only'), (structures.lazy, '_lazy'), (structures.no_grad, '_no_grad')
+])
+def test_mode_is_restored(mode, flag):
+    with mode():
+        with mode():
+            pass
+        assert getattr(structures, flag)
+    assert not getattr(structures, flag)
+    with pytest.raises(RuntimeError):
+        with mode():
+            raise RuntimeError
+    assert not getattr(structures, flag)
+
+def test_less_memory_on_long_chains(chain):
+    def peak(func):
+        tracemalloc.start()
+        func()
+        usage = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return usage
+
+    def default():
+        chain(Number(0.3), Number(0.7), 100)
+
+    def leaves():
+        with leaf_only():
+            chain(Number(0.3), Number(0.7), 100)
+
+    assert peak(leaves) * 10 < peak(default)
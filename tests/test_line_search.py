@@ -0,0 +1,120 @@
+"""Tests for the line search
+"""
+
+import pytest
+import numpy as np
+from autodiff import optimizations
+from autodiff.line_search import LineFunction, line_search
+from autodiff.structures import Number, Array, DenseArray
+
+def rosenbrock(x0, a=1, b=100):
+    return (a - x0[0]) ** 2 + b * (x0[1] - x0[0] ** 2) ** 2
+
+def gradient(func, x):
+    return np.array(func(x).jacobian(x), dtype=float)
+
+@pytest.mark.parametrize('alpha', [1e-3, 1., 1e3])
+def test_strong_wolfe_conditions(alpha):
+    x = Array([-1.2, 1])
+    direction = -gradient(rosenbrock, x)
+    c1, c2 = 1e-4, 0.9
+    step, point, result, g, _ = line_search(rosenbrock, x, direction, alpha=alpha, c1=c1, c2=c2)
+    slope0 = np.dot(gradient(rosenbrock, x), direction)
+    assert step > 0
+    assert result.val <= rosenbrock(x).val + c1 * step * slope0
+    assert abs(np.dot(g, direction)) <= -c2 * slope0
+
+def test_returns_evaluation_of_step():
+    x = Array([-1.2, 1])
+    direction = -gradient(rosenbrock, x)
+    step, point, result, g, _ = line_search(rosenbrock, x, direction)
+    assert np.allclose([element.val for element in point], np.array([element.val for element in x]) + step * direction)
+    assert result.val == pytest.approx(rosenbrock(point).val)
+    assert np.allclose(g, gradient(rosenbrock, point))
+
+def test_scalar():
+    step, point, result, g, evaluations = line_search(lambda x: (x - 3) ** 2, Number(0), 1.)
+    assert 0 < step
+    assert abs(g) <= 0.9 * 6
+    assert result.val < 9
+
+def test_dense_array():
+    func = lambda x: (x[0] - 1) ** 2 + 2 * (x[1] + 1) ** 2
+    step, point, result, g, _ = line_search(func, DenseArray([0., 0.]), np.array([1., -2.]))
+    assert step == 1
+    assert np.array_equal(point.val, [1, -2])
+    assert np.array_equal(g, [0, -4])
+
+def test_known_point_is_not_evaluated(counted):
+    func = counted(rosenbrock)
+    x = Array([-1.2, 1])
+    result = rosenbrock(x)
+    g = gradient(rosenbrock, x)
+    _, _, _, _, evaluations = line_search(func, x, -g, result, g)
+    assert func.calls == evaluations
+    _, _, _, _, evaluations = line_search(func, x, -g)
+    assert func.calls == 2 * evaluations - 1
+
+def test_line_function_caches_steps(counted):
+    func = counted(lambda x: (x - 3) ** 2)
+    phi = LineFunction(func, Number(0), 1.)
+    assert phi(2.) == (1., -2.)
+    assert phi(2.) == (1., -2.)
+    assert func.calls == phi.evaluations == 1
+
+def test_ascent_direction():
+    with pytest.raises(ValueError):
+        line_search(lambda x: (x - 3) ** 2, Number(0), -1.)
+
+def test_bfgs_far_start(counted):
+    func = counted(rosenbrock)
+    xstar, value, jacobians = optimizations.bfgs(func, Array([-3, -4]))
+    assert np.allclose([element.val for element in xstar], [1, 1])
+    assert np.linalg.norm(jacobians[-1]) < 1e-8
+    # A couple of evaluations per iteration, including the last value returned
+    assert func.calls < 3 * len(jacobians)
+
+def test_bfgs_scalar_far_start():
+    xstar, value, _ = optimizations.bfgs(lambda x: (x - 2) ** 4 + x ** 2, Number(40))
+    assert 2 * (xstar.val - 2) ** 3 + xstar.val == pytest.approx(0, abs=1e-6)
+
+def offset_bowl(x):
+    # The decrease of the bowl is lost to rounding once it's below the spacing of 1e16
+    return 1e16 + (x[0] - 1) ** 2 + (x[1] - 1) ** 2
+
+def test_failure_returns_zero_step(counted):
+    x = Array([1.5, 1.5])
+    func = counted(offset_bowl)
+    step, point, result, g, evaluations = line_search(func, x, -gradient(offset_bowl, x))
+    assert step == 0
+    assert [element.val for element in point] == [1.5, 1.5]
+    assert evaluations == func.calls
+
+def test_trial_steps_run_out():
+    # Every step decreases func, but the slope stays steep
+    step, point, result, g, _ = line_search(lambda x: -x, Number(0), 1., iterations=3)
+    assert step == 4
+    assert result.val == -4
+
+@pytest.mark.parametrize('optimizer', [optimizations.bfgs, optimizations.lbfgs])
+def test_quasi_newton_stops_without_decrease(optimizer, counted):
+    func = counted(offset_bowl)
+    xstar, value, jacobians, evaluations = optimizer(func, Array([3, 3]), count_evaluations=True)
+    assert len(jacobians) < 10
+    assert func.calls == sum(evaluations) < 50
+
+def test_steepest_descent_stops_without_decrease(counted):
+    func = counted(offset_bowl)
+    i, xstar, value, jacobians, evaluations = optimizations.steepest_descent(
+        func, Array([3, 3]), iterations=100, count_evaluations=True)
+    assert i < 20
+    assert func.calls == sum(evaluations) < 100
+    assert value.val <= offset_bowl(Array([3, 3])).val
+
+def test_steepest_descent_scalar_stops_without_decrease(counted):
+    func = counted(lambda x: 1e16 + (x - 1) ** 2)
+    xstar, value, jacobians, evaluations = optimizations.steepest_descent(
+        func, Number(3), count_evaluations=True)
+    assert len(jacobians) == 1
+    assert xstar.val == 3
+    assert func.calls == sum(evaluations)
@@ -0,0 +1,84 @@
+"""Tests for value-only evaluation
+"""
+
+import pytest
+import numpy as np
+from autodiff import operations
+from autodiff.structures import Number, Array, DenseArray, no_grad
+from autodiff.tracing import trace
+
+def func(x):
+    return operations.sin(x[0]) * x[1] ** 2 - operations.log(x[1], 2) / x[0] + 3 ** x[0]
+
+def test_same_values():
+    x = Array([0.5, 1.5])
+    expected = func(x).val
+    with no_grad():
+        result = func(x)
+    assert result.val == pytest.approx(expected)
+
+def test_no_derivatives():
+    x = Array([0.5, 1.5])
+    with no_grad():
+        result = func(x)
+        negated = -x[0] - 1
+    assert result._deriv == {}
+    assert np.array_equal(result.jacobian(x), [0, 0])
+    assert negated.jacobian(x[0]) == 0
+
+def test_value_only_numbers_are_constants():
+    x = Number(2)
+    with no_grad():
+        y = x * 3
+    assert (y * x).jacobian(x) == 6
+
+def test_arrays():
+    x = Array([0, 1])
+    with no_grad():
+        y = operations.exp(x)
+    assert np.allclose([element.val for element in y], [1, np.e])
+    assert np.array_equal(y.jacobian(x), np.zeros((2, 2)))
+
+def test_user_operations():
+    @operations.elementary(lambda x: pytest.fail('derivative computed'))
+    def double(x):
+        return 2 * x.val
+
+    @operations.fused
+    def triple(x):
+        return 3 * x, 3
+
+    x = Number(2)
+    with no_grad():
+        assert double(x).val == 4
+        assert triple(x).val == 6
+
+def test_traced_function():
+    traced = trace(func, [1, 1])
+    x = Array([0.5, 1.5])
+    with no_grad():
+        result = traced(x)
+    assert result.val == pytest.approx(func(Array([0.5, 1.5])).val)
+    assert result._deriv == {}
+
+def test_traced_function_first_called_within_no_grad():
+    traced = trace(lambda x: x[0] * x[1])
+    with no_grad():
+        assert traced(Array([2, 3])).val == 6
+    x = Array([4, 5])
+    result = traced(x)
+    assert result.val == 20
+    assert np.array_equal(result.jacobian(x), [5, 4])
+
+def test_dense_array():
+    x = DenseArray([1., 2.])
+    with no_grad():
+        y = x * x
+        assert isinstance(y, DenseArray) and y._deriv == {}
+        assert len(y) == 2
+        assert y[1].val == 4
+        assert y.sum().val == 5
+        assert (y @ x).val == 9
+        assert (np.ones(2) @ x).val == 3
+    # Outside no_grad(), y is a constant
+    assert np.array_equal((x @ y).jacobian(x), [1, 4])
@@ -1,10 +1,14 @@
 """Tests for the optimizations library
 """
 
+import gc
+import tracemalloc
+import warnings
 import pytest
 import numpy as np
 from autodiff import operations, optimizations
-from autodiff.structures import Number, Array
+from autodiff.structures import Number, Array, Derivative, Tangent, dense_variables, sparse_variables
+from autodiff.reverse import Tape
 
 def rosenbrock(x0, a=1, b=100):
     return (a - x0[0]) ** 2 + b * (x0[1] - x0[0] ** 2) ** 2
@@ -146,3 +150,186 @@ def test_steepest_descent_scalar():
     xstar, _, _ = optimizations.steepest_descent(quadratic, initial_guess, iterations=400)
     print(xstar)
     assert xstar.val == pytest.approx(1, abs=1e-3)
+
+def peak_memory(func):
+    gc.collect()
+    with warnings.catch_warnings():
+        # Recorded warnings would grow with the iterations too
+        warnings.simplefilter('ignore')
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return peak
+
+def slow_bowl(x):
+    return (x[0] - 1) ** 2 + 10 * (x[1] - 2) ** 2 + operations.sin(x[0]) * 0.1
+
+def test_steepest_descent_flat_memory():
+    def run(iterations):
+        return lambda: optimizations.steepest_descent(
+            slow_bowl, Array([Number(5), Number(5)]), iterations=iterations, step_size=0.001
+        )
+    # Iterates used to hold every previous iterate in their derivative dicts, tens of kB
+    # per iteration. Only the returned jacobians and garbage awaiting collection grow now
+    assert peak_memory(run(200)) - peak_memory(run(50)) < 150 * 1000
+
+def test_bfgs_flat_memory():
+    def run(iterations):
+        return lambda: optimizations.bfgs(
+            slow_bowl, Array([Number(5), Number(5)]), iterations=iterations, tolerance=0
+        )
+    assert peak_memory(run(200)) < 2 * peak_memory(run(50))
+
+def test_iterates_are_reseeded():
+    _, x, _, _ = optimizations.steepest_descent(
+        slow_bowl, Array([Number(5), Number(5)]), iterations=20, step_size=0.001
+    )
+    assert all(list(element._deriv) == [element] for element in x)
+    x, _, _ = optimizations.bfgs(quadratic, Number(3))
+    assert list(x._deriv) == [x]
+
+@pytest.mark.parametrize('variables', [dense_variables, sparse_variables, Tape().variables])
+@pytest.mark.parametrize('optimizer', [optimizations.bfgs, optimizations.lbfgs])
+def test_iterates_keep_mode(variables, optimizer):
+    x0 = variables([2, 1])
+    xstar, value, _ = optimizer(rosenbrock, x0)
+    assert all(type(element._deriv) is type(x0[0]._deriv) for element in xstar)
+    assert value.val == pytest.approx(0)
+
+def test_dense_scalar_iterate_keeps_mode():
+    xstar, _, _ = optimizations.bfgs(quadratic, dense_variables([3])[0])
+    assert isinstance(xstar._deriv, Tangent)
+    assert xstar.val == pytest.approx(1)
+
+def test_reseed_unsupported_mode():
+    class Constant(Derivative):
+        pass
+    with pytest.raises(TypeError):
+        optimizations.bfgs(quadratic, Array([Number(3, Constant())]))
+
+
+@pytest.mark.parametrize('n', [3, 6])
+def test_bfgs_n_dimensional(n):
+    weights = np.arange(1, n + 1)
+    def func(x):
+        return sum(w * (x[i] - i) ** 2 for i, w in enumerate(weights))
+    xstar, _, _ = optimizations.bfgs(func, Array([0.5] * n))
+    assert np.allclose([element.val for element in xstar], np.arange(n))
+
+def test_bfgs_symbolic_n_dimensional():
+    rng = np.random.RandomState(0)
+    A = rng.normal(size=(8, 8))
+    A = A @ A.T + 8 * np.identity(8)
+    b = rng.normal(size=8)
+    xstar, _, _ = optimizations.bfgs_symbolic(
+        lambda x: 0.5 * x @ A @ x - b @ x, lambda x: A @ x - b, np.zeros(8)
+    )
+    assert np.allclose(xstar, np.linalg.solve(A, b))
+
+def test_inverse_hessian_update():
+    rng = np.random.RandomState(0)
+    H = np.identity(4)
+    s, y = rng.normal(size=4), rng.normal(size=4)
+    y = y if np.dot(s, y) > 0 else -y
+    assert optimizations._update_inverse_hessian(H, s, y)
+    # secant condition, and symmetry
+    assert np.allclose(H @ y, s)
+    assert np.allclose(H, H.T)
+
+def test_inverse_hessian_update_buffer():
+    rng = np.random.RandomState(0)
+    H, expected, buffer = np.identity(4), np.identity(4), np.empty((4, 4))
+    for _ in range(3):
+        s, y = rng.normal(size=4), rng.normal(size=4)
+        y = y if np.dot(s, y) > 0 else -y
+        optimizations._update_inverse_hessian(H, s, y, buffer)
+        optimizations._update_inverse_hessian(expected, s, y)
+    assert np.allclose(H, expected)
+
+def test_inverse_hessian_update_curvature_safeguard():
+    H = np.identity(2)
+    assert not optimizations._update_inverse_hessian(H, np.array([1., 0]), np.array([-1., 0]))
+    assert not optimizations._update_inverse_hessian(H, np.array([1., 0]), np.array([0., 1]))
+    assert np.array_equal(H, np.identity(2))
+
+def extended_rosenbrock(x):
+    total = 0
+    for i in range(len(x) - 1):
+        total = total + 100 * (x[i + 1] - x[i] ** 2) ** 2 + (1 - x[i]) ** 2
+    return total
+
+def test_lbfgs():
+    xstar, value, jacobians = optimizations.lbfgs(rosenbrock, Array([2, 1]))
+    assert xstar[0].val == pytest.approx(1)
+    assert xstar[1].val == pytest.approx(1)
+    assert value.val == pytest.approx(0)
+    assert np.linalg.norm(jacobians[-1]) < 1e-8
+
+def test_lbfgs_n_dimensional():
+    xstar, _, _ = optimizations.lbfgs(extended_rosenbrock, Array([-1.2, 1] * 5), iterations=300)
+    assert np.allclose([element.val for element in xstar], np.ones(10), atol=1e-6)
+
+def test_lbfgs_small_memory():
+    xstar, _, _ = optimizations.lbfgs(extended_rosenbrock, Array([0.] * 6), memory=2, iterations=500)
+    assert np.allclose([element.val for element in xstar], np.ones(6), atol=1e-6)
+
+def test_lbfgs_two_loop_matches_bfgs():
+    rng = np.random.RandomState(1)
+    history = []
+    for _ in range(3):
+        s, y = rng.normal(size=5), rng.normal(size=5)
+        y = y if np.dot(s, y) > 0 else -y
+        history.append((s, y, 1 / np.dot(s, y)))
+    # The two-loop recursion is BFGS from the scaled identity of the last pair
+    s, y, _ = history[-1]
+    H = np.dot(s, y) / np.dot(y, y) * np.identity(5)
+    for s, y, _ in history:
+        optimizations._update_inverse_hessian(H, s, y)
+    g = rng.normal(size=5)
+    assert np.allclose(optimizations._two_loop(g, history), H @ g)
+    assert np.allclose(optimizations._two_loop(g, []), g)
+
+def test_lbfgs_needs_array():
+    with pytest.raises(TypeError):
+        optimizations.lbfgs(quadratic, Number(3))
+
+@pytest.mark.parametrize('n', [2, 10])
+def test_steepest_descent_one_evaluation_per_point(n, counted):
+    func = counted(lambda x: (x - np.ones(n)) @ (x - np.ones(n)))
+    i, xstar, value, jacobians, evaluations = optimizations.steepest_descent(
+        func, Array([1.1] * n), iterations=400, count_evaluations=True)
+    assert np.allclose([element.val for element in xstar], np.ones(n), atol=1e-6)
+    assert len(evaluations) == i + 1
+    assert sum(evaluations) == func.calls
+    # No evaluation per coordinate, so the count does not grow with n
+    assert func.calls < 3 * (i + 1)
+
+def test_steepest_descent_jacobians_are_not_aliased():
+    i, xstar, value, jacobians = optimizations.steepest_descent(rosenbrock, Array([2, 1]), iterations=5)
+    assert not np.allclose(jacobians[0], jacobians[-1])
+    assert jacobians[0] == pytest.approx(-np.array(gradient_rosenbrock([2, 1])))
+
+def test_steepest_descent_scalar_evaluations(counted):
+    func = counted(quadratic)
+    xstar, value, jacobians, evaluations = optimizations.steepest_descent(
+        func, Number(3), count_evaluations=True)
+    assert xstar.val == pytest.approx(1)
+    assert len(evaluations) == len(jacobians)
+    assert func.calls == sum(evaluations)
+
+@pytest.mark.parametrize('optimizer', [optimizations.bfgs, optimizations.lbfgs])
+def test_evaluations(optimizer, counted):
+    func = counted(rosenbrock)
+    xstar, value, jacobians, evaluations = optimizer(func, Array([2, 1]), count_evaluations=True)
+    assert value.val == pytest.approx(0)
+    assert len(evaluations) == len(jacobians)
+    assert evaluations[0] == 1 and min(evaluations) >= 1
+    assert func.calls == sum(evaluations)
+
+def test_bfgs_scalar_evaluations(counted):
+    func = counted(quadratic)
+    xstar, value, jacobians, evaluations = optimizations.bfgs(func, Number(3), count_evaluations=True)
+    assert xstar.val == pytest.approx(1)
+    assert len(evaluations) == len(jacobians)
+    assert func.calls == sum(evaluations)
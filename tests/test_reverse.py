@@ -0,0 +1,202 @@
+"""Tests for reverse mode
+"""
+
+import pytest
+import numpy as np
+from autodiff import operations, optimizations
+from autodiff.structures import Number, Array
+from autodiff.forward import hessian, jvp
+from autodiff.reverse import Tape, Node, grad, value_and_grad, hvp, vjp
+
+def rosenbrock(x0, a=1, b=100):
+    return (a - x0[0]) ** 2 + b * (x0[1] - x0[0] ** 2) ** 2
+
+def gradient_rosenbrock(x0):
+    x = x0[0]
+    y = x0[1]
+    drdx = -2 * (1 - x) - 400 * x * (-x ** 2 + y)
+    drdy = 200 *(-x**2 + y)
+    return np.array((drdx, drdy))
+
+def test_tape_records_operations():
+    tape = Tape()
+    x = tape.variables([2, 3])
+    y = x[0] * x[1] + 1
+    assert isinstance(y._deriv, Node)
+    assert len(tape) == 4
+
+def test_jacobian():
+    tape = Tape()
+    x = tape.variables([2, 3])
+    y = x[0] * x[1]
+    assert y.jacobian(x[0]) == 3
+    assert y.jacobian(x[1]) == 2
+    assert np.array_equal(y.jacobian(x), [3, 2])
+
+def test_jacobian_intermediate():
+    tape = Tape()
+    x = tape.variable(2)
+    y = x * 3
+    z = y ** 2
+    assert z.jacobian(y) == 12
+    assert z.jacobian(x) == 36
+
+def test_jacobian_unrecorded():
+    tape = Tape()
+    x = tape.variable(2)
+    y = x * 3
+    assert y.jacobian(Number(2)) == 0
+    assert y.jacobian(Tape().variable(2)) == 0
+
+def test_same_number():
+    tape = Tape()
+    x = tape.variable(2)
+    assert (x * x).jacobian(x) == 4
+    assert (x / x).jacobian(x) == 0
+
+@pytest.mark.parametrize('name', [
+    'sin', 'cos', 'tan', 'exp', 'log', 'logistic', 'asin',
+    'acos', 'atan', 'sinh', 'cosh', 'tanh', 'sqrt', 'negate',
+])
+def test_matches_forward_mode(name):
+    func = getattr(operations, name)
+    x_forward = Number(0.3)
+    x_reverse = Tape().variable(0.3)
+    assert func(x_reverse).val == pytest.approx(func(x_forward).val)
+    assert func(x_reverse).jacobian(x_reverse) == pytest.approx(func(x_forward).jacobian(x_forward))
+
+def test_array_jacobian():
+    tape = Tape()
+    x = tape.variables([2, 3])
+    y = Array([x[0] * x[1], operations.sin(x[0])])
+    jacobian = y.jacobian(x)
+    assert jacobian[0, 0] == 3
+    assert jacobian[0, 1] == 2
+    assert jacobian[1, 0] == pytest.approx(np.cos(2))
+    assert jacobian[1, 1] == 0
+
+def test_different_tapes():
+    with pytest.raises(ValueError):
+        Tape().variable(1) + Tape().variable(2)
+
+def test_mixed_modes():
+    with pytest.raises(TypeError):
+        Tape().variable(1) + Number(2)
+
+def test_grad():
+    gradient = grad(rosenbrock)([2, 1])
+    assert np.allclose(gradient, gradient_rosenbrock([2, 1]))
+
+def test_grad_array():
+    gradient = grad(rosenbrock)(Array([Number(2), Number(1)]))
+    assert np.allclose(gradient, gradient_rosenbrock([2, 1]))
+
+def test_grad_many_inputs():
+    def func(x):
+        return sum(operations.sin(x[i]) * x[i + 1] for i in range(len(x) - 1))
+    x0 = np.linspace(0, 1, 50)
+    gradient = grad(func)(x0)
+    expected = np.zeros(50)
+    expected[:-1] += np.cos(x0[:-1]) * x0[1:]
+    expected[1:] += np.sin(x0[:-1])
+    assert np.allclose(gradient, expected)
+
+def test_grad_scalar():
+    assert grad(lambda x: x ** 3)(2) == pytest.approx(12)
+    assert grad(lambda x: x ** 3)(Number(2)) == pytest.approx(12)
+
+def test_grad_constant_function():
+    assert np.array_equal(grad(lambda x: 1)([1, 2]), [0, 0])
+
+def test_value_and_grad():
+    value, gradient = value_and_grad(rosenbrock)([2, 1])
+    assert value == rosenbrock([2, 1])
+    assert np.allclose(gradient, gradient_rosenbrock([2, 1]))
+
+def test_bfgs_symbolic_with_grad():
+    xstar, _, _ = optimizations.bfgs_symbolic(rosenbrock, grad(rosenbrock), [2, 1])
+    assert xstar[0] == pytest.approx(1)
+    assert xstar[1] == pytest.approx(1)
+
+def mixed(x):
+    return (
+        operations.sin(x[0]) * operations.exp(x[1]) / operations.sqrt(x[2])
+        + operations.log(x[2]) * x[0] ** 3 - operations.tanh(x[1] * x[2])
+        + x[0] ** x[1] + operations.logistic(x[2]) / x[1]
+    )
+
+def test_hvp_matches_hessian():
+    x = [0.3, 0.5, 2.0]
+    for v in np.identity(3).tolist() + [[1, -2, 0.5]]:
+        assert np.allclose(hvp(mixed, x, v), hessian(mixed, x) @ v)
+
+def test_hvp_rosenbrock():
+    assert np.allclose(hvp(rosenbrock, [2, 1], [1, 2]), [4402 - 1600, -800 + 400])
+
+def test_hvp_scalar():
+    assert hvp(lambda x: x ** 3, 2, 3) == pytest.approx(36)
+
+def test_hvp_many_inputs():
+    def func(x):
+        return sum(x[i] ** 2 * x[i + 1] for i in range(len(x) - 1))
+    n = 1000
+    x = np.linspace(0.5, 1.5, n)
+    v = np.cos(np.arange(n))
+    # Tridiagonal Hessian of sum x_i^2 x_(i+1)
+    diagonal = np.zeros(n)
+    diagonal[:-1] = 2 * x[1:]
+    off_diagonal = 2 * x[:-1]
+    expected = diagonal * v
+    expected[:-1] += off_diagonal * v[1:]
+    expected[1:] += off_diagonal * v[:-1]
+    assert np.allclose(hvp(func, x, v), expected)
+
+def test_hvp_newton_cg_step():
+    """A matrix-free Newton step on the Rosenbrock function, solved with conjugate gradients
+    """
+    x = np.array([2., 1.])
+    g = grad(rosenbrock)(x)
+    step = np.zeros(2)
+    r = -g
+    p = r.copy()
+    for _ in range(2):
+        hp = hvp(rosenbrock, x, p)
+        alpha = (r @ r) / (p @ hp)
+        step = step + alpha * p
+        r_next = r - alpha * hp
+        p = r_next + (r_next @ r_next) / (r @ r) * p
+        r = r_next
+    assert np.allclose(step, np.linalg.solve(hessian(rosenbrock, x), -g))
+
+def test_hvp_length_mismatch():
+    with pytest.raises(ValueError):
+        hvp(rosenbrock, [2, 1], [1, 2, 3])
+
+def test_vjp_matches_jacobian():
+    func = lambda x: Array([x[0] * x[1], operations.sin(x[0]) + x[2] ** 2])
+    x = Array([Number(1), Number(2), Number(3)])
+    jacobian = func(x).jacobian(x)
+    u = np.array([0.5, -1])
+    assert np.allclose(vjp(func, [1, 2, 3], u), u @ jacobian)
+
+def test_vjp_scalar_output_is_gradient():
+    assert np.allclose(vjp(rosenbrock, [2, 1], 1), grad(rosenbrock)([2, 1]))
+
+def test_vjp_scalar_input():
+    assert vjp(lambda x: (x ** 2, x), 2, [1, 3]) == pytest.approx(7)
+
+def test_vjp_repeated_output():
+    assert np.allclose(vjp(lambda x: (x[0] * x[1], x[0] * x[1]), [2, 3], [1, 2]), [9, 6])
+    y = lambda x: x[0] * x[1]
+    assert np.allclose(vjp(lambda x: (y(x), 1), [2, 3], [1, 2]), [3, 2])
+
+def test_vjp_jvp_adjoint():
+    func = lambda x: Array([x[0] * x[1] * x[2], operations.exp(x[0]) - x[1]])
+    x = [0.5, 2, -1]
+    u = np.array([1.5, -2])
+    v = np.array([0.3, 1, -0.7])
+    assert np.dot(u, jvp(func, x, v)) == pytest.approx(np.dot(vjp(func, x, u), v))
+
+def test_vjp_length_mismatch():
+    with pytest.raises(ValueError):
+        vjp(lambda x: (x[0], x[1]), [2, 1], [1, 0, 0])
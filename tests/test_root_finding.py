@@ -8,7 +8,7 @@ sys.path.append('..')
 import pytest
 import numpy as np
 from autodiff import operations, root_finding
-from autodiff.structures import Number, Array
+from autodiff.structures import Number, Array, Tangent, dense_variables
 
 # def func_array(x):
 #     return x[0] ** 2 * (x[1] + 2)
@@ -77,3 +77,16 @@ def test_newtons_method_scalar_verbose():
     xstar, _ = root_finding.newtons_method(func_scalar, initial_guess, verbose=True)
     assert xstar.val == pytest.approx(1, abs=1e-3)
 
+def test_newtons_method_iterates_are_reseeded():
+    func = lambda x: (x[0] ** 2 - 4, x[1] * 3 - x[0])
+    xstar, _ = root_finding.newtons_method(func, Array((Number(1), Number(1))))
+    assert all(list(element._deriv) == [element] for element in xstar)
+    xstar, _ = root_finding.newtons_method(func_scalar, Number(2))
+    assert list(xstar._deriv) == [xstar]
+
+def test_newtons_method_dense_guess():
+    func = lambda x: (x[0] ** 2 - 4, x[1] * 3 - x[0])
+    xstar, _ = root_finding.newtons_method(func, dense_variables([1, 1]))
+    assert all(isinstance(element._deriv, Tangent) for element in xstar)
+    assert np.allclose([element.val for element in xstar], [2, 2 / 3])
+
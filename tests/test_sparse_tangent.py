@@ -0,0 +1,67 @@
+"""Tests for sparse mode derivatives
+"""
+
+import pytest
+import numpy as np
+from autodiff import operations
+from autodiff.structures import Number, Array, CSRMatrix, sparse_variables
+
+def func(x):
+    return Array([
+        x[0] * x[2] + x[1],
+        x[1] / x[0] - x[2] ** x[1],
+        operations.sin(x[1]) * 2 - 1,
+        3 ** x[0] + x[0] / 4,
+    ])
+
+def test_same_jacobian_as_default_mode():
+    x = sparse_variables([2, 3, 4])
+    expected = Array([2, 3, 4])
+    assert np.allclose(func(x).jacobian(x), func(expected).jacobian(expected))
+
+def test_sorted_int32_indices():
+    x = sparse_variables([1, 2, 3, 4])
+    y = x[3] * x[1] + x[0] - x[1]
+    assert y._deriv.indices.dtype == np.int32
+    assert np.array_equal(y._deriv.indices, [0, 1, 3])
+    assert np.allclose(y._deriv.values, [1, 3, 2])
+
+def test_scalar_jacobian():
+    x = sparse_variables([2, 5])
+    y = x[0] * x[0]
+    assert y.jacobian(x[0]) == 4
+    assert y.jacobian(x[1]) == 0
+    assert y.jacobian(Number(1)) == 0
+
+def test_csr_output():
+    x = sparse_variables([2, 3, 4])
+    y = func(x)
+    jacobian = y.jacobian(x, sparse=True)
+    assert isinstance(jacobian, CSRMatrix)
+    assert jacobian.nnz == 8
+    assert np.allclose(jacobian.toarray(), y.jacobian(x))
+    assert np.allclose(y.jacobian([x[2], x[0]], sparse=True).toarray(), y.jacobian([x[2], x[0]]))
+
+def test_csr_output_default_mode():
+    x = Array([2, 3, 4])
+    y = func(x)
+    assert np.allclose(y.jacobian(x, sparse=True).toarray(), y.jacobian(x))
+
+def test_different_spaces():
+    x, y = sparse_variables([1]), sparse_variables([2])
+    with pytest.raises(ValueError):
+        x[0] + y[0]
+
+def test_mixed_modes():
+    with pytest.raises(TypeError):
+        sparse_variables([1])[0] + Number(2)
+
+def test_many_inputs():
+    n = 5000
+    x = sparse_variables(np.linspace(1, 2, n))
+    y = Array([x[i] * x[i + 1] - x[i] for i in range(n - 1)])
+    jacobian = y.jacobian(x, sparse=True)
+    assert jacobian.shape == (n - 1, n)
+    assert jacobian.nnz == 2 * (n - 1)
+    values = np.linspace(1, 2, n)
+    assert np.allclose(jacobian @ np.ones(n), values[1:] - 1 + values[:-1])
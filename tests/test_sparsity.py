@@ -0,0 +1,111 @@
+"""Tests for sparse Jacobians
+"""
+
+import numpy as np
+from autodiff import operations, root_finding
+from autodiff.structures import Number, Array
+from autodiff.sparsity import (CSRMatrix, sparsity_pattern, color_columns, sparse_jacobian,
+                               value_and_sparse_jacobian)
+
+def broyden(n):
+    def func(x):
+        return tuple(
+            (3 - 2 * x[i]) * x[i] - (x[i - 1] if i > 0 else 0)
+            - 2 * (x[i + 1] if i < n - 1 else 0) + 1
+            for i in range(n)
+        )
+    return func
+
+def dense_jacobian(func, values):
+    x = Array(values)
+    return np.array([[out.jacobian(xj) for xj in x] for out in func(x)], dtype=float)
+
+def test_csr_toarray():
+    matrix = CSRMatrix([1, 2, 3], [0, 2, 1], [0, 2, 2, 3], (3, 3))
+    assert matrix.nnz == 3
+    assert np.array_equal(matrix.toarray(), [[1, 0, 2], [0, 0, 0], [0, 3, 0]])
+
+def test_csr_matvec():
+    matrix = CSRMatrix([1, 2, 3], [0, 2, 1], [0, 2, 2, 3], (3, 3))
+    v = np.array([1., -2, 4])
+    assert np.allclose(matrix @ v, matrix.toarray() @ v)
+
+def test_csr_equality():
+    assert CSRMatrix([1], [0], [0, 1], (1, 1)) == CSRMatrix([1], [0], [0, 1], (1, 1))
+    assert CSRMatrix([1], [0], [0, 1], (1, 1)) != CSRMatrix([2], [0], [0, 1], (1, 1))
+    assert repr(CSRMatrix([1], [0], [0, 1], (1, 1))) == 'CSRMatrix(shape=(1, 1), nnz=1)'
+
+def test_pattern_tridiagonal():
+    pattern = sparsity_pattern(broyden(5), [1] * 5)
+    assert np.array_equal(pattern.toarray(), dense_jacobian(broyden(5), [1] * 5) != 0)
+    assert np.array_equal(pattern.indices[pattern.indptr[2]:pattern.indptr[3]], [1, 2, 3])
+
+def test_pattern_ignores_constant_outputs():
+    pattern = sparsity_pattern(lambda x: (x[0] * x[2], 1), [1, 2, 3])
+    assert np.array_equal(pattern.toarray(), [[1, 0, 1], [0, 0, 0]])
+
+def test_tridiagonal_needs_three_colors():
+    for n in [3, 10, 50]:
+        colors = color_columns(sparsity_pattern(broyden(n), [1] * n))
+        assert colors.max() + 1 == 3
+
+def test_colors_are_structurally_orthogonal():
+    func = lambda x: (x[0] * x[3], x[1] + x[2], operations.sin(x[0]) * x[1], x[4])
+    pattern = sparsity_pattern(func, [1, 2, 3, 4, 5])
+    colors = color_columns(pattern)
+    for k in range(pattern.shape[0]):
+        row = colors[pattern.indices[pattern.indptr[k]:pattern.indptr[k + 1]]]
+        assert len(set(row)) == len(row)
+
+def test_diagonal_needs_one_color():
+    colors = color_columns(sparsity_pattern(lambda x: operations.exp(x), [0, 1, 2]))
+    assert np.array_equal(colors, [0, 0, 0])
+
+def test_sparse_jacobian_matches_dense():
+    values = np.linspace(-1, 1, 12)
+    jacobian = sparse_jacobian(broyden(12), values)
+    assert isinstance(jacobian, CSRMatrix)
+    assert np.allclose(jacobian.toarray(), dense_jacobian(broyden(12), values))
+
+def test_sparse_jacobian_reuses_pattern():
+    func = broyden(6)
+    pattern = sparsity_pattern(func, [0] * 6)
+    colors = color_columns(pattern)
+    for values in [np.ones(6), np.arange(6.)]:
+        jacobian = sparse_jacobian(func, values, pattern, colors)
+        assert np.allclose(jacobian.toarray(), dense_jacobian(func, values))
+
+def test_sparse_jacobian_scalar_output():
+    rosenbrock = lambda x: (1 - x[0]) ** 2 + 100 * (x[1] - x[0] ** 2) ** 2
+    jacobian = sparse_jacobian(rosenbrock, [2, 1])
+    assert jacobian.shape == (1, 2)
+    assert np.allclose(jacobian.toarray(), [[-2 * (1 - 2) - 400 * 2 * (1 - 4), 200 * (1 - 4)]])
+
+def test_newtons_method_sparse():
+    func = broyden(10)
+    xstar, jacobians = root_finding.newtons_method(
+        func, Array([Number(-1.) for _ in range(10)]), sparse=True
+    )
+    assert isinstance(jacobians[0], CSRMatrix)
+    assert np.allclose([out.val for out in func(xstar)], 0, atol=1e-7)
+
+def test_newtons_method_sparse_matches_dense():
+    func = broyden(5)
+    xsparse, _ = root_finding.newtons_method(func, Array([-1.] * 5), sparse=True)
+    xdense, _ = root_finding.newtons_method(func, Array([-1.] * 5))
+    assert np.allclose([x.val for x in xsparse], [x.val for x in xdense])
+
+def test_newtons_method_sparse_evaluates_once_per_iteration(counted):
+    func = counted(broyden(10))
+    xstar, jacobians, fxn = root_finding.newtons_method(func, Array([-1.] * 10), sparse=True,
+                                                        show_fxn=True)
+    assert np.allclose(fxn, 0, atol=1e-7)
+    # One evaluation per iteration, the last one finds the root, after checking that func
+    # returns a tuple and detecting the sparsity pattern
+    assert func.calls == len(jacobians) + 1 + 2
+
+def test_value_and_sparse_jacobian():
+    values = np.linspace(-1, 1, 6)
+    out, jacobian = value_and_sparse_jacobian(broyden(6), values)
+    assert np.allclose(out, [element.val for element in broyden(6)(Array(values))])
+    assert np.allclose(jacobian.toarray(), dense_jacobian(broyden(6), values))
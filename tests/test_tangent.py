@@ -0,0 +1,135 @@
+"""Tests for dense mode Numbers
+"""
+
+import pytest
+import numpy as np
+import autodiff.operations as operations
+from autodiff.structures import Number, Array, Tangent, TangentSpace, dense_variables
+
+def rosenbrock(x0, a=1, b=100):
+    return (a - x0[0]) ** 2 + b * (x0[1] - x0[0] ** 2) ** 2
+
+def test_dense_variables_are_seeded():
+    x = dense_variables([2, 3])
+    assert isinstance(x, Array)
+    assert isinstance(x[0]._deriv, Tangent)
+    assert x[0]._deriv.slot == 0
+    assert x[1]._deriv.slot == 1
+    assert x[0]._deriv.space is x[1]._deriv.space
+    assert x[0]._deriv.vec.dtype == np.float64
+
+def test_dense_self_jacobian():
+    x = dense_variables([2, 3])
+    assert x[0].jacobian(x[0]) == 1
+    assert x[0].jacobian(x[1]) == 0
+
+def test_dense_add():
+    x, y = dense_variables([2, 3])
+    result = x + y
+    assert result.val == 5
+    assert result.jacobian(x) == 1
+    assert result.jacobian(y) == 1
+
+def test_dense_mul():
+    x, y = dense_variables([2, 3])
+    result = x * y
+    assert result.val == 6
+    assert np.array_equal(result.jacobian([x, y]), [3, 2])
+
+def test_dense_mul_same_number():
+    x, = dense_variables([2])
+    assert (x * x).jacobian(x) == 4
+
+def test_dense_div():
+    x, y = dense_variables([4, 2])
+    result = x / y
+    assert result.jacobian(x) == pytest.approx(1 / 2)
+    assert result.jacobian(y) == pytest.approx(-1)
+
+def test_dense_pow():
+    x, y = dense_variables([4, 2])
+    result = x ** y
+    assert result.jacobian(x) == pytest.approx(8)
+    assert result.jacobian(y) == pytest.approx(16 * np.log(4))
+
+def test_dense_mixed_constants():
+    x, = dense_variables([2])
+    result = 3 - 2 * x / 4 + 2 ** x
+    assert result.val == pytest.approx(6)
+    assert result.jacobian(x) == pytest.approx(-1 / 2 + 4 * np.log(2))
+
+@pytest.mark.parametrize('name', [
+    'sin', 'cos', 'tan', 'exp', 'log', 'logistic', 'asin',
+    'acos', 'atan', 'sinh', 'cosh', 'tanh', 'sqrt', 'negate',
+])
+def test_dense_matches_dict_mode(name):
+    func = getattr(operations, name)
+    x_dict = Number(0.3)
+    x_dense, = dense_variables([0.3])
+    assert func(x_dense).val == pytest.approx(func(x_dict).val)
+    assert func(x_dense).jacobian(x_dense) == pytest.approx(func(x_dict).jacobian(x_dict))
+
+def test_dense_log_base():
+    x, y = dense_variables([8, 2])
+    result = operations.log(x, y)
+    assert result.val == pytest.approx(3)
+    assert result.jacobian(x) == pytest.approx(1 / (8 * np.log(2)))
+    assert result.jacobian(y) == pytest.approx(-np.log(8) / (2 * np.log(2) ** 2))
+
+def test_dense_rosenbrock_gradient():
+    x = dense_variables([2, 1])
+    gradient = rosenbrock(x).jacobian(x)
+    assert gradient[0] == pytest.approx(-2 * (1 - 2) - 400 * 2 * (1 - 2 ** 2))
+    assert gradient[1] == pytest.approx(200 * (1 - 2 ** 2))
+
+def test_dense_jacobian_order():
+    x = dense_variables([2, 3, 4])
+    result = x[0] * x[2]
+    assert np.array_equal(result.jacobian([x[2], x[0]]), [2, 4])
+
+def test_dense_jacobian_unknown_variable():
+    x = dense_variables([2, 3])
+    result = x[0] * x[1]
+    assert np.array_equal(result.jacobian([x[1], Number(1)]), [2, 0])
+    assert result.jacobian(Number(1)) == 0
+
+def test_dense_array_jacobian():
+    x = dense_variables([2, 3])
+    y = Array([x[0] * x[1], operations.sin(x[0])])
+    jacobian = y.jacobian(x)
+    assert jacobian.shape == (2, 2)
+    assert jacobian[0, 0] == 3
+    assert jacobian[0, 1] == 2
+    assert jacobian[1, 0] == pytest.approx(np.cos(2))
+    assert jacobian[1, 1] == 0
+
+def test_dense_array_jacobian_scalar_order():
+    x = dense_variables([2, 3])
+    y = x * x
+    assert np.array_equal(y.jacobian(x[1]), [0, 6])
+
+def test_dense_array_elementwise():
+    x = dense_variables([0, 1])
+    y = operations.exp(x)
+    assert np.allclose(y.jacobian(x), np.diag([1, np.exp(1)]))
+
+def test_dense_different_spaces():
+    x, = dense_variables([2])
+    y, = dense_variables([3])
+    with pytest.raises(ValueError):
+        x + y
+
+def test_dense_mixed_modes():
+    x, = dense_variables([2])
+    with pytest.raises(TypeError):
+        x + Number(3)
+
+def test_dense_equality():
+    x, y = dense_variables([2, 2])
+    assert (x * 1).equals(x * 1)
+    assert not x.equals(y)
+    assert not x.equals(Number(2))
+    assert x * 1 != x * 1
+
+def test_tangent_space_repr():
+    assert repr(TangentSpace(3)) == 'TangentSpace(size=3)'
@@ -0,0 +1,187 @@
+"""Tests for trace and replay
+"""
+
+import pytest
+import numpy as np
+from autodiff import operations, optimizations, root_finding
+from autodiff.structures import Number, Array, DenseArray, dense_variables
+from autodiff.tracing import Graph, TracedFunction, trace
+from autodiff.forward import hessian
+from autodiff.reverse import grad, Tape
+
+def rosenbrock(x0, a=1, b=100):
+    return (a - x0[0]) ** 2 + b * (x0[1] - x0[0] ** 2) ** 2
+
+def test_replay_skips_user_code(counted):
+    func = counted(rosenbrock)
+    traced = trace(func, [2, 1])
+    assert func.calls == 1
+    for values in [[0, 0], [1, 2], [-1.5, 3]]:
+        x = Array(values)
+        result = traced(x)
+        assert result.val == pytest.approx(rosenbrock(Array(values)).val)
+        assert np.allclose(result.jacobian(x), grad(rosenbrock)(values))
+    assert func.calls == 1
+
+def test_trace_on_first_call(counted):
+    func = counted(lambda x: x[0] * x[1])
+    traced = trace(func)
+    x = Array([2, 3])
+    assert np.array_equal(traced(x).jacobian(x), [3, 2])
+    assert np.array_equal(traced(x).jacobian(x), [3, 2])
+    assert func.calls == 1
+
+def test_first_call_with_repeated_input():
+    traced = trace(lambda x: x[0] * x[1] + x[1])
+    a = Number(2)
+    result = traced(Array([a, a]))
+    assert result.val == 6 and result.jacobian(a) == 5
+    x = Array([3, 5])
+    result = traced(x)
+    assert result.val == 20
+    assert np.array_equal(result.jacobian(x), [5, 4])
+
+def test_keyword_operand_is_traced():
+    traced = trace(lambda x: operations.log(x[0], y=x[1]), [2, 5])
+    x = Array([9, 3])
+    result = traced(x)
+    assert result.val == pytest.approx(2)
+    assert np.allclose(result.jacobian(x), [1 / (9 * np.log(3)), -2 / (3 * np.log(3))])
+
+def test_cache_keyed_on_shape(counted):
+    func = counted(lambda x: sum(x[i] * x[i] for i in range(len(x))))
+    traced = trace(func)
+    assert traced(Array([1, 2])).val == 5
+    assert traced(Array([1, 2, 3])).val == 14
+    assert traced(Array([3, 4])).val == 25
+    assert func.calls == 2
+    # The 0 + that sum() starts with is simplified away
+    assert len(traced.graph([0, 0])) == 2 + 3
+
+def test_scalar_input():
+    traced = trace(lambda x: operations.sin(x) * x, 1.)
+    x = Number(2)
+    result = traced(x)
+    assert result.val == pytest.approx(np.sin(2) * 2)
+    assert result.jacobian(x) == pytest.approx(np.cos(2) * 2 + np.sin(2))
+
+def test_tuple_output():
+    traced = trace(lambda x: (x[0] * x[1], x[1] - 1, 3), [1, 1])
+    x = Array([2, 5])
+    first, second, third = traced(x)
+    assert first.val == 10 and second.val == 4 and third == 3
+    assert np.array_equal(first.jacobian(x), [5, 2])
+    assert np.array_equal(second.jacobian(x), [0, 1])
+
+def test_array_output_elementwise_op():
+    traced = trace(lambda x: operations.exp(x) * 2, [0, 0])
+    x = Array([0, 1])
+    result = traced(x)
+    assert isinstance(result, Array)
+    assert np.allclose(result.jacobian(x), np.diag([2, 2 * np.exp(1)]))
+
+def test_constants_are_folded():
+    scale = Number(3)
+    graph = trace(lambda x: x * (scale * 2), 1.).graph(1.)
+    assert len(graph.ops) == 1
+    x = Number(2)
+    assert trace(lambda x: x * (scale * 2))(x).jacobian(x) == 6
+
+def test_replay_in_other_modes():
+    traced = trace(rosenbrock, [0, 0])
+    x = dense_variables([2, 1])
+    assert np.allclose(traced(x).jacobian(x), grad(rosenbrock)([2, 1]))
+    tape = Tape()
+    x = tape.variables([2, 1])
+    assert np.allclose(traced(x).jacobian(x), grad(rosenbrock)([2, 1]))
+    assert np.allclose(hessian(traced, [2, 1]), hessian(rosenbrock, [2, 1]))
+
+def test_numeric_inputs_call_func(counted):
+    func = counted(lambda x: x[0] + x[1])
+    traced = trace(func)
+    assert traced([1, 2]) == 3
+    assert func.calls == 1
+
+def test_nested_trace():
+    inner = trace(lambda x: x[0] * x[1], [1, 1])
+    outer = trace(lambda x: inner(x) + x[0], [1, 1])
+    x = Array([2, 3])
+    assert np.array_equal(outer(x).jacobian(x), [4, 2])
+    assert len(outer.graph(x).ops) == 2
+
+def test_dense_array_input():
+    with pytest.raises(TypeError):
+        trace(lambda x: x.sum())(DenseArray([1., 2.]))
+
+def test_repr():
+    traced = trace(rosenbrock, [1, 1])
+    assert repr(traced) == 'TracedFunction(rosenbrock, shapes=[(2,)])'
+    assert repr(traced.graph([1, 1])) == 'Graph(inputs=2, ops=8)'
+    assert isinstance(traced, TracedFunction)
+    assert isinstance(traced.graph([1, 1]), Graph)
+
+def test_bfgs_traced():
+    initial_guess = Array([Number(2), Number(1)])
+    x, _, _ = optimizations.bfgs(trace(rosenbrock), initial_guess)
+    expected, _, _ = optimizations.bfgs(rosenbrock, Array([Number(2), Number(1)]))
+    assert x[0].val == pytest.approx(expected[0].val)
+    assert x[1].val == pytest.approx(expected[1].val)
+
+def test_steepest_descent_traced():
+    func = lambda x: (x[0] - 1) ** 2 + (x[1] - 1) ** 2
+    _, x, _, _ = optimizations.steepest_descent(trace(func), Array([Number(0), Number(0)]))
+    _, expected, _, _ = optimizations.steepest_descent(func, Array([Number(0), Number(0)]))
+    assert x[0].val == pytest.approx(expected[0].val)
+    assert x[1].val == pytest.approx(expected[1].val)
+
+def test_newtons_method_traced():
+    func = trace(lambda x: (x[0] ** 2 - 4, x[1] * 3 - x[0]))
+    for sparse in [False, True]:
+        xstar, _ = root_finding.newtons_method(
+            func, Array([Number(1), Number(1)]), sparse=sparse
+        )
+        assert xstar[0].val == pytest.approx(2)
+        assert xstar[1].val == pytest.approx(2 / 3)
+
+def test_common_subexpressions_are_merged():
+    func = lambda x: x[0] ** 2 * x[1] + operations.sin(x[0] ** 2) + x[1] * x[0] ** 2
+    graph = trace(func, [1, 1]).graph([1, 1])
+    assert len(graph.ops) == 5
+    x = Array([1.5, -2])
+    result = trace(func)(x)
+    expected = func(Array([1.5, -2]))
+    assert result.val == pytest.approx(expected.val)
+    assert np.allclose(result.jacobian(x), grad(func)([1.5, -2]))
+
+def test_identities_are_removed():
+    graph = trace(lambda x: (x[0] + 0) * 1 / 1 - 0 + x[1] ** 1, [1, 1]).graph([1, 1])
+    assert len(graph.ops) == 1
+    traced = trace(lambda x: x[0] * 1, [1, 1])
+    x = Array([2, 3])
+    assert np.array_equal(traced(x).jacobian(x), [1, 0])
+
+def test_dead_operations_are_removed():
+    def func(x):
+        unused = operations.exp(x[0]) * x[1]
+        return x[0] + x[1]
+    assert len(trace(func, [1, 1]).graph([1, 1]).ops) == 1
+
+def test_folded_constants_carry_no_derivative():
+    scale = Number(2)
+    graph = trace(lambda x: x * operations.exp(scale * 3), 1.).graph(1.)
+    assert len(graph.ops) == 1
+    op, operands, _, _ = graph.ops[0]
+    assert op is operations.mul
+    assert operands[1] == pytest.approx(np.exp(6))
+    assert not isinstance(operands[1], Number)
+
+def test_unoptimized_trace():
+    func = lambda x: x[0] ** 2 + x[0] ** 2 + 0
+    assert len(trace(func, [1, 1], optimize=False).graph([1, 1]).ops) == 4
+    assert len(trace(func, [1, 1]).graph([1, 1]).ops) == 2
+
+def test_constant_output_after_folding():
+    traced = trace(lambda x: (x[0] * 2, Number(3) * 2), [1, 1])
+    first, second = traced(Array([1, 1]))
+    assert second.val == 6
+    assert isinstance(second, Number)